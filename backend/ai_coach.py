@@ -8,6 +8,7 @@ import pandas as pd
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 
+from .context import UserData
 from .xml_validator import validate_zwo, extract_xml_from_response
 
 load_dotenv()
@@ -240,6 +241,7 @@ def _build_context(
     event_date: str = "",
     training_frequency: str = "",
     training_days: str = "",
+    baselines: dict | None = None,
 ) -> str:
     """Assemble the athlete context block that gets prepended to the user message."""
 
@@ -252,6 +254,22 @@ def _build_context(
              if c in recent_stats.columns]
         ].to_string(index=False)
 
+    # Aktuelle Werte gegen die eigene Normalspanne (baselines.latest)
+    baseline_text = "Keine Baselines verfügbar."
+    if baselines:
+        parts = []
+        for key, label, unit in (("hrv", "HRV", " ms"), ("rhr", "Ruhepuls", " bpm"), ("sleep_score", "Schlaf", "")):
+            b = baselines.get(key)
+            if not b:
+                continue
+            part = f"{label} {b['value']:.0f}{unit} [{b['date']}]"
+            if b.get("mean60") is not None:
+                part += f" (60T-Mittel {b['mean60']:.0f}"
+                part += f", z={b['z60']:+.1f})" if b.get("z60") is not None else ")"
+            parts.append(part)
+        if parts:
+            baseline_text = " | ".join(parts)
+
     # Recent activities
     act_text = "Keine Aktivitäten verfügbar."
     if not df_act.empty:
@@ -316,6 +334,7 @@ Bevorzugte Trainingstage: {days_text}
 Hauptevent: {event_text}
 Performance: CTL={ctl:.1f} | ATL={atl:.1f} | TSB={tsb:.1f} | FTP={ftp:.0f}W | Wochenlast={weekly_load:.0f}
 Check-in heute: {checkin_text}
+Baselines: {baseline_text}
 
 Garmin Health (letzte 7 Tage):
 {stats_text}
@@ -327,25 +346,10 @@ Letzte 5 Aktivitäten:
 """
 
 
-def ask_coach(
-    message: str,
-    ctl: float,
-    atl: float,
-    tsb: float,
-    ftp: float,
-    weekly_load: float,
-    df_stats: pd.DataFrame,
-    df_act: pd.DataFrame,
-    checkin: dict | None = None,
-    tp_context: str | None = None,
-    training_goal: str = "",
-    event_name: str = "",
-    event_date: str = "",
-    training_frequency: str = "",
-    training_days: str = "",
-) -> dict:
+def ask_coach(message: str, data: UserData, tp_context: str | None = None) -> dict:
     """
     Send a coaching request to Claude and return parsed response.
+    All athlete data comes from the request's UserData.
 
     Returns:
         {
@@ -355,10 +359,13 @@ def ask_coach(
             "xml_message": str | None,
         }
     """
+    user = data.user
+    load = data.load
     context = _build_context(
-        ctl, atl, tsb, ftp, weekly_load,
-        df_stats, df_act, checkin, tp_context,
-        training_goal, event_name, event_date, training_frequency, training_days
+        load["ctl"], load["atl"], load["tsb"], data.ftp, data.weekly_load,
+        data.stats, data.activities, data.checkin_recent, tp_context,
+        user.training_goal or "", user.event_name or "", user.event_date or "",
+        user.training_frequency or "", user.training_days or "", data.baselines,
     )
     full_message = f"{context}\n\nATHLET FRAGT: {message}"
 
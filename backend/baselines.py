@@ -0,0 +1,113 @@
+"""
+Rolling baselines per user – 7/28/60-day mean, SD, coefficient of variation and
+z-score of HRV, resting HR and sleep score for every day.
+
+Computed in one pass over the daily metrics table (calculations.rolling_baselines)
+and persisted to baselines_state.json in the user dir. The table is rebuilt when
+the stats file changes or a new day starts (the windows move on even without
+new readings). Dashboard, readiness and the coach context read the
+precomputed values of the latest reading instead of re-sorting the stats.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from . import calculations as calc
+from . import daily_metrics
+from . import data_manager as dm
+from .user_state import UserStates
+
+_STATE_FILE = "baselines_state.json"
+
+METRICS = ["hrv", "rhr", "sleep_score"]
+
+
+class _State:
+    def __init__(self, signature: list, frame: pd.DataFrame):
+        self.signature = signature      # [stats signature, today] it was built for
+        self.frame = frame              # Date index: METRICS + rolling_baselines columns
+
+    def to_json(self) -> dict:
+        start = self.frame.index[0].strftime("%Y-%m-%d") if len(self.frame) else None
+        # NaN is not valid JSON – store None
+        columns = {c: [None if np.isnan(v) else v for v in self.frame[c].tolist()] for c in self.frame.columns}
+        return {"signature": self.signature, "start": start, "columns": columns}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "_State":
+        columns = {c: np.asarray(v, dtype=float) for c, v in data["columns"].items()}
+        n = len(next(iter(columns.values()))) if columns else 0
+        index = (pd.date_range(data["start"], periods=n, freq="D", name="Date") if data["start"]
+                 else pd.DatetimeIndex([], name="Date"))
+        return cls(data["signature"], pd.DataFrame(columns, index=index))
+
+
+_states = UserStates(_STATE_FILE, _State.from_json, _State.to_json, hits=0, builds=0)
+_counters = _states.counters
+
+
+def _build(user_id: int | None) -> pd.DataFrame:
+    daily = daily_metrics.window(user_id, columns=METRICS).set_index("Date")
+    # Garmin writes 0 for "no reading"
+    daily = daily.where(daily > 0)
+    return pd.concat([daily, calc.rolling_baselines(daily)], axis=1)
+
+
+def _current(user_id: int | None) -> pd.DataFrame:
+    today = pd.Timestamp.now().strftime("%Y-%m-%d")
+    signature = json.loads(json.dumps([dm.data_signature(user_id, "stats"), today]))
+    with _states.lock(user_id):
+        state = _states.get(user_id)
+        if state is not None and state.signature == signature:
+            _counters["hits"] += 1
+        else:
+            state = _State(signature, _build(user_id))
+            _counters["builds"] += 1
+            _states.put(user_id, state)
+        return state.frame
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+
+def table(user_id: int | None, since=None) -> pd.DataFrame:
+    """Every day from since (default: first day) through today with values and baselines. Treat as read-only."""
+    frame = _current(user_id)
+    return frame if since is None else frame.loc[pd.Timestamp(since).normalize():]
+
+
+def latest(user_id: int | None) -> dict:
+    """
+    Per metric the latest reading and its baselines:
+    {"hrv": {"date", "value", "mean7", "sd7", "cv7", "z7", ..., "z60"}, ...};
+    None for a metric without readings.
+    """
+    frame = _current(user_id)
+    out = {}
+    for metric in METRICS:
+        idx = frame[metric].last_valid_index()
+        if idx is None:
+            out[metric] = None
+            continue
+        row = {"date": str(idx.date()), "value": float(frame.at[idx, metric])}
+        for w in calc.BASELINE_WINDOWS:
+            for stat in ("mean", "sd", "cv", "z"):
+                v = frame.at[idx, f"{metric}_{stat}{w}"]
+                row[f"{stat}{w}"] = None if np.isnan(v) else float(v)
+        out[metric] = row
+    return out
+
+
+def hrv_status(user_id: int | None, latest_values: dict | None = None) -> dict:
+    """
+    The dashboard HRV status of the latest reading (calculations.baseline_hrv_status), with its z-score.
+    latest_values: latest(user_id) if the caller has it already.
+    """
+    hrv = (latest_values or latest(user_id))["hrv"]
+    if hrv is None:
+        return calc.baseline_hrv_status(None, None, None)
+    return calc.baseline_hrv_status(hrv["value"], hrv["mean7"], hrv["z60"], hrv["cv7"])
+
+
+def stats() -> dict:
+    return {"users": len(_states.users()), **_counters}
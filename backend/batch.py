@@ -0,0 +1,275 @@
+"""
+Nightly batch analytics for all users in one vectorized pass.
+
+The per-request path computes one user's dashboard values at a time. Here the
+activities and daily stats of every user are loaded into long-format frames
+(one row per user and activity/day), and everything is computed for all users
+at once:
+- CTL/ATL and the rolling FTP over days × users matrices (one ewm/rolling over
+  all columns); the series are installed in the pmc store
+- weekly load and training distribution as grouped operations
+- the rolling HRV / resting HR / sleep baselines of each user's latest reading
+  (calculations.rolling_baselines over a lag × users matrix) and from them the
+  HRV status
+
+The results are written to analytics_snapshot.json per user, stamped with the
+user's data version and the day. UserData (dashboard, home, trends, coach)
+reads a snapshot instead of computing while it is current – any write or
+profile change bumps the data version and the values are computed live again.
+
+    python -m backend.batch
+"""
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from . import baselines
+from . import calculations as calc
+from . import data_manager as dm
+from . import data_version
+from . import pmc
+from .database import SAVE_PATH
+from .user_state import UserStates
+
+_SNAPSHOT_FILE = "analytics_snapshot.json"
+
+# Stats column -> baselines metric
+_STATS_COLUMNS = {"HRV Avg": "hrv", "RHR": "rhr", "Sleep Score": "sleep_score"}
+
+_snapshots = UserStates(_SNAPSHOT_FILE, lambda data: data, hits=0, stale=0, written=0)
+_counters = _snapshots.counters
+_last_run: dict = {}
+
+
+def _user_ids() -> list[int]:
+    users_dir = os.path.join(SAVE_PATH, "users")
+    if not os.path.isdir(users_dir):
+        return []
+    return sorted(int(e) for e in os.listdir(users_dir) if e.isdigit())
+
+
+def _load_long(user_ids: list[int]) -> tuple[pd.DataFrame, pd.DataFrame, dict]:
+    """
+    Activities (user_id, Date, TSS, NP) and daily stats (user_id, Date, hrv, rhr,
+    sleep_score) of all users, plus per user the data version, activity
+    signature and mark taken before reading.
+    """
+    acts, stats, stamps = [], [], {}
+    for uid in user_ids:
+        stamps[uid] = {
+            "version": data_version.current(uid),
+            "signature": dm.data_signature(uid, "activities"),
+            "mark": dm.data_mark(uid, "activities"),
+        }
+        df = dm.load_activities(uid, columns=["activityTrainingLoad", "normPower"])
+        if not df.empty and "Date" in df.columns:
+            acts.append(pd.DataFrame({
+                "user_id": uid,
+                "Date": df["Date"].dt.normalize(),
+                "TSS": pd.to_numeric(df["activityTrainingLoad"], errors="coerce")
+                       if "activityTrainingLoad" in df.columns else np.nan,
+                "NP": pd.to_numeric(df["normPower"], errors="coerce") if "normPower" in df.columns else np.nan,
+                "has_tss": "activityTrainingLoad" in df.columns,
+                "has_np": "normPower" in df.columns,
+            }))
+        df = dm.load_stats(uid, columns=list(_STATS_COLUMNS))
+        if not df.empty and "Date" in df.columns:
+            day = pd.DataFrame({
+                name: pd.to_numeric(df[col], errors="coerce") if col in df.columns else np.nan
+                for col, name in _STATS_COLUMNS.items()
+            }, index=df.index)
+            day.insert(0, "Date", df["Date"].dt.normalize())
+            # one row per day as in daily_metrics; Garmin writes 0 for "no reading"
+            day = day[~day["Date"].duplicated(keep="last")]
+            metrics = list(_STATS_COLUMNS.values())
+            day[metrics] = day[metrics].where(day[metrics] > 0)
+            day.insert(0, "user_id", uid)
+            stats.append(day)
+    act_cols = ["user_id", "Date", "TSS", "NP", "has_tss", "has_np"]
+    acts_df = pd.concat(acts, ignore_index=True) if acts else pd.DataFrame(columns=act_cols)
+    stats_df = (pd.concat(stats, ignore_index=True) if stats
+                else pd.DataFrame(columns=["user_id", "Date", *_STATS_COLUMNS.values()]))
+    return acts_df, stats_df, stamps
+
+
+def pmc_matrix(acts: pd.DataFrame, today: pd.Timestamp) -> dict[str, pd.DataFrame]:
+    """
+    Daily TSS, CTL, ATL, best NP and FTP as days × users frames. Starts one day
+    before the earliest activity with all zeros, so every user's EWMA is seeded at 0.
+    """
+    acts = acts[acts["has_tss"]]
+    if acts.empty:
+        empty = pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+        return dict.fromkeys(("tss", "ctl", "atl", "best_np", "ftp"), empty)
+    grouped = acts.groupby(["Date", "user_id"])
+    daily = grouped["TSS"].sum().unstack("user_id")
+    days = pd.date_range(daily.index.min() - pd.Timedelta(days=1), max(daily.index.max(), today),
+                         freq="D", name="Date")
+    tss = daily.reindex(days).fillna(0.0)
+    best_np = grouped["NP"].max().unstack("user_id").reindex(index=days, columns=tss.columns)
+    return {
+        "tss": tss,
+        "ctl": tss.ewm(span=calc.CTL_SPAN, adjust=False).mean(),
+        "atl": tss.ewm(span=calc.ATL_SPAN, adjust=False).mean(),
+        "best_np": best_np,
+        "ftp": pd.DataFrame(calc.rolling_ftp(best_np), index=days, columns=tss.columns),
+    }
+
+
+def latest_baselines(stats: pd.DataFrame) -> dict:
+    """
+    baselines.latest for every user: per metric the latest reading and its
+    rolling mean/SD/CV/z-score over BASELINE_WINDOWS. Each user's readings are
+    aligned on the days before their latest one, so one lag × users matrix of
+    max(window) + 1 rows covers everyone.
+    """
+    horizon = max(calc.BASELINE_WINDOWS)
+    lags = range(horizon, -1, -1)     # oldest first, row -1 is the latest reading
+    out: dict = {}
+    for metric in _STATS_COLUMNS.values():
+        df = stats.loc[stats[metric].notna(), ["user_id", "Date", metric]]
+        if df.empty:
+            continue
+        latest = df.groupby("user_id")["Date"].max()
+        lag = (df["user_id"].map(latest) - df["Date"]).dt.days
+        df = df.assign(lag=lag)[lag <= horizon]
+        grid = df.pivot(index="lag", columns="user_id", values=metric).reindex(lags)
+        base = calc.rolling_baselines(grid).iloc[-1]
+        for uid in grid.columns:
+            row = {"date": str(latest[uid].date()), "value": float(grid[uid].iloc[-1])}
+            for w in calc.BASELINE_WINDOWS:
+                for stat in ("mean", "sd", "cv", "z"):
+                    v = base[f"{uid}_{stat}{w}"]
+                    row[f"{stat}{w}"] = None if np.isnan(v) else float(v)
+            out.setdefault(uid, {})[metric] = row
+    return out
+
+
+def training_distribution(acts: pd.DataFrame, ftp: dict) -> dict:
+    """calculations.compute_training_distribution for every user in one grouped count."""
+    zero = {"Zone2": 0, "SweetSpot": 0, "HighIntensity": 0}
+    df = acts[acts["has_np"]]
+    user_ftp = df["user_id"].map(ftp).astype(float)
+    intensity = df["NP"] / user_ftp.where(user_ftp != 0)
+    zones = pd.DataFrame({
+        "user_id": df["user_id"],
+        "total": intensity.notna(),
+        "Zone2": intensity < 0.84,
+        "SweetSpot": (intensity >= 0.84) & (intensity < 1.05),
+        "HighIntensity": intensity >= 1.05,
+    })
+    counts = zones.groupby("user_id").sum()
+    out = {}
+    for uid in ftp:
+        if uid not in counts.index or ftp[uid] == 0 or counts.at[uid, "total"] == 0:
+            out[uid] = dict(zero)
+            continue
+        total = int(counts.at[uid, "total"])
+        out[uid] = {z: round(int(counts.at[uid, z]) / total * 100) for z in zero}
+    return out
+
+
+def snapshot(user_id: int | None) -> dict | None:
+    """
+    The user's last batch results if they are still current – computed today on
+    the data version the user has now. None otherwise (compute live then).
+    """
+    day = pd.Timestamp.now().strftime("%Y-%m-%d")
+    version = data_version.current(user_id)
+    with _snapshots.lock(user_id):
+        snap = _snapshots.get(user_id)
+        if snap is not None and (snap.get("day") != day or snap.get("version") != version):
+            # python -m backend.batch in another process may have written a newer one
+            snap = _snapshots.load(user_id)
+            if snap is not None:
+                _snapshots.put(user_id, snap, save=False)
+        if snap is None or snap.get("day") != day or snap.get("version") != version:
+            _counters["stale"] += 1
+            return None
+        _counters["hits"] += 1
+        return snap
+
+
+def run(user_ids: list[int] | None = None, ftp_overrides: dict | None = None) -> dict:
+    """
+    Compute PMC, FTP, weekly load, training distribution, baselines and HRV
+    status for all users (or the given ones), install the PMC series in the pmc
+    store and write the snapshots. ftp_overrides maps user_id -> manual FTP
+    (User.ftp_override), which wins over the rolling one as in UserData.ftp.
+    """
+    started = time.perf_counter()
+    user_ids = _user_ids() if user_ids is None else list(user_ids)
+    now = pd.Timestamp.now()
+    today = now.normalize()
+    acts, stats, stamps = _load_long(user_ids)
+    loaded = time.perf_counter()
+
+    m = pmc_matrix(acts, today)
+    has_tss = acts[acts["has_tss"]].groupby("user_id")["Date"]
+    first_day, last_day = has_tss.min(), has_tss.max()
+    # calculations.compute_weekly_load: TSS of the activities dated within the last 7 days
+    weekly = acts[acts["Date"] >= now - pd.Timedelta(days=7)].groupby("user_id")["TSS"].sum()
+    env_ftp = calc.env_ftp_override()
+    rolling_ftp, ftp = {}, {}
+    for uid in user_ids:
+        if uid in m["ftp"].columns:
+            rolling_ftp[uid] = float(m["ftp"].at[today, uid])
+        else:
+            rolling_ftp[uid] = float(calc.BASE_FTP)
+        ftp[uid] = (ftp_overrides or {}).get(uid) or (env_ftp if env_ftp is not None else rolling_ftp[uid])
+    dist = training_distribution(acts, ftp)
+    latest = latest_baselines(stats)
+
+    computed_at = datetime.now().isoformat(timespec="seconds")
+    day = today.strftime("%Y-%m-%d")
+    for uid in user_ids:
+        stamp = stamps[uid]
+        if uid in m["ctl"].columns:
+            rows = slice(first_day[uid], max(last_day[uid], today))
+            pmc.seed(uid, stamp["signature"], stamp["mark"], first_day[uid],
+                     *(m[k].loc[rows, uid].to_numpy() for k in ("tss", "ctl", "atl", "best_np", "ftp")))
+            ctl, atl = float(m["ctl"].at[today, uid]), float(m["atl"].at[today, uid])
+        else:
+            pmc.seed(uid, stamp["signature"], stamp["mark"], today, *(np.zeros(0) for _ in range(5)))
+            ctl = atl = 0.0
+        user_baselines = {metric: latest.get(uid, {}).get(metric) for metric in _STATS_COLUMNS.values()}
+        with _snapshots.lock(uid):
+            _snapshots.put(uid, {
+                "day": day,
+                "version": stamp["version"],
+                "computed_at": computed_at,
+                "load": {"ctl": ctl, "atl": atl, "tsb": ctl - atl},
+                "weekly_load": float(weekly.get(uid, 0.0)),
+                "rolling_ftp": rolling_ftp[uid],
+                "ftp": ftp[uid],
+                "training_distribution": dist[uid],
+                "baselines": user_baselines,
+                "hrv": baselines.hrv_status(uid, user_baselines),
+            })
+        _counters["written"] += 1
+    done = time.perf_counter()
+    _last_run.update({
+        "at": computed_at,
+        "users": len(user_ids),
+        "days": len(m["tss"]),
+        "load_s": round(loaded - started, 3),
+        "compute_s": round(done - loaded, 3),
+    })
+    return dict(_last_run)
+
+
+def stats() -> dict:
+    return {"snapshots": len(_snapshots.users()), "last_run": dict(_last_run), **_counters}
+
+
+if __name__ == "__main__":
+    from .database import SessionLocal, User
+    db = SessionLocal()
+    try:
+        overrides = {u.id: u.ftp_override for u in db.query(User).all()}
+    finally:
+        db.close()
+    print(run(ftp_overrides=overrides))
@@ -3,6 +3,7 @@ Pure calculation functions – no I/O, no frameworks.
 Extracted from skywalker_dashboard.py.
 """
 import os
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -14,52 +15,163 @@ CTL_SPAN = 42
 ATL_SPAN = 7
 
 
-def compute_ftp(df_act: pd.DataFrame) -> float:
-    """Return FTP – manual override from FTP_OVERRIDE env var takes priority."""
+def env_ftp_override() -> float | None:
+    """Manual FTP from the FTP_OVERRIDE env var, if set."""
     override = os.getenv("FTP_OVERRIDE")
     if override:
         try:
             return float(override)
         except ValueError:
             pass
+    return None
+
+
+def daily_tss_history(df_act: pd.DataFrame, end: pd.Timestamp) -> pd.Series:
+    """Daily TSS from the first activity through end (0 for days without training)."""
+    if df_act.empty or "activityTrainingLoad" not in df_act.columns:
+        return pd.Series(dtype=float)
+    dates = pd.to_datetime(df_act["Date"]).dt.normalize()
+    tss = pd.to_numeric(df_act["activityTrainingLoad"], errors="coerce")
+    daily = tss.groupby(dates).sum()
+    if daily.empty:
+        return pd.Series(dtype=float)
+    end = max(end, daily.index.max())
+    return daily.reindex(pd.date_range(daily.index.min(), end, freq="D"), fill_value=0.0).astype(float)
+
+
+def daily_best_np(df_act: pd.DataFrame, days: pd.DatetimeIndex) -> np.ndarray:
+    """Best normalized power per day of `days` (NaN on days without a power reading)."""
     if df_act.empty or "normPower" not in df_act.columns:
-        return BASE_FTP
-    cutoff = pd.Timestamp.now() - pd.Timedelta(days=FTP_WINDOW_DAYS)
-    recent = df_act[df_act["Date"] >= cutoff]
-    max_np = pd.to_numeric(recent["normPower"], errors="coerce").max()
-    if pd.isna(max_np) or max_np == 0:
-        return BASE_FTP
-    return round(max_np * 0.95)
+        return np.full(len(days), np.nan)
+    dates = pd.to_datetime(df_act["Date"]).dt.normalize()
+    best = pd.to_numeric(df_act["normPower"], errors="coerce").groupby(dates).max()
+    return best.reindex(days).to_numpy(dtype=float)
 
 
-def _daily_tss(df_act: pd.DataFrame, days: int) -> pd.DataFrame:
-    """Build a continuous daily TSS series with 0 for missing days."""
-    end = pd.Timestamp.now().normalize()
-    start = end - pd.Timedelta(days=days)
-    date_range = pd.date_range(start, end, freq="D")
+def rolling_ftp(best_np) -> np.ndarray:
+    """
+    FTP for every day of a contiguous daily best-NP series: 95 % of the best NP
+    within the trailing FTP_WINDOW_DAYS, BASE_FTP without power data. The FTP_OVERRIDE
+    env var is applied by the callers (pmc.latest_ftp), not here.
+    Works on a 1-D array or a days × users frame.
+    """
+    best = pd.DataFrame(best_np).rolling(FTP_WINDOW_DAYS, min_periods=1).max().to_numpy()
+    ftp = np.where(np.isnan(best) | (best == 0), BASE_FTP, np.round(best * 0.95))
+    return ftp.ravel() if np.ndim(best_np) == 1 else ftp
 
-    if df_act.empty or "activityTrainingLoad" not in df_act.columns:
-        return pd.DataFrame({"Date": date_range, "TSS": [0] * len(date_range)})
 
-    df = df_act.copy()
-    df["Date"] = pd.to_datetime(df["Date"]).dt.normalize()
-    daily = (
-        df.groupby("Date")["activityTrainingLoad"]
-        .sum()
-        .reindex(date_range, fill_value=0)
-        .reset_index()
-    )
-    daily.columns = ["Date", "TSS"]
-    return daily
-
-
-def compute_ctl_atl_tsb(df_act: pd.DataFrame, days: int = 90) -> pd.DataFrame:
-    """Return DataFrame with Date, CTL, ATL, TSB columns."""
-    daily = _daily_tss(df_act, days)
-    daily["CTL"] = daily["TSS"].ewm(span=CTL_SPAN, adjust=False).mean()
-    daily["ATL"] = daily["TSS"].ewm(span=ATL_SPAN, adjust=False).mean()
-    daily["TSB"] = daily["CTL"] - daily["ATL"]
-    return daily
+def ewma_forward(values: np.ndarray, span: int, seed: float) -> np.ndarray:
+    """EWMA (adjust=False) of values continuing from seed, the value of the day before values[0]."""
+    s = pd.Series(np.concatenate(([seed], values)))
+    return s.ewm(span=span, adjust=False).mean().to_numpy()[1:]
+
+
+@lru_cache(maxsize=32)
+def ewma_kernel(span: int, horizon: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Closed form of the adjust=False EWMA over `horizon` days:
+    y = decay * y0 + x @ weights.T, with y0 the value the day before x[0].
+    weights[t, k] = a·(1-a)^(t-k) for k <= t. Cached – do not modify the arrays.
+    """
+    alpha = 2 / (span + 1)
+    t = np.arange(horizon)
+    lag = t[:, None] - t[None, :]
+    weights = np.where(lag >= 0, alpha * (1 - alpha) ** np.maximum(lag, 0), 0.0)
+    decay = (1 - alpha) ** (t + 1)
+    return decay, weights
+
+
+def project_pmc(loads: np.ndarray, ctl0: float, atl0: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    CTL, ATL, TSB for daily loads continuing from today's ctl0/atl0.
+    loads is (days,) or (scenarios, days) – all scenarios in one matrix product.
+    """
+    loads = np.atleast_2d(np.asarray(loads, dtype=float))
+    ctl_decay, ctl_w = ewma_kernel(CTL_SPAN, loads.shape[1])
+    atl_decay, atl_w = ewma_kernel(ATL_SPAN, loads.shape[1])
+    ctl = ctl0 * ctl_decay + loads @ ctl_w.T
+    atl = atl0 * atl_decay + loads @ atl_w.T
+    return ctl, atl, ctl - atl
+
+
+def _box_qp(G: np.ndarray, g: np.ndarray, upper: np.ndarray) -> np.ndarray:
+    """
+    min ½·x'Gx - g'x subject to 0 <= x <= upper, G positive definite.
+    Primal active set: solve the KKT system of the free variables with the bound
+    ones fixed, step to the first bound that blocks, and release the bound with
+    the most negative multiplier once the free subproblem is optimal.
+    """
+    n = len(g)
+    # Start from the unconstrained optimum clipped into the box – usually few bounds change after that
+    x = np.clip(np.linalg.solve(G, g), 0.0, upper)
+    at_lower = x <= 0.0
+    at_upper = ~at_lower & (x >= upper)
+    for _ in range(4 * n + 10):
+        free = ~(at_lower | at_upper)
+        target = x.copy()
+        if free.any():
+            rhs = g[free] - G[np.ix_(free, ~free)] @ x[~free]
+            target[free] = np.linalg.solve(G[np.ix_(free, free)], rhs)
+        step = target - x
+        if np.abs(step).max() <= 1e-9:
+            grad = G @ x - g
+            # Multipliers: a variable at 0 must not want to grow, one at its cap not to shrink
+            violation = np.where(at_lower, -grad, 0.0) + np.where(at_upper, grad, 0.0)
+            i = int(np.argmax(violation))
+            if violation[i] <= 1e-9:
+                break
+            at_lower[i] = at_upper[i] = False
+            continue
+        with np.errstate(divide="ignore", invalid="ignore"):
+            to_lower = np.where(free & (step < 0), -x / step, np.inf)
+            to_upper = np.where(free & (step > 0), (upper - x) / step, np.inf)
+        i_low, i_up = int(np.argmin(to_lower)), int(np.argmin(to_upper))
+        alpha = min(1.0, to_lower[i_low], to_upper[i_up])
+        x += alpha * step
+        if alpha < 1.0:
+            if to_lower[i_low] <= to_upper[i_up]:
+                x[i_low], at_lower[i_low] = 0.0, True
+            else:
+                x[i_up], at_upper[i_up] = upper[i_up], True
+    return np.clip(x, 0.0, upper)
+
+
+def plan_load(ctl0: float, atl0: float, training_days: np.ndarray, target_ctl: float, target_tsb: float,
+              max_daily: float, smoothness: float = 1e-3) -> np.ndarray:
+    """
+    Daily TSS from tomorrow on so that CTL and TSB at the end of the last day
+    (the morning of the event) hit target_ctl / target_tsb.
+
+    CTL is linear in the loads (ewma_kernel), so this is a weighted
+    least-squares problem over the training days: the two end targets, CTL
+    following a straight ramp from ctl0 to target_ctl on the way (builds
+    fitness steadily instead of cramming it into the last weeks), and a small
+    penalty on jumps between consecutive sessions. Subject to
+    0 <= TSS <= max_daily, solved by _box_qp. training_days is a boolean mask
+    over the horizon; other days stay at 0.
+    """
+    training_days = np.asarray(training_days, dtype=bool)
+    horizon = len(training_days)
+    plan = np.zeros(horizon)
+    idx = np.flatnonzero(training_days)
+    if not len(idx):
+        return plan
+    ctl_decay, ctl_w = ewma_kernel(CTL_SPAN, horizon)
+    atl_decay, atl_w = ewma_kernel(ATL_SPAN, horizon)
+    a_ctl = ctl_w[-1, idx]
+    a_tsb = ctl_w[-1, idx] - atl_w[-1, idx]
+    r_ctl = target_ctl - ctl0 * ctl_decay[-1]
+    r_tsb = target_tsb - (ctl0 * ctl_decay[-1] - atl0 * atl_decay[-1])
+    # Ramp rows scaled so that the whole ramp weighs a tenth of one end target
+    ramp = ctl0 + (target_ctl - ctl0) * np.arange(1, horizon + 1) / horizon
+    path = ctl_w[:, idx] / np.sqrt(horizon)
+    r_path = (ramp - ctl0 * ctl_decay) / np.sqrt(horizon)
+    diff = np.diff(np.eye(len(idx)), axis=0)
+    G = (np.outer(a_ctl, a_ctl) + np.outer(a_tsb, a_tsb) + 0.1 * path.T @ path
+         + smoothness * diff.T @ diff)
+    g = r_ctl * a_ctl + r_tsb * a_tsb + 0.1 * path.T @ r_path
+    plan[idx] = _box_qp(G, g, np.full(len(idx), float(max_daily)))
+    return plan
 
 
 def compute_weekly_load(df_act: pd.DataFrame) -> float:
@@ -71,36 +183,101 @@ def compute_weekly_load(df_act: pd.DataFrame) -> float:
     return float(pd.to_numeric(recent["activityTrainingLoad"], errors="coerce").sum())
 
 
-def compute_hrv_status(df_stats: pd.DataFrame) -> dict:
-    """HRV readiness: compare latest reading to 7-day baseline."""
-    if df_stats.empty or "HRV Avg" not in df_stats.columns:
-        return {"status": "unknown", "color": "#888888", "current": 0.0, "baseline": 0.0}
+BASELINE_WINDOWS = (7, 28, 60)
+HRV_COLORS = {"green": "#00C853", "yellow": "#FFD600", "red": "#FF1744", "unknown": "#888888"}
 
-    sorted_df = df_stats.sort_values("Date", ascending=False)
-    hrv_series = pd.to_numeric(sorted_df["HRV Avg"], errors="coerce")
-    latest = hrv_series.iloc[0]
-    baseline = hrv_series.head(7).mean()
 
-    if pd.isna(latest) or pd.isna(baseline) or baseline == 0:
-        return {"status": "unknown", "color": "#888888", "current": 0.0, "baseline": 0.0}
+def rolling_baselines(daily: pd.DataFrame, windows: tuple = BASELINE_WINDOWS) -> pd.DataFrame:
+    """
+    Rolling mean, SD, coefficient of variation and z-score for every column of a
+    contiguous daily frame (NaN on days without a reading) and every window in
+    days. A day's baseline covers the `w` days before it, so its z-score says
+    how far that day lies from the normal range. Needs max(3, w // 2) readings.
+    All windows come from one set of cumulative sums (count, sum, sum of squares).
+    Columns: <col>_mean<w>, <col>_sd<w>, <col>_cv<w>, <col>_z<w>.
+    """
+    values = daily.to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    x = np.where(valid, values, 0.0)
+    zero = np.zeros((1, values.shape[1]))
+    # cum[k] = sum over the first k days – the w days before day t are cum[t] - cum[t - w]
+    count = np.vstack([zero, np.cumsum(valid, axis=0)])
+    total = np.vstack([zero, np.cumsum(x, axis=0)])
+    squares = np.vstack([zero, np.cumsum(x * x, axis=0)])
+    t = np.arange(len(values))
+    out = {}
+    for w in windows:
+        lo = np.maximum(t - w, 0)
+        n = count[t] - count[lo]
+        s1 = total[t] - total[lo]
+        s2 = squares[t] - squares[lo]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(n >= max(3, w // 2), s1 / n, np.nan)
+            sd = np.sqrt(np.maximum(s2 - s1 * mean, 0.0) / (n - 1))
+            cv = np.where(mean != 0, sd / mean, np.nan)
+            z = np.where(sd > 0, (values - mean) / sd, np.nan)
+        for i, col in enumerate(daily.columns):
+            out[f"{col}_mean{w}"] = mean[:, i]
+            out[f"{col}_sd{w}"] = sd[:, i]
+            out[f"{col}_cv{w}"] = cv[:, i]
+            out[f"{col}_z{w}"] = z[:, i]
+    return pd.DataFrame(out, index=daily.index)
+
+
+def hrv_status_codes(current, baseline) -> np.ndarray:
+    """
+    HRV status per day by the ratio to the 7-day mean (green from 95 %, yellow
+    from 85 %, as in the Streamlit dashboard); unknown without a reading.
+    """
+    current, baseline = (np.asarray(a, dtype=float) for a in (current, baseline))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = current / baseline
+    by_ratio = np.select([ratio >= 0.95, ratio >= 0.85], ["green", "yellow"], "red")
+    has_ratio = ~np.isnan(ratio) & (baseline != 0)
+    return np.where(has_ratio, by_ratio, "unknown")
 
-    ratio = latest / baseline
-    if ratio >= 0.95:
-        status, color = "green", "#00C853"
-    elif ratio >= 0.85:
-        status, color = "yellow", "#FFD600"
-    else:
-        status, color = "red", "#FF1744"
 
+def baseline_hrv_status(current: float | None, baseline: float | None, z: float | None = None,
+                        cv: float | None = None) -> dict:
+    """
+    Dashboard HRV status of one reading from its precomputed baselines (see
+    hrv_status_codes): status, color, current, baseline (7-day mean), ratio.
+    z (60-day z-score) and cv are passed through as context, not used for the status.
+    """
+    nan = float("nan")
+    status = str(hrv_status_codes(current if current is not None else nan,
+                                  baseline if baseline is not None else nan))
+    if status == "unknown":
+        return {"status": "unknown", "color": HRV_COLORS["unknown"], "current": 0.0, "baseline": 0.0}
     return {
         "status": status,
-        "color": color,
-        "current": round(float(latest), 1),
+        "color": HRV_COLORS[status],
+        "current": round(float(current), 1),
         "baseline": round(float(baseline), 1),
-        "ratio": round(float(ratio), 3),
+        "ratio": round(float(current / baseline), 3),
+        "z": round(float(z), 2) if z is not None else None,
+        "cv": round(float(cv), 3) if cv is not None else None,
     }
 
 
+# (lower bound, label, color) – first match wins
+_COMBINED_LEVELS = [
+    (8.5, "RACE READY 🔥", "#00C853"),
+    (7, "BEREIT 💪", "#00C853"),
+    (5.5, "MODERAT 🟡", "#FFD600"),
+    (4, "MÜDE 😴", "#FF6D00"),
+    (-np.inf, "ERHOLEN 🛋️", "#FF1744"),
+]
+_READINESS_LEVELS = [
+    (8.5, "RACE READY 🔥"),
+    (7, "SOLID 💪"),
+    (5.5, "OK 🙂"),
+    (4, "TIRED 😴"),
+    (-np.inf, "REST DAY 🛋️"),
+]
+_HRV_SCORES = {"green": 10, "yellow": 6, "red": 2, "unknown": 5}
+
+
 def compute_combined_status(
     hrv_status: dict,
     tsb: float,
@@ -109,48 +286,18 @@ def compute_combined_status(
     """
     Kombinierter Readiness-Status aus HRV + TSB + Check-in.
     Gibt label, color, score (0-10) und Erklärung zurück.
+    Ein Tag von combined_status_arrays – die Schwellen stehen nur dort.
     """
-    scores = []
-
-    # HRV: green=10, yellow=6, red=2, unknown=5
-    hrv_score = {"green": 10, "yellow": 6, "red": 2, "unknown": 5}.get(hrv_status.get("status", "unknown"), 5)
-    scores.append(("HRV", hrv_score))
-
-    # TSB: >10=10, 0-10=8, -10-0=5, <-10=2
-    if tsb > 10:
-        tsb_score = 10
-    elif tsb >= 0:
-        tsb_score = 8
-    elif tsb >= -10:
-        tsb_score = 5
-    else:
-        tsb_score = 2
-    scores.append(("TSB", tsb_score))
-
-    # Check-in (falls vorhanden)
+    checkin_score = compute_readiness(checkin)[0] if checkin else np.nan
+    status = combined_status_arrays([hrv_status.get("status", "unknown")], [tsb], [checkin_score])
+    # HRV- und TSB-Punkte sind ganze Zahlen, der Check-in ein Mittelwert
+    components = {"HRV": int(status["hrv"][0]), "TSB": int(status["tsb"][0])}
     if checkin:
-        checkin_score, _ = compute_readiness(checkin)
-        scores.append(("Check-in", checkin_score))
-
-    total = sum(s for _, s in scores) / len(scores)
-
-    if total >= 8.5:
-        label, color = "RACE READY 🔥", "#00C853"
-    elif total >= 7:
-        label, color = "BEREIT 💪", "#00C853"
-    elif total >= 5.5:
-        label, color = "MODERAT 🟡", "#FFD600"
-    elif total >= 4:
-        label, color = "MÜDE 😴", "#FF6D00"
-    else:
-        label, color = "ERHOLEN 🛋️", "#FF1744"
-
-    components = {name: round(s, 1) for name, s in scores}
-
+        components["Check-in"] = round(checkin_score, 1)
     return {
-        "label": label,
-        "color": color,
-        "score": round(total, 1),
+        "label": str(status["label"][0]),
+        "color": str(status["color"][0]),
+        "score": float(status["score"][0]),
         "components": components,
     }
 
@@ -169,19 +316,52 @@ def compute_readiness(checkin_row: dict) -> tuple[float, str]:
         checkin_row.get("mental", 5),
     ]
     score = round(sum(values) / len(values), 1)
+    label = next(label for limit, label in _READINESS_LEVELS if score >= limit)
+    return score, label
 
-    if score >= 8.5:
-        label = "RACE READY 🔥"
-    elif score >= 7:
-        label = "SOLID 💪"
-    elif score >= 5.5:
-        label = "OK 🙂"
-    elif score >= 4:
-        label = "TIRED 😴"
-    else:
-        label = "REST DAY 🛋️"
 
-    return score, label
+def readiness_labels(scores) -> np.ndarray:
+    """compute_readiness labels for an array of check-in scores ("" where NaN)."""
+    scores = np.asarray(scores, dtype=float)
+    labels = np.select([scores >= limit for limit, _ in _READINESS_LEVELS], [label for _, label in _READINESS_LEVELS], "")
+    return np.where(np.isnan(scores), "", labels)
+
+
+def combined_status_arrays(hrv_status, tsb, checkin_score) -> dict[str, np.ndarray]:
+    """
+    compute_combined_status over aligned arrays – HRV status strings, TSB and
+    check-in scores (NaN on days without check-in). Returns score, label,
+    color and the HRV / TSB component scores, one entry per day.
+    """
+    hrv_status = np.asarray(hrv_status, dtype=object)
+    tsb = np.asarray(tsb, dtype=float)
+    checkin = np.asarray(checkin_score, dtype=float)
+    hrv = np.select([hrv_status == k for k in _HRV_SCORES], list(_HRV_SCORES.values()), 5).astype(float)
+    tsb_score = np.select([tsb > 10, tsb >= 0, tsb >= -10], [10.0, 8.0, 5.0], 2.0)
+    has_checkin = ~np.isnan(checkin)
+    total = (hrv + tsb_score + np.where(has_checkin, checkin, 0.0)) / np.where(has_checkin, 3, 2)
+    levels = [total >= limit for limit, _, _ in _COMBINED_LEVELS]
+    return {
+        "score": np.round(total, 1),
+        "label": np.select(levels, [label for _, label, _ in _COMBINED_LEVELS], ""),
+        "color": np.select(levels, [color for _, _, color in _COMBINED_LEVELS], ""),
+        "hrv": hrv,
+        "tsb": tsb_score,
+    }
+
+
+_READINESS_FIELDS = ["Schlaf", "Energie", "Gesundheit", "Muskeln", "Ernahrung", "Mental"]
+
+
+def readiness_scores(df_checkins: pd.DataFrame) -> pd.Series:
+    """compute_readiness score for every check-in row (missing fields count as 5), indexed like the frame."""
+    if df_checkins.empty:
+        return pd.Series(dtype=float)
+    values = pd.DataFrame({
+        col: pd.to_numeric(df_checkins[col], errors="coerce") if col in df_checkins.columns else np.nan
+        for col in _READINESS_FIELDS
+    }, index=df_checkins.index)
+    return values.fillna(5.0).mean(axis=1).round(1)
 
 
 def compute_training_distribution(df_act: pd.DataFrame, ftp: float) -> dict:
@@ -208,3 +388,61 @@ def compute_training_distribution(df_act: pd.DataFrame, ftp: float) -> dict:
         "SweetSpot": round(sweet / total * 100),
         "HighIntensity": round(high / total * 100),
     }
+
+
+HR_ZONE_COLUMNS = [f"hrTimeInZone_{z}" for z in range(1, 6)]
+
+
+def weekly_zone_seconds(df_act: pd.DataFrame) -> pd.DataFrame:
+    """
+    Seconds in HR zones 1–5 per ISO week (Week = its Monday) and sportType,
+    summed in one np.add.at over the zone matrix. Unlike
+    compute_training_distribution every activity counts with its duration.
+    """
+    out_cols = ["Week", "sportType", *HR_ZONE_COLUMNS]
+    present = [c for c in HR_ZONE_COLUMNS if c in df_act.columns]
+    if df_act.empty or not present:
+        return pd.DataFrame(columns=out_cols)
+    zones = np.column_stack([
+        pd.to_numeric(df_act[c], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+        if c in df_act.columns else np.zeros(len(df_act))
+        for c in HR_ZONE_COLUMNS
+    ])
+    dates = pd.to_datetime(df_act["Date"]).dt.normalize()
+    week = dates - pd.to_timedelta(dates.dt.dayofweek, unit="D")
+    sport = (df_act["sportType"].astype(object).fillna("unknown").astype(str)
+             if "sportType" in df_act.columns else pd.Series("unknown", index=df_act.index))
+    codes, keys = pd.MultiIndex.from_arrays([week, sport]).factorize()
+    sums = np.zeros((len(keys), len(HR_ZONE_COLUMNS)))
+    np.add.at(sums, codes, zones)
+    out = pd.DataFrame(sums, columns=HR_ZONE_COLUMNS)
+    out.insert(0, "Week", keys.get_level_values(0))
+    out.insert(1, "sportType", keys.get_level_values(1))
+    out = out[sums.sum(axis=1) > 0]
+    return out.sort_values(["Week", "sportType"], kind="stable").reset_index(drop=True)
+
+
+def weekly_polarization(weekly: pd.DataFrame) -> pd.DataFrame:
+    """
+    Week, hours and the three-zone split low (Z1+Z2) / moderate (Z3) / high (Z4+Z5)
+    in percent per week of weekly_zone_seconds (all sports summed), plus the
+    polarization index log10(low / moderate · high · 100) of Treff et al. 2019
+    with fractions – moderate floored at 0.01, NaN without high-intensity time.
+    """
+    cols = ["Week", "hours", "low", "moderate", "high", "polarization_index"]
+    if weekly.empty:
+        return pd.DataFrame(columns=cols)
+    per_week = weekly.groupby("Week")[HR_ZONE_COLUMNS].sum()
+    z = per_week.to_numpy()
+    total = z.sum(axis=1)
+    low, moderate, high = (z[:, 0] + z[:, 1]) / total, z[:, 2] / total, (z[:, 3] + z[:, 4]) / total
+    with np.errstate(divide="ignore"):
+        index = np.where((high > 0) & (low > 0), np.log10(low / np.maximum(moderate, 0.01) * high * 100), np.nan)
+    return pd.DataFrame({
+        "Week": per_week.index,
+        "hours": np.round(total / 3600, 1),
+        "low": np.round(low * 100, 1),
+        "moderate": np.round(moderate * 100, 1),
+        "high": np.round(high * 100, 1),
+        "polarization_index": np.round(index, 2),
+    })
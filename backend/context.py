@@ -0,0 +1,186 @@
+"""
+Request-scoped user data.
+
+UserData wraps the current user and loads or computes every piece an endpoint
+may need – frames, FTP, PMC values, HRV status, check-in – on first access and
+at most once per request. While the nightly batch snapshot is current (same
+day and data version), FTP, load, weekly load, training distribution,
+baselines and HRV status are read from it instead. Handlers get it through the get_user_data
+dependency (FastAPI resolves a dependency once per request, so helpers that
+depend on it share the instance); endpoints that combine several views
+(/api/home) and ask_coach read everything from the same instance, so no file
+is parsed and no FTP or PMC computed twice.
+
+check_etag answers conditional GETs from the per-user data version before
+the handler (and with it any file load) runs; CachedResponse serves the
+serialized body from response_cache when the same user asked for the same
+path and query on this data version and day before.
+"""
+from functools import cached_property
+
+import pandas as pd
+from fastapi import Depends, HTTPException, Request, Response
+
+from . import baselines
+from . import batch
+from . import calculations as calc
+from . import daily_metrics
+from . import data_manager as dm
+from . import data_version
+from . import fast_json
+from . import response_cache
+from . import pmc
+from .auth import get_current_user
+from .database import User
+
+# get_checkin_recent looks back this far – the coach uses it, today's check-in is a slice of it
+CHECKIN_RECENT_DAYS = 2
+
+
+class UserData:
+    def __init__(self, user: User):
+        self.user = user
+        self.uid = user.id
+        self._windows: dict = {}
+
+    @cached_property
+    def activities(self) -> pd.DataFrame:
+        """All activities (tombstones removed)."""
+        return dm.load_activities(self.uid)
+
+    def recent_activities(self, days: int) -> pd.DataFrame:
+        """Activities of the last `days` days – a slice of activities if that is loaded already, else a tail read."""
+        since = pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
+        if "activities" in self.__dict__:
+            df = self.activities
+            return df[df["Date"] >= since] if "Date" in df.columns else df
+        return dm.load_activities(self.uid, since=since)
+
+    @cached_property
+    def stats(self) -> pd.DataFrame:
+        """All Garmin daily stats."""
+        return dm.load_stats(self.uid)
+
+    @cached_property
+    def checkins(self) -> pd.DataFrame:
+        """All check-ins (journal folded in)."""
+        return dm.load_checkins(self.uid)
+
+    @cached_property
+    def _recent_checkins(self) -> pd.DataFrame:
+        since = pd.Timestamp.now().normalize() - pd.Timedelta(days=CHECKIN_RECENT_DAYS)
+        if "checkins" in self.__dict__:
+            df = self.checkins
+            return df[df["Date"] >= since] if "Date" in df.columns else df
+        return dm.load_checkins(self.uid, since=since)
+
+    @cached_property
+    def checkin_today(self) -> dict | None:
+        return dm.get_checkin_today(self.uid, df=self._recent_checkins)
+
+    @cached_property
+    def checkin_recent(self) -> dict | None:
+        """Latest check-in of the last CHECKIN_RECENT_DAYS days (coach context)."""
+        return dm.get_checkin_recent(self.uid, CHECKIN_RECENT_DAYS, df=self._recent_checkins)
+
+    @cached_property
+    def snapshot(self) -> dict | None:
+        """Tonight's batch results (batch.snapshot) while nothing changed since – else None."""
+        return batch.snapshot(self.uid)
+
+    @cached_property
+    def ftp(self) -> float:
+        """Manual override from the profile, else the rolling FTP."""
+        if self.user.ftp_override:
+            return self.user.ftp_override
+        if self.snapshot is not None and calc.env_ftp_override() is None:
+            return self.snapshot["rolling_ftp"]
+        return pmc.latest_ftp(self.uid)
+
+    @property
+    def ftp_target(self) -> int:
+        return self.user.ftp_target or 250
+
+    @cached_property
+    def load(self) -> dict:
+        """Today's CTL/ATL/TSB."""
+        if self.snapshot is not None:
+            return self.snapshot["load"]
+        return pmc.latest(self.uid)
+
+    @cached_property
+    def weekly_load(self) -> float:
+        if self.snapshot is not None:
+            return self.snapshot["weekly_load"]
+        return calc.compute_weekly_load(self.recent_activities(7))
+
+    @cached_property
+    def training_distribution(self) -> dict:
+        """Zone 2 / Sweet Spot / High Intensity shares of all activities at the current FTP."""
+        if self.snapshot is not None and self.snapshot["ftp"] == self.ftp:
+            return self.snapshot["training_distribution"]
+        return calc.compute_training_distribution(self.activities, self.ftp)
+
+    @cached_property
+    def baselines(self) -> dict:
+        """Latest HRV / RHR / sleep readings with their rolling baselines."""
+        if self.snapshot is not None:
+            return self.snapshot["baselines"]
+        return baselines.latest(self.uid)
+
+    @cached_property
+    def hrv_status(self) -> dict:
+        if self.snapshot is not None:
+            return self.snapshot["hrv"]
+        return baselines.hrv_status(self.uid, self.baselines)
+
+    def daily(self, since=None, columns: list[str] | None = None) -> pd.DataFrame:
+        """daily_metrics.window, memoized per (since, columns)."""
+        key = (None if since is None else pd.Timestamp(since), tuple(columns) if columns else None)
+        if key not in self._windows:
+            self._windows[key] = daily_metrics.window(self.uid, since=since, columns=columns)
+        return self._windows[key]
+
+    def latest(self, column: str) -> float | None:
+        """Last non-empty value of a daily metrics column."""
+        return daily_metrics.latest(self.uid, column)
+
+
+def get_user_data(current_user: User = Depends(get_current_user)) -> UserData:
+    return UserData(current_user)
+
+
+def check_etag(request: Request, response: Response, current_user: User = Depends(get_current_user)) -> None:
+    """
+    Route dependency: ETag from data_version for this user, path and query.
+    A matching If-None-Match ends the request with 304 before any data is loaded.
+    """
+    tag = data_version.etag(current_user.id, request.url.path, request.url.query)
+    headers = {"ETag": tag, "Cache-Control": "private, no-cache"}
+    sent = request.headers.get("if-none-match", "")
+    if sent.strip() == "*" or tag in (t.strip() for t in sent.split(",")):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+class CachedResponse:
+    """
+    Route dependency for read endpoints: respond(build) returns the cached
+    JSON body, or calls build() and caches its fast_json encoding. Version and
+    day are taken before build() loads anything, so a write during the build
+    only costs a miss on the next request.
+    """
+
+    def __init__(self, request: Request, response: Response, current_user: User = Depends(get_current_user)):
+        self.key = (current_user.id, request.url.path, request.url.query)
+        self.version = data_version.current(current_user.id)
+        self.day = response_cache.today()
+        self._response = response
+
+    def respond(self, build) -> Response:
+        body = response_cache.get(*self.key, self.version, self.day)
+        if body is None:
+            body = fast_json.dumps(build())
+            response_cache.put(*self.key, self.version, self.day, body)
+        # A returned Response does not pick up headers set by dependencies (ETag) – carry them over
+        return fast_json.FastJSONResponse(body, headers=dict(self._response.headers))
@@ -0,0 +1,187 @@
+"""
+Materialized daily metrics per user – one row per date joining training load
+(TSS, CTL/ATL/TSB), sleep score, RHR, HRV, steps, VO2max and check-in readiness.
+
+Chart endpoints read date slices of this table instead of filtering and
+re-sorting the raw frames on every request. The table is joined from one block
+per source (activities via pmc, stats, check-ins). Every write through
+data_manager/writer marks the block of the written file stale, and reads also
+compare file signatures so edits from outside the backend are picked up; only
+stale blocks are rebuilt before the blocks are re-joined.
+"""
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from . import calculations as calc
+from . import data_manager as dm
+from . import pmc
+from .user_state import UserLocks
+
+# Memory budget for the materialized tables of all users
+DAILY_TABLE_MB = float(os.getenv("DAILY_TABLE_MB", "16"))
+
+LOAD_COLUMNS = ["TSS", "CTL", "ATL", "TSB"]
+_STATS_COLUMNS = {
+    "Sleep Score": "sleep_score",
+    "RHR": "rhr",
+    "HRV Avg": "hrv",
+    "Steps": "steps",
+    "VO2 Max": "vo2max",
+}
+COLUMNS = [*LOAD_COLUMNS, *_STATS_COLUMNS.values(), "readiness"]
+
+
+def _activities_block(user_id: int | None) -> pd.DataFrame:
+    return pmc.history(user_id)
+
+
+def _stats_block(user_id: int | None) -> pd.DataFrame:
+    df = dm.load_stats(user_id, columns=list(_STATS_COLUMNS))
+    if df.empty or "Date" not in df.columns:
+        return pd.DataFrame(columns=list(_STATS_COLUMNS.values()), index=pd.DatetimeIndex([], name="Date"))
+    out = pd.DataFrame({
+        name: pd.to_numeric(df[col], errors="coerce") if col in df.columns else np.nan
+        for col, name in _STATS_COLUMNS.items()
+    }, index=df.index)
+    out.index = pd.DatetimeIndex(df["Date"].dt.normalize(), name="Date")
+    return out[~out.index.duplicated(keep="last")]
+
+
+def _checkins_block(user_id: int | None) -> pd.DataFrame:
+    df = dm.load_checkins(user_id)
+    if df.empty or "Date" not in df.columns:
+        return pd.DataFrame(columns=["readiness"], index=pd.DatetimeIndex([], name="Date"))
+    out = pd.DataFrame({"readiness": calc.readiness_scores(df).to_numpy()},
+                       index=pd.DatetimeIndex(df["Date"].dt.normalize(), name="Date"))
+    return out[~out.index.duplicated(keep="last")]
+
+
+_BLOCKS = {
+    "activities": _activities_block,
+    "stats": _stats_block,
+    "checkins": _checkins_block,
+}
+
+
+class _Table:
+    def __init__(self):
+        self.blocks: dict = {}      # kind -> (signature, frame indexed by Date)
+        self.frame: pd.DataFrame | None = None
+        self.nbytes = 0
+
+
+_tables: OrderedDict = OrderedDict()    # user_id -> _Table, least recently used first
+_locks = UserLocks(hits=0, block_builds=0, joins=0, evictions=0)
+_guard = _locks.guard
+_counters = _locks.counters
+
+
+@dm.on_invalidate
+def _mark_stale(user_id: int | None, kind: str | None) -> None:
+    with _guard:
+        table = _tables.get(user_id)
+        if table is None:
+            return
+        for k in ([kind] if kind in _BLOCKS else list(_BLOCKS) if kind is None else []):
+            table.blocks.pop(k, None)
+
+
+def _block_signature(user_id: int | None, kind: str) -> tuple:
+    sig = dm.data_signature(user_id, kind)
+    if kind == "activities":
+        # CTL/ATL decay into every new day, so the load block also depends on today
+        return sig, pd.Timestamp.now().normalize()
+    return sig
+
+
+def _join(blocks: list[pd.DataFrame]) -> pd.DataFrame:
+    frame = pd.concat(blocks, axis=1, sort=True)
+    frame = frame.reindex(columns=[c for c in COLUMNS if c != "TSB"])
+    if not len(frame):
+        frame.index = pd.DatetimeIndex([], name="Date")
+    else:
+        today = pd.Timestamp.now().normalize()
+        frame = frame.reindex(pd.date_range(frame.index.min(), max(frame.index.max(), today),
+                                            freq="D", name="Date"))
+    # No training load before the first activity
+    frame[["TSS", "CTL", "ATL"]] = frame[["TSS", "CTL", "ATL"]].fillna(0.0)
+    frame.insert(3, "TSB", frame["CTL"] - frame["ATL"])
+    return frame.astype(float)
+
+
+def _current(user_id: int | None) -> pd.DataFrame:
+    """The user's table, with stale blocks rebuilt. Treat as read-only."""
+    with _locks.lock(user_id):
+        with _guard:
+            table = _tables.get(user_id)
+            if table is None:
+                table = _tables[user_id] = _Table()
+            _tables.move_to_end(user_id)
+        rebuilt = False
+        blocks = []
+        for kind, build in _BLOCKS.items():
+            sig = _block_signature(user_id, kind)
+            cached = table.blocks.get(kind)
+            if cached is None or cached[0] != sig:
+                cached = table.blocks[kind] = (sig, build(user_id))
+                _counters["block_builds"] += 1
+                rebuilt = True
+            blocks.append(cached[1])
+        if rebuilt or table.frame is None:
+            table.frame = _join(blocks)
+            table.nbytes = int(table.frame.memory_usage(index=True).sum())
+            _counters["joins"] += 1
+        else:
+            _counters["hits"] += 1
+        frame = table.frame
+    _evict()
+    return frame
+
+
+def _evict() -> None:
+    budget = DAILY_TABLE_MB * 1024 * 1024
+    with _guard:
+        while len(_tables) > 1 and sum(t.nbytes for t in _tables.values()) > budget:
+            _tables.popitem(last=False)
+            _counters["evictions"] += 1
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+
+def window(user_id: int | None, since=None, until=None, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Rows dated within [since, until] (inclusive, until defaults to today) with a
+    Date column. With since given every day of the window is present – days
+    before the history starts carry zero load and no other values.
+    """
+    frame = _current(user_id)
+    cols = COLUMNS if columns is None else columns
+    if since is None:
+        out = frame.loc[:until, cols] if until is not None else frame[cols]
+    else:
+        since = pd.Timestamp(since).normalize()
+        until = pd.Timestamp.now().normalize() if until is None else pd.Timestamp(until).normalize()
+        out = frame.loc[since:until, cols].reindex(pd.date_range(since, until, freq="D", name="Date"))
+        load = [c for c in cols if c in LOAD_COLUMNS]
+        out[load] = out[load].fillna(0.0)
+    return out.reset_index()
+
+
+def latest(user_id: int | None, column: str) -> float | None:
+    """Last non-empty value of a column – metrics are not recorded every day."""
+    values = _current(user_id)[column]
+    idx = values.last_valid_index()
+    return None if idx is None else float(values[idx])
+
+
+def stats() -> dict:
+    with _guard:
+        return {
+            "users": len(_tables),
+            "bytes": sum(t.nbytes for t in _tables.values()),
+            "budget_bytes": int(DAILY_TABLE_MB * 1024 * 1024),
+            **_counters,
+        }
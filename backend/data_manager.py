@@ -3,21 +3,44 @@ CSV read/write operations – single source of truth for file access.
 """
 import os
 import io
+import csv
+import gzip
 import json
+import threading
+import zipfile
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 from datetime import datetime, date
 from dotenv import load_dotenv
 
+from . import date_index, schema, writer
+from .schema import SCHEMAS
+
 load_dotenv()
 
 _SAVE_PATH = os.getenv("SAVE_PATH", os.path.expanduser("~/Documents/AI_Fitness-main"))
 
+# Budget for parsed frames kept in memory across requests (Fly VM has 512 MB total)
+FRAME_CACHE_MB = float(os.getenv("FRAME_CACHE_MB", "64"))
+# Store cached frames compact (narrow numerics, category text) – see compact_frame()
+COMPACT_FRAMES = os.getenv("COMPACT_FRAMES", "1") != "0"
+
 # Legacy single-user paths (für Streamlit Kompatibilität)
 FILE_STATS = os.path.join(_SAVE_PATH, "garmin_stats.csv")
 FILE_ACT = os.path.join(_SAVE_PATH, "garmin_activities.csv")
 FILE_CHECKIN = os.path.join(_SAVE_PATH, "daily_checkin.csv")
 
 
+# ── Tombstones ───────────────────────────────────────────────────────────────
+# Deleted activities are remembered in deleted_activities.json so syncs do not
+# restore them. Entries always carry date + name and the activityId when it was
+# known (older files only have date + name). Per user the file is held in memory
+# as sorted key arrays and applied to frames as a vectorized anti-join.
+
+_TOMB_SEP = "\x1f"
+
+
 def _blacklist_path(user_id: int | None) -> str:
     if user_id is None:
         return os.path.join(_SAVE_PATH, "deleted_activities.json")
@@ -26,30 +49,127 @@ def _blacklist_path(user_id: int | None) -> str:
     return os.path.join(base, "deleted_activities.json")
 
 
+def _tomb_keys(dates, names) -> np.ndarray:
+    """'YYYY-MM-DD<sep>name' keys for date/name sequences."""
+    dates = pd.Series(np.asarray(dates, dtype=object), dtype="string").fillna("")
+    names = pd.Series(np.asarray(names, dtype=object), dtype="string").fillna("")
+    return (dates.str.slice(0, 10) + _TOMB_SEP + names).to_numpy(dtype=str)
+
+
+def _tomb_ids(ids) -> np.ndarray:
+    # IDs come back as floats when an older CSV had gaps in the column
+    ids = pd.Series(np.asarray(ids, dtype=object), dtype="string").fillna("").str.replace(r"\.0$", "", regex=True)
+    return ids.to_numpy(dtype=str)
+
+
+def _sorted_isin(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    if not len(sorted_values) or not len(values):
+        return np.zeros(len(values), dtype=bool)
+    pos = np.searchsorted(sorted_values, values)
+    pos[pos == len(sorted_values)] = 0
+    return sorted_values[pos] == values
+
+
+class _Tombstones:
+    def __init__(self, entries: list[dict]):
+        self.entries = entries
+        ids = _tomb_ids([e.get("activityId") for e in entries])
+        self.ids = np.unique(ids[ids != ""])
+        self.keys = np.unique(_tomb_keys([e.get("date") for e in entries], [e.get("name") for e in entries]))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def mask(self, dates, names, ids=None) -> np.ndarray:
+        """True for every row matching a tombstone by activityId or by date + name."""
+        hit = _sorted_isin(self.keys, _tomb_keys(dates, names))
+        if ids is not None and len(self.ids):
+            hit |= _sorted_isin(self.ids, _tomb_ids(ids))
+        return hit
+
+    def frame_mask(self, df: pd.DataFrame) -> np.ndarray:
+        if df.empty or "Date" not in df.columns or "activityName" not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        dates = df["Date"]
+        if pd.api.types.is_datetime64_any_dtype(dates):
+            dates = dates.dt.strftime("%Y-%m-%d")
+        return self.mask(dates, df["activityName"], df["activityId"] if "activityId" in df.columns else None)
+
+
+_tombstone_cache: dict = {}
+_tombstone_guard = threading.Lock()
+
+
+def _tombstones(user_id: int | None) -> _Tombstones:
+    path = _blacklist_path(user_id)
+    sig = _file_signature(path)
+    with _tombstone_guard:
+        hit = _tombstone_cache.get(user_id)
+        if hit is not None and hit[0] == sig:
+            return hit[1]
+    entries = []
+    if sig[0] is not None:
+        try:
+            with open(path) as f:
+                entries = [e for e in json.load(f) if isinstance(e, dict)]
+        except Exception:
+            entries = []
+    index = _Tombstones(entries)
+    with _tombstone_guard:
+        _tombstone_cache[user_id] = (sig, index)
+    return index
+
+
 def load_blacklist(user_id: int | None = None) -> set[tuple[str, str]]:
     """Returns a set of (date_str, name) tuples for deleted activities."""
+    return {(e.get("date"), e.get("name")) for e in _tombstones(user_id).entries}
+
+
+def filter_tombstoned(df: pd.DataFrame, user_id: int | None = None) -> pd.DataFrame:
+    """Drop activity rows the user deleted (anti-join against the tombstone index)."""
+    tombstones = _tombstones(user_id)
+    if not len(tombstones) or df.empty:
+        return df
+    mask = tombstones.frame_mask(df)
+    return df[~mask] if mask.any() else df
+
+
+def tombstone_mask(user_id: int | None, dates, names, ids=None) -> np.ndarray:
+    """Vectorized membership test for raw rows (e.g. sync rows before they are written)."""
+    return _tombstones(user_id).mask(dates, names, ids)
+
+
+def _add_tombstones(entries: list[dict], user_id: int | None) -> None:
+    """Record many tombstones with a single rewrite of the file. Caller holds the user lock."""
     path = _blacklist_path(user_id)
-    if not os.path.exists(path):
-        return set()
-    try:
-        with open(path) as f:
-            data = json.load(f)
-        return {(e["date"], e["name"]) for e in data}
-    except Exception:
-        return set()
+    current = list(_tombstones(user_id).entries)
+    seen = {(e.get("date"), e.get("name"), e.get("activityId")) for e in current}
+    for e in entries:
+        entry = {"date": e.get("date"), "name": e.get("name")}
+        if e.get("activityId"):
+            entry["activityId"] = str(e["activityId"])
+        key = (entry["date"], entry["name"], entry.get("activityId"))
+        if key not in seen:
+            seen.add(key)
+            current.append(entry)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(current, f)
+    os.replace(tmp, path)
 
 
 def _add_to_blacklist(date_str: str, name: str, user_id: int | None) -> None:
-    path = _blacklist_path(user_id)
-    try:
-        with open(path) as f:
-            data = json.load(f)
-    except Exception:
-        data = []
-    if not any(e["date"] == date_str and e["name"] == name for e in data):
-        data.append({"date": date_str, "name": name})
-    with open(path, "w") as f:
-        json.dump(data, f)
+    with _user_lock(user_id):
+        _add_tombstones([{"date": date_str, "name": name}], user_id)
+
+
+def user_path(user_id: int | None, filename: str) -> str:
+    """Path of a per-user file (derived state, caches) next to the user's CSVs."""
+    if user_id is None:
+        return os.path.join(_SAVE_PATH, filename)
+    base = os.path.join(_SAVE_PATH, "users", str(user_id))
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, filename)
 
 
 def _user_files(user_id: int | None) -> tuple[str, str, str]:
@@ -64,49 +184,505 @@ def _user_files(user_id: int | None) -> tuple[str, str, str]:
         os.path.join(base, "daily_checkin.csv"),
     )
 
-# Column aliases: Garmin exports can be English or German
-_ACT_COL_MAP = {
-    "Training Load": "activityTrainingLoad",
-    "Norm. Power": "normPower",
-    "Avg HR": "averageHR",
-    "Distance": "distance",
-    "Avg Cadence": "avgCadence",
-    "Activity Name": "activityName",
-}
-_STATS_COL_MAP = {
-    "Sleep Score": "Sleep Score",
-    "Resting HR": "RHR",
-    "HRV": "HRV Avg",
-}
-
-
-def _read_csv_safe(path: str) -> pd.DataFrame:
+def _file_signature(*paths: str) -> tuple:
+    """(mtime_ns, size) per path – None for missing files. Changes whenever a file is rewritten."""
+    sig = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            sig.append(None)
+    return tuple(sig)
+
+
+class _FrameCache:
+    """
+    Process-wide LRU cache of parsed frames, keyed by (user_id, kind).
+    Each entry remembers the file signature it was built from, so files written
+    outside the backend (legacy scripts, manual edits) are picked up as well.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._entries: OrderedDict = OrderedDict()   # key -> (signature, df, nbytes, wide_nbytes)
+        self._bytes = 0
+        self._wide_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, signature: tuple) -> pd.DataFrame | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, signature: tuple, df: pd.DataFrame, wide_nbytes: int | None = None) -> None:
+        """wide_nbytes: size of the frame before compaction, for the bytes-saved counter."""
+        nbytes = frame_bytes(df)
+        wide_nbytes = nbytes if wide_nbytes is None else wide_nbytes
+        with self._lock:
+            self._drop(key)
+            if nbytes > self.budget_bytes:
+                return
+            self._entries[key] = (signature, df, nbytes, wide_nbytes)
+            self._bytes += nbytes
+            self._wide_bytes += wide_nbytes
+            while self._bytes > self.budget_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def invalidate(self, user_id: int | None, kind: str | None = None) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id and (kind is None or k[1] == kind)]:
+                self._drop(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._wide_bytes = 0
+
+    def bytes_by_user(self) -> dict:
+        """Bytes held per user_id, split by kind."""
+        with self._lock:
+            out: dict = {}
+            for (user_id, kind), entry in self._entries.items():
+                out.setdefault(user_id, {})[kind] = entry[2]
+            return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "users": len({k[0] for k in self._entries}),
+                "bytes": self._bytes,
+                "bytes_saved": self._wide_bytes - self._bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+            self._wide_bytes -= entry[3]
+
+
+_frame_cache = _FrameCache(int(FRAME_CACHE_MB * 1024 * 1024))
+
+
+_invalidate_hooks: list = []
+
+
+def on_invalidate(fn):
+    """Register fn(user_id, kind) to be called whenever a user's data file was written."""
+    _invalidate_hooks.append(fn)
+    return fn
+
+
+def invalidate_cache(user_id: int | None = None, kind: str | None = None) -> None:
+    """Drop cached frames for a user – every writer calls this after touching a file."""
+    _frame_cache.invalidate(user_id, kind)
+    for fn in _invalidate_hooks:
+        fn(user_id, kind)
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters and memory held by the frame cache."""
+    return _frame_cache.stats()
+
+
+def user_memory(user_id: int | None) -> dict:
+    """Bytes of parsed frames the cache holds for one user, per kind and in total."""
+    held = _frame_cache.bytes_by_user().get(user_id, {})
+    return {"bytes": sum(held.values()), "kinds": held}
+
+
+def _cached(user_id: int | None, kind: str, paths: tuple, build, compact: bool = False) -> pd.DataFrame:
+    """Return a copy of the cached frame for (user_id, kind), rebuilding it when any path changed."""
+    key = (user_id, kind)
+    signature = _file_signature(*paths)
+    df = _frame_cache.get(key, signature)
+    if df is None:
+        df = build()
+        if COMPACT_FRAMES:
+            wide_nbytes = frame_bytes(df)
+            df = compact_frame(df, kind)
+            _frame_cache.put(key, signature, df, wide_nbytes)
+        else:
+            _frame_cache.put(key, signature, df)
+    # Callers are free to mutate what they get back
+    return _as_requested(df, kind, compact)
+
+
+# ── Compact frames ───────────────────────────────────────────────────────────
+# Activity frames carry ~38 float64/object columns, most of them whole numbers
+# (seconds, bpm, watts, steps) or a handful of repeated labels (sportType,
+# trainingEffectLabel, HRV Status). Compact frames store those as int16/float32
+# and category. Downcasts are lossless – a column is only narrowed when every
+# value survives the round trip – so expand_frame() gives back exactly the
+# values of a normal load.
+
+_CATEGORY_MAX_RATIO = 0.5       # category only pays off when values repeat
+_INT16 = np.iinfo(np.int16)
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _narrow_float(values: np.ndarray) -> str | None:
+    nan = np.isnan(values)
+    if not nan.any() and len(values):
+        if (values == np.round(values)).all() and values.min() >= _INT16.min and values.max() <= _INT16.max:
+            return "int16"
+    if np.array_equal(values.astype(np.float32).astype(np.float64), values, equal_nan=True):
+        return "float32"
+    return None
+
+
+def compact_frame(df: pd.DataFrame, kind: str | None = None) -> pd.DataFrame:
+    """
+    Memory-optimised copy of a loaded frame. Schema numeric columns become int16
+    or float32 where that holds every value exactly, schema text columns with
+    repeated values become category. Columns outside the schema are kept as is.
+    """
+    file_schema = SCHEMAS.get(kind)
+    if file_schema is None or df.empty:
+        return df.copy()
+    narrow = {}
+    for col in df.columns.unique():
+        spec = file_schema.by_name.get(col)
+        if spec is None or isinstance(df[col], pd.DataFrame):
+            continue
+        s = df[col]
+        if spec.dtype == schema.FLOAT and s.dtype == np.float64:
+            dtype = _narrow_float(s.to_numpy())
+            if dtype is not None:
+                narrow[col] = dtype
+        elif spec.dtype == schema.STRING and (s.dtype == object or isinstance(s.dtype, pd.StringDtype)):
+            if s.nunique(dropna=True) <= len(s) * _CATEGORY_MAX_RATIO:
+                narrow[col] = "category"
+    return df.astype(narrow) if narrow else df.copy()
+
+
+def expand_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of a compact frame with the dtypes of a normal load (float64, object/string)."""
+    wide = {}
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            wide[col] = dtype.categories.dtype
+        elif dtype == np.int16 or dtype == np.float32:
+            wide[col] = np.float64
+    return df.astype(wide) if wide else df.copy()
+
+
+def _as_requested(df: pd.DataFrame, kind: str, compact: bool) -> pd.DataFrame:
+    """Fresh copy of a (possibly compact) frame in the representation the caller asked for."""
+    if compact:
+        return df.copy() if COMPACT_FRAMES else compact_frame(df, kind)
+    return expand_frame(df) if COMPACT_FRAMES else df.copy()
+
+
+def _kind_paths(user_id: int | None, kind: str) -> tuple[str, tuple]:
+    """(CSV path, side files a load_<kind> result also depends on)."""
+    stats_path, act_path, checkin_path = _user_files(user_id)
+    if kind == "stats":
+        return stats_path, ()
+    if kind == "activities":
+        return act_path, (_blacklist_path(user_id),)
+    if kind == "checkins":
+        return checkin_path, tuple(_journal_paths(user_id))
+    raise ValueError(f"Unknown data kind: {kind}")
+
+
+def data_signature(user_id: int | None, kind: str) -> tuple:
+    """File signature of everything a load_<kind> result depends on."""
+    path, side = _kind_paths(user_id, kind)
+    return _file_signature(path, *side)
+
+
+def data_mark(user_id: int | None, kind: str) -> dict | None:
+    """
+    High-water mark of the kind's data (date_index.mark of the CSV plus the side
+    files' signature) for appended_since – take it before loading. None if the
+    CSV cannot be indexed.
+    """
+    path, side = _kind_paths(user_id, kind)
+    file_mark = date_index.mark(path)
+    if file_mark is None:
+        return None
+    return {"file": file_mark, "side": json.loads(json.dumps(_file_signature(*side)))}
+
+
+def appended_since(user_id: int | None, kind: str, mark: dict | None) -> tuple[pd.DatetimeIndex, dict] | None:
+    """
+    Days of the rows appended to the kind's CSV since mark (see data_mark) and
+    the new mark. None when the data changed in any other way – rows rewritten
+    or deleted, tombstones or journal entries added – so the caller rebuilds.
+    """
+    if not mark:
+        return None
+    path, side = _kind_paths(user_id, kind)
+    side_sig = json.loads(json.dumps(_file_signature(*side)))
+    if side_sig != mark.get("side"):
+        return None
+    appended = date_index.appended_since(path, mark.get("file"))
+    if appended is None:
+        return None
+    dates, file_mark = appended
+    return pd.DatetimeIndex(np.unique(dates)), {"file": file_mark, "side": side_sig}
+
+
+def _read_csv_safe(path: str, kind: str | None = None, columns: list[str] | None = None) -> pd.DataFrame:
+    """
+    Parse a data file. For a known kind the schema supplies dtypes and the ISO
+    date format, so pandas skips type inference; files that do not fit (hand-made
+    exports, German column names with odd dates) fall back to the tolerant parse.
+    """
     if not os.path.exists(path):
         return pd.DataFrame()
+    file_schema = SCHEMAS.get(kind)
+    if file_schema is not None:
+        try:
+            df = _read_csv_typed(path, file_schema, columns)
+            if df is not None:
+                return df
+        except (ValueError, TypeError):
+            pass
     try:
-        df = pd.read_csv(path, on_bad_lines="warn")
-        df.rename(columns=_ACT_COL_MAP, inplace=True)
-        df.rename(columns=_STATS_COL_MAP, inplace=True)
-        if "Date" in df.columns:
-            try:
-                df["Date"] = pd.to_datetime(df["Date"], format="mixed", dayfirst=False, errors="coerce")
-            except TypeError:
-                df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-            df.dropna(subset=["Date"], inplace=True)
-            df.sort_values("Date", inplace=True)
-        return df
+        return _read_csv_tolerant(path, file_schema, columns)
     except Exception:
         return pd.DataFrame()
 
 
-def load_stats(user_id: int | None = None) -> pd.DataFrame:
+def _read_csv_typed(source: str | bytes, file_schema, columns: list[str] | None) -> pd.DataFrame | None:
+    """source is a path or the raw bytes of a CSV (header included)."""
+    def _src():
+        return io.BytesIO(source) if isinstance(source, bytes) else source
+    header = pd.read_csv(_src(), nrows=0).columns.tolist()
+    df = pd.read_csv(_src(), on_bad_lines="warn", **file_schema.read_options(header, columns))
+    df.rename(columns=file_schema.aliases, inplace=True)
+    date_col = file_schema.date_column
+    if date_col in df.columns:
+        if df.empty:
+            df[date_col] = pd.to_datetime(df[date_col])
+        elif not pd.api.types.is_datetime64_any_dtype(df[date_col]):
+            return None     # not ISO – let the tolerant parser deal with it
+        df.dropna(subset=[date_col], inplace=True)
+        df.sort_values(date_col, inplace=True)
+    return df
+
+
+# Aliases of all file kinds, for reads where the kind is unknown
+_ALL_ALIASES = {a: c for s in SCHEMAS.values() for a, c in s.aliases.items()}
+
+
+def _read_csv_tolerant(path: str, file_schema, columns: list[str] | None) -> pd.DataFrame:
+    df = pd.read_csv(path, on_bad_lines="warn")
+    df.rename(columns=file_schema.aliases if file_schema else _ALL_ALIASES, inplace=True)
+    if file_schema is not None:
+        if columns is not None:
+            df = df[[c for c in df.columns if c == file_schema.date_column or c in columns]]
+        _coerce_types(df, file_schema)
+    if "Date" in df.columns:
+        df["Date"] = _parse_dates(df["Date"])
+        df.dropna(subset=["Date"], inplace=True)
+        df.sort_values("Date", inplace=True)
+    return df
+
+
+def _coerce_types(df: pd.DataFrame, file_schema) -> None:
+    """Cast schema columns in place; numbers that do not parse become NaN."""
+    for col in df.columns:
+        spec = file_schema.by_name.get(col)
+        if spec is None or spec.dtype == schema.DATE:
+            continue
+        if spec.dtype == schema.FLOAT:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        else:
+            df[col] = df[col].astype(spec.dtype)
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    try:
+        return pd.to_datetime(values, format="mixed", dayfirst=False, errors="coerce")
+    except TypeError:
+        return pd.to_datetime(values, errors="coerce")
+
+
+# ── Parquet store ────────────────────────────────────────────────────────────
+# CSV stays the interchange format (Streamlit dashboard, legacy scripts, uploads).
+# Next to every CSV we keep a typed Parquet copy tagged with the CSV signature
+# it was built from; reads go to Parquet and only re-parse the CSV once it changed.
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:     # Streamlit-only installs
+    pa = pq = None
+
+PARQUET_STORE = pq is not None and os.getenv("PARQUET_STORE", "1") != "0"
+_PARQUET_SIG_KEY = b"skywalker_csv_signature"
+
+
+def _parquet_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def _parquet_is_fresh(pq_path: str, csv_sig: tuple) -> bool:
+    try:
+        meta = pq.read_schema(pq_path).metadata or {}
+    except Exception:
+        return False
+    return meta.get(_PARQUET_SIG_KEY) == json.dumps(csv_sig).encode()
+
+
+def _write_parquet(df: pd.DataFrame, pq_path: str, csv_sig: tuple) -> None:
+    """Persist a typed copy: numbers stay numeric, text becomes string, Date a timestamp."""
+    out = df.copy()
+    for col in out.columns:
+        if out[col].dtype == object:
+            out[col] = out[col].astype("string")
+    try:
+        table = pa.Table.from_pandas(out, preserve_index=False)
+        meta = dict(table.schema.metadata or {})
+        meta[_PARQUET_SIG_KEY] = json.dumps(csv_sig).encode()
+        tmp = pq_path + ".tmp"
+        pq.write_table(table.replace_schema_metadata(meta), tmp)
+        os.replace(tmp, pq_path)
+    except Exception:
+        pass    # Parquet is an accelerator only – the CSV remains authoritative
+
+
+def _read_frame(path: str, kind: str, columns: list[str] | None = None,
+                since=None, until=None) -> pd.DataFrame:
+    """
+    Typed read of a data file. Serves from the Parquet copy when it matches the
+    CSV, migrating the CSV on first access. columns/since/until are pushed down
+    into the Parquet reader so only the requested slice is materialized. While
+    the Parquet copy is stale, windowed reads parse just the lines of the window
+    (located via date_index) and leave the migration to the next full load.
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame()
+
+    if PARQUET_STORE:
+        csv_sig = _file_signature(path)
+        pq_path = _parquet_path(path)
+        if _parquet_is_fresh(pq_path, csv_sig):
+            try:
+                return _read_parquet(pq_path, columns, since, until)
+            except Exception:
+                pass
+
+    if since is not None:
+        df = _read_csv_window(path, kind, columns, since, until)
+        if df is not None:
+            return df
+
+    if not PARQUET_STORE:
+        return _slice(_read_csv_safe(path, kind, columns), columns, since, until)
+
+    df = _read_csv_safe(path, kind)
+    if not df.empty:
+        _write_parquet(df, pq_path, csv_sig)
+    return _slice(df, columns, since, until)
+
+
+def _read_csv_window(path: str, kind: str, columns, since, until) -> pd.DataFrame | None:
+    """Parse only the lines dated inside the window, located via the byte-offset date index."""
+    data = date_index.read_window(path, pd.Timestamp(since), None if until is None else pd.Timestamp(until))
+    if data is None:
+        return None
+    try:
+        df = _read_csv_typed(data, SCHEMAS[kind], columns)
+    except (ValueError, TypeError):
+        return None
+    if df is None:
+        return None
+    return _slice(df, columns, since, until)
+
+
+def _read_parquet(pq_path: str, columns, since, until) -> pd.DataFrame:
+    schema_names = pq.read_schema(pq_path).names
+    filters = []
+    if "Date" in schema_names:
+        if since is not None:
+            filters.append(("Date", ">=", pd.Timestamp(since)))
+        if until is not None:
+            filters.append(("Date", "<=", pd.Timestamp(until)))
+    cols = None
+    if columns is not None:
+        cols = [c for c in dict.fromkeys(["Date", *columns]) if c in schema_names]
+    table = pq.read_table(pq_path, columns=cols, filters=filters or None)
+    df = table.to_pandas()
+    if "Date" in df.columns:
+        df.sort_values("Date", inplace=True)
+    return df
+
+
+def _slice(df: pd.DataFrame, columns: list[str] | None = None, since=None, until=None) -> pd.DataFrame:
+    """Apply a column projection and an inclusive date window to a loaded frame."""
+    if df.empty:
+        return df
+    if "Date" in df.columns:
+        if since is not None:
+            df = df[df["Date"] >= pd.Timestamp(since)]
+        if until is not None:
+            df = df[df["Date"] <= pd.Timestamp(until)]
+    if columns is not None:
+        df = df[[c for c in dict.fromkeys(["Date", *columns]) if c in df.columns]]
+    return df
+
+
+def _load(user_id: int | None, kind: str, paths: tuple, build,
+          columns: list[str] | None, since, until, compact: bool = False) -> pd.DataFrame:
+    """
+    Full loads go through the frame cache; projected loads slice it or read just the slice.
+    compact=True returns the memory-optimised representation (see compact_frame).
+    """
+    if columns is None and since is None and until is None:
+        return _cached(user_id, kind, paths, lambda: build(None, None, None), compact)
+    cached = _frame_cache.get((user_id, kind), _file_signature(*paths))
+    if cached is not None:
+        return _as_requested(_slice(cached, columns, since, until), kind, compact)
+    df = build(columns, since, until)
+    return compact_frame(df, kind) if compact else df
+
+
+def load_stats(user_id: int | None = None, columns: list[str] | None = None,
+               since=None, until=None, compact: bool = False) -> pd.DataFrame:
     path, _, _ = _user_files(user_id)
-    return _read_csv_safe(path)
+    return _load(user_id, "stats", (path,), lambda c, s, u: _read_frame(path, "stats", c, s, u),
+                 columns, since, until, compact)
 
 
-def load_activities(user_id: int | None = None) -> pd.DataFrame:
+def load_activities(user_id: int | None = None, columns: list[str] | None = None,
+                    since=None, until=None, compact: bool = False) -> pd.DataFrame:
     _, path, _ = _user_files(user_id)
-    df = _read_csv_safe(path)
+    blacklist_path = _blacklist_path(user_id)
+    return _load(user_id, "activities", (path, blacklist_path),
+                 lambda c, s, u: _build_activities(path, user_id, c, s, u),
+                 columns, since, until, compact)
+
+
+def _build_activities(path: str, user_id: int | None, columns=None, since=None, until=None) -> pd.DataFrame:
+    # Tombstone filtering needs Date, activityName and activityId even if the caller did not ask for them
+    read_cols = None if columns is None else [*columns, "activityName", "activityId"]
+    df = _read_frame(path, "activities", read_cols, since, until)
     if df.empty or "Date" not in df.columns or "activityName" not in df.columns:
         return df
     # Normalize distance: Garmin exports meters, Strava already stores km.
@@ -114,30 +690,39 @@ def load_activities(user_id: int | None = None) -> pd.DataFrame:
     if "distance" in df.columns:
         df["distance"] = pd.to_numeric(df["distance"], errors="coerce")
         df.loc[df["distance"] > 1000, "distance"] = (df.loc[df["distance"] > 1000, "distance"] / 1000).round(2)
-    blacklist = load_blacklist(user_id)
-    if blacklist:
-        mask = df.apply(
-            lambda r: (r["Date"].strftime("%Y-%m-%d"), r["activityName"]) in blacklist, axis=1
-        )
-        df = df[~mask]
+    df = filter_tombstoned(df, user_id)
+    if columns is not None:
+        df = _slice(df, columns)
     return df
 
 
-def load_checkins(user_id: int | None = None) -> pd.DataFrame:
+def load_checkins(user_id: int | None = None, columns: list[str] | None = None,
+                  since=None, until=None, compact: bool = False) -> pd.DataFrame:
     _, _, path = _user_files(user_id)
-    df = _read_csv_safe(path)
-    for col in ["Schlaf", "Stress", "Energie", "Load_Gestern",
-                "Muskeln", "Ernahrung", "Mental", "Gesundheit", "RPE", "Feel"]:
+    return _load(user_id, "checkins", (path, *_journal_paths(user_id)),
+                 lambda c, s, u: _build_checkins(path, user_id, c, s, u),
+                 columns, since, until, compact)
+
+
+def _build_checkins(path: str, user_id: int | None, columns=None, since=None, until=None) -> pd.DataFrame:
+    entries = _read_journal(user_id)
+    # Journal entries can touch any field, so project only after folding them in
+    df = _read_frame(path, "checkins", None if entries else columns, since, until)
+    if entries:
+        df = _slice(_apply_journal(df, entries), columns, since, until)
+    for col in _CHECKIN_FIELDS:
         if col in df.columns:
             df[col] = pd.to_numeric(df[col], errors="coerce")
     return df
 
 
-def get_checkin_today(user_id: int | None = None) -> dict | None:
-    df = load_checkins(user_id)
+def get_checkin_today(user_id: int | None = None, df: pd.DataFrame | None = None) -> dict | None:
+    """Today's check-in. df: check-ins already loaded in this request (at least today's rows)."""
+    today = pd.Timestamp.now().normalize()
+    if df is None:
+        df = load_checkins(user_id, since=today)
     if df.empty or "Date" not in df.columns:
         return None
-    today = pd.Timestamp.now().normalize()
     row = df[df["Date"].dt.normalize() == today]
     if row.empty:
         return None
@@ -162,12 +747,13 @@ def get_checkin_today(user_id: int | None = None) -> dict | None:
     }
 
 
-def get_checkin_recent(user_id: int | None = None, max_days: int = 2) -> dict | None:
+def get_checkin_recent(user_id: int | None = None, max_days: int = 2, df: pd.DataFrame | None = None) -> dict | None:
     """Return the most recent check-in within the last max_days days (for coach context)."""
-    df = load_checkins(user_id)
+    cutoff = pd.Timestamp.now().normalize() - pd.Timedelta(days=max_days)
+    if df is None:
+        df = load_checkins(user_id, since=cutoff)
     if df.empty or "Date" not in df.columns:
         return None
-    cutoff = pd.Timestamp.now().normalize() - pd.Timedelta(days=max_days)
     recent = df[df["Date"].dt.normalize() >= cutoff].sort_values("Date", ascending=False)
     if recent.empty:
         return None
@@ -190,14 +776,139 @@ def get_checkin_recent(user_id: int | None = None, max_days: int = 2) -> dict |
     }
 
 
-def save_checkin(data: dict, user_id: int | None = None) -> None:
-    """Write or update a check-in row in the CSV."""
+# ── Check-in journal ─────────────────────────────────────────────────────────
+# Check-in and RPE/Feel writes append one JSON line to daily_checkin.journal
+# instead of rewriting the CSV. Readers fold the journal over the CSV (last
+# writer wins per date and field); a background compaction moves it into the
+# CSV once it grows past CHECKIN_JOURNAL_MAX_BYTES.
+
+CHECKIN_JOURNAL_MAX_BYTES = int(os.getenv("CHECKIN_JOURNAL_MAX_BYTES", str(16 * 1024)))
+
+_CHECKIN_FIELDS = ["Schlaf", "Stress", "Energie", "Load_Gestern",
+                   "Muskeln", "Ernahrung", "Mental", "Gesundheit", "RPE", "Feel"]
+
+_user_locks: dict = {}
+_user_locks_guard = threading.Lock()
+_compacting: set = set()
+
+
+def _user_lock(user_id: int | None) -> threading.Lock:
+    with _user_locks_guard:
+        return _user_locks.setdefault(user_id, threading.Lock())
+
+
+def _journal_paths(user_id: int | None) -> tuple[str, str]:
+    """Return (compacting_path, journal_path) – the first only exists while a compaction runs."""
     _, _, checkin_path = _user_files(user_id)
-    df = load_checkins(user_id)
-    today_str = data["date"]
+    journal = os.path.splitext(checkin_path)[0] + ".journal"
+    return journal + ".compacting", journal
+
+
+def _read_journal_file(path: str) -> list[dict]:
+    entries = []
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue    # torn last line after a crash
+    except FileNotFoundError:
+        pass
+    return entries
+
 
-    new_row = {
-        "Date": today_str,
+def _read_journal(user_id: int | None) -> list[dict]:
+    compacting, journal = _journal_paths(user_id)
+    return _read_journal_file(compacting) + _read_journal_file(journal)
+
+
+def _apply_journal(df: pd.DataFrame, entries: list[dict]) -> pd.DataFrame:
+    """Fold journal entries over a check-in frame – the last entry setting a field wins."""
+    latest: dict[str, dict] = {}
+    for e in entries:
+        latest.setdefault(e["date"], {}).update(e["fields"])
+    if not latest:
+        return df
+
+    overrides = pd.DataFrame.from_dict(latest, orient="index")
+    is_set = pd.DataFrame.from_dict(
+        {d: {k: True for k in fields} for d, fields in latest.items()}, orient="index"
+    ).fillna(False).astype(bool)
+    overrides.index = pd.to_datetime(overrides.index, errors="coerce")
+    is_set.index = overrides.index
+
+    if df.empty or "Date" not in df.columns:
+        base = pd.DataFrame(index=pd.DatetimeIndex([], name="Date"))
+    else:
+        base = df.assign(Date=df["Date"].dt.normalize()).drop_duplicates("Date", keep="last").set_index("Date")
+    base = base.reindex(base.index.union(overrides.index.dropna()))
+    for col in overrides.columns:
+        values = pd.to_numeric(overrides[col], errors="coerce").reindex(base.index)
+        mask = is_set[col].reindex(base.index, fill_value=False).to_numpy(dtype=bool)
+        if col not in base.columns:
+            base[col] = float("nan")
+        base[col] = base[col].where(~mask, values)
+    base.index.name = "Date"
+    return base.reset_index()
+
+
+def _append_journal(user_id: int | None, date_str: str, fields: dict) -> None:
+    _, journal = _journal_paths(user_id)
+    line = json.dumps({"date": date_str, "fields": fields, "ts": datetime.now().isoformat()}) + "\n"
+    with _user_lock(user_id):
+        with open(journal, "a", encoding="utf-8") as f:
+            f.write(line)
+    invalidate_cache(user_id, "checkins")
+    try:
+        if os.path.getsize(journal) >= CHECKIN_JOURNAL_MAX_BYTES:
+            _schedule_compaction(user_id)
+    except OSError:
+        pass
+
+
+def _schedule_compaction(user_id: int | None) -> None:
+    with _user_locks_guard:
+        if user_id in _compacting:
+            return
+        _compacting.add(user_id)
+    threading.Thread(target=compact_checkins, args=(user_id,), daemon=True).start()
+
+
+def compact_checkins(user_id: int | None = None) -> int:
+    """
+    Fold the check-in journal into daily_checkin.csv. Returns number of entries folded.
+    Writers keep appending to a fresh journal while this runs.
+    """
+    _, _, checkin_path = _user_files(user_id)
+    compacting, journal = _journal_paths(user_id)
+    try:
+        with _user_lock(user_id):
+            # A leftover .compacting file (crash mid-compaction) is folded first
+            if not os.path.exists(compacting):
+                if not os.path.exists(journal):
+                    return 0
+                os.replace(journal, compacting)
+        entries = _read_journal_file(compacting)
+
+        def fold(df: pd.DataFrame):
+            df = df.assign(Date=_parse_dates(df["Date"])).dropna(subset=["Date"])
+            df = _apply_journal(df, entries)
+            df["Date"] = df["Date"].dt.strftime(schema.DATE_FORMAT)
+            return df, None
+
+        writer.transform(user_id, checkin_path, "checkins", fold)
+        os.remove(compacting)
+        invalidate_cache(user_id, "checkins")
+        return len(entries)
+    finally:
+        with _user_locks_guard:
+            _compacting.discard(user_id)
+
+
+def save_checkin(data: dict, user_id: int | None = None) -> None:
+    """Record a check-in for data["date"] – O(1) journal append."""
+    _append_journal(user_id, data["date"], {
         "Schlaf": data.get("schlaf"),
         "Stress": data.get("stress"),
         "Energie": data.get("energie"),
@@ -206,80 +917,190 @@ def save_checkin(data: dict, user_id: int | None = None) -> None:
         "Ernahrung": data.get("ernahrung"),
         "Mental": data.get("mental"),
         "Gesundheit": data.get("gesundheit"),
-    }
+    })
 
-    if not df.empty and "Date" in df.columns:
-        df["_date_str"] = df["Date"].dt.strftime("%Y-%m-%d")
-        df = df[df["_date_str"] != today_str].drop(columns=["_date_str"])
 
-    df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-    # Normalize all dates to YYYY-MM-DD to avoid mixed-format parsing issues
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.strftime("%Y-%m-%d")
-    df.to_csv(checkin_path, index=False)
+def save_matrix(date_str: str, rpe: float, feel: float, user_id: int | None = None) -> None:
+    """Record RPE and Feel for a given date – O(1) journal append."""
+    _append_journal(user_id, date_str, {"RPE": rpe, "Feel": feel})
 
 
-def save_matrix(date_str: str, rpe: float, feel: float, user_id: int | None = None) -> None:
-    """Update RPE and Feel for a given date in the check-in CSV."""
-    _, _, checkin_path = _user_files(user_id)
-    df = load_checkins(user_id)
+def delete_activity(date_str: str, name: str, user_id: int | None = None) -> bool:
+    """Remove a single activity row and blacklist it so Garmin sync won't restore it."""
+    delete_activities([{"date": date_str, "name": name}], user_id)
+    return True
 
-    if df.empty or "Date" not in df.columns:
-        df = pd.DataFrame([{"Date": date_str, "RPE": rpe, "Feel": feel}])
-        df.to_csv(checkin_path, index=False)
-        return
 
-    df["_date_str"] = df["Date"].dt.strftime("%Y-%m-%d")
-    mask = df["_date_str"] == date_str
+def delete_activities(items: list[dict], user_id: int | None = None, tombstone: bool = True) -> int:
+    """
+    Remove many activities with one CSV rewrite. Items identify an activity by
+    "activityId" or by "date" + "name". With tombstone=True (user deletions) they
+    are also recorded so syncs won't restore them – by activityId where the row
+    had one. Returns the number of rows removed.
+    """
+    if not items:
+        return 0
+    targets = _Tombstones([
+        {"date": i.get("date"), "name": i.get("name"), "activityId": i.get("activityId")} for i in items
+    ])
+    _, act_path, _ = _user_files(user_id)
 
-    if mask.any():
-        df.loc[mask, "RPE"] = rpe
-        df.loc[mask, "Feel"] = feel
-    else:
-        new_row = {"Date": date_str, "RPE": rpe, "Feel": feel}
-        df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
+    def remove(df: pd.DataFrame):
+        mask = targets.frame_mask(df)
+        return df[~mask], df[mask]
 
-    df.drop(columns=["_date_str"], inplace=True)
-    df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.strftime("%Y-%m-%d")
-    df.to_csv(checkin_path, index=False)
+    with _user_lock(user_id):
+        hit = writer.transform(user_id, act_path, "activities", remove)
+        removed = len(hit)
+        if tombstone:
+            entries = [
+                {"date": d[:10], "name": n, "activityId": a or None}
+                for d, n, a in zip(hit["Date"].astype(str), hit["activityName"].astype(str),
+                                   _tomb_ids(hit["activityId"]) if "activityId" in hit.columns
+                                   else [None] * removed)
+            ]
+            # Items that matched nothing are still recorded – the sync may bring them back later
+            matched = {(e["date"], e["name"]) for e in entries}
+            entries += [i for i in items if i.get("date") and i.get("name")
+                        and (i["date"], i["name"]) not in matched]
+            _add_tombstones(entries, user_id)
+            invalidate_cache(user_id, "activities")
+    return removed
 
 
-def delete_activity(date_str: str, name: str, user_id: int | None = None) -> bool:
-    """Remove a single activity row and blacklist it so Garmin sync won't restore it."""
-    _, act_path, _ = _user_files(user_id)
-    df = _read_csv_safe(act_path)  # raw read without blacklist filter
-    if df.empty:
-        _add_to_blacklist(date_str, name, user_id)
-        return True
-    mask = (df["Date"].dt.strftime("%Y-%m-%d") == date_str) & (df["activityName"] == name)
-    df = df[~mask]
-    df.to_csv(act_path, index=False)
-    _add_to_blacklist(date_str, name, user_id)
-    return True
+# ── Upload ingestion ─────────────────────────────────────────────────────────
+# Uploads are parsed in fixed-size chunks and only rows whose key is not in the
+# target file yet are appended (existing data wins), so memory stays bounded by
+# the chunk size instead of the history size.
 
+UPLOAD_CHUNK_ROWS = int(os.getenv("UPLOAD_CHUNK_ROWS", "5000"))
 
-def merge_upload(file_bytes: bytes, target: str, user_id: int | None = None) -> int:
+
+def _open_upload(fileobj):
+    """Binary stream of the CSV inside a plain, gzip or zip upload."""
+    head = fileobj.read(4)
+    fileobj.seek(0)
+    if head[:2] == b"\x1f\x8b":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")
+    if head == b"PK\x03\x04":
+        archive = zipfile.ZipFile(fileobj)
+        members = [m for m in archive.infolist() if not m.is_dir()]
+        csvs = [m for m in members if m.filename.lower().endswith(".csv")] or members
+        if len(csvs) != 1:
+            raise ValueError("Zip upload must contain exactly one CSV file")
+        return archive.open(csvs[0])
+    return fileobj
+
+
+class _UploadIndex:
     """
-    Merge uploaded CSV bytes into the target file.
-    Returns number of new rows added.
+    Keys of rows already in the target file: the date for stats; for activities
+    the activityId, or date + name for rows without one. Grows as chunks are
+    appended so duplicates inside the upload are caught too.
     """
-    try:
-        new_df = pd.read_csv(io.BytesIO(file_bytes), on_bad_lines="warn")
-    except Exception as e:
-        raise ValueError(f"Cannot parse uploaded CSV: {e}")
 
+    def __init__(self, target: str, path: str):
+        self.by_date = target == "stats"
+        self.keys: set[str] = set()
+        self.ids: set[str] = set()
+        existing = _read_csv_safe(path, target, ["Date"] if self.by_date else ["activityName", "activityId"])
+        if not existing.empty:
+            keys, ids = self._row_keys(existing)
+            self.keys.update(keys)
+            if ids is not None:
+                self.ids.update(ids[ids != ""])
+
+    def _row_keys(self, df: pd.DataFrame) -> tuple:
+        dates = df["Date"].dt.strftime("%Y-%m-%d")
+        if self.by_date:
+            return dates.to_numpy(dtype=str), None
+        names = df["activityName"] if "activityName" in df.columns else [""] * len(df)
+        ids = _tomb_ids(df["activityId"]) if "activityId" in df.columns else np.full(len(df), "")
+        return _tomb_keys(dates, names), ids
+
+    def take_new(self, df: pd.DataFrame) -> np.ndarray:
+        """Mask of rows not seen before; marks them as seen."""
+        keys, ids = self._row_keys(df)
+        if ids is None:
+            ident = keys
+            fresh = np.fromiter((k not in self.keys for k in keys), dtype=bool, count=len(keys))
+        else:
+            ident = np.where(ids != "", np.char.add("id:", ids), np.char.add("dn:", keys))
+            fresh = np.fromiter(((i not in self.ids) if i else (k not in self.keys) for k, i in zip(keys, ids)),
+                                dtype=bool, count=len(keys))
+            self.ids.update(i for i in ids[fresh] if i)
+        fresh &= ~pd.Series(ident).duplicated().to_numpy()
+        self.keys.update(keys[fresh])
+        return fresh
+
+
+def iter_upload(fileobj, target: str, user_id: int | None = None, chunk_rows: int = UPLOAD_CHUNK_ROWS):
+    """
+    Stream an uploaded CSV (plain, gzip or zip) into the stats or activities file.
+    fileobj must be a seekable binary file (the spooled upload). Yields one
+    progress dict per parsed chunk. Raises ValueError for unreadable uploads.
+    """
+    if target not in ("stats", "activities"):
+        raise ValueError(f"Unknown upload target: {target}")
+    file_schema = SCHEMAS[target]
     stats_path, act_path, _ = _user_files(user_id)
     path = stats_path if target == "stats" else act_path
-    existing = _read_csv_safe(path)
+    total = fileobj.seek(0, os.SEEK_END)
+    fileobj.seek(0)
 
-    if existing.empty:
-        merged = new_df
-    else:
-        merged = pd.concat([existing, new_df], ignore_index=True)
-        if "Date" in merged.columns:
-            merged["Date"] = pd.to_datetime(merged["Date"], errors="coerce")
-            merged.drop_duplicates(subset=["Date"], keep="last", inplace=True)
-            merged.sort_values("Date", inplace=True)
-
-    before = len(existing)
-    merged.to_csv(path, index=False)
-    return len(merged) - before
+    # The user lock is only held per chunk, never across a yield: with ?progress the
+    # generator is driven by the streaming response, and a slow client must not block
+    # the user's check-ins and deletes. writer.append serializes the file writes itself.
+    try:
+        reader = pd.read_csv(_open_upload(fileobj), chunksize=chunk_rows, dtype=str, on_bad_lines="warn")
+        with _user_lock(user_id):
+            index = _UploadIndex(target, path)
+        for n, chunk in enumerate(reader, 1):
+            rows_read = len(chunk)
+            chunk = chunk.rename(columns=file_schema.aliases)
+            if "Date" not in chunk.columns:
+                raise ValueError("Uploaded CSV has no Date column")
+            chunk["Date"] = _parse_dates(chunk["Date"])
+            chunk = chunk[chunk["Date"].notna()].copy()
+            invalid = rows_read - len(chunk)
+            _coerce_types(chunk, file_schema)
+            with _user_lock(user_id):
+                # Tombstones checked under the lock too, so a delete between two chunks is not undone
+                if target == "activities":
+                    chunk = filter_tombstoned(chunk, user_id)
+                chunk = chunk[index.take_new(chunk)] if len(chunk) else chunk
+                if len(chunk):
+                    chunk["Date"] = chunk["Date"].dt.strftime(schema.DATE_FORMAT)
+                    writer.append(user_id, path, target, chunk)
+            done = min(fileobj.tell(), total)
+            yield {
+                "chunk": n,
+                "rows_read": rows_read,
+                "rows_added": len(chunk),
+                "rows_skipped": rows_read - invalid - len(chunk),
+                "rows_invalid": invalid,
+                "bytes_read": done,
+                "progress": round(done / total, 3) if total else 1.0,
+            }
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError,
+            zipfile.BadZipFile, OSError, EOFError) as e:
+        raise ValueError(f"Cannot parse uploaded CSV: {e}")
+
+
+def ingest_upload(fileobj, target: str, user_id: int | None = None) -> dict:
+    """Run iter_upload to completion. Returns totals plus the per-chunk reports."""
+    chunks = list(iter_upload(fileobj, target, user_id))
+    return {
+        "rows_added": sum(c["rows_added"] for c in chunks),
+        "rows_skipped": sum(c["rows_skipped"] for c in chunks),
+        "rows_invalid": sum(c["rows_invalid"] for c in chunks),
+        "chunks": chunks,
+    }
+
+
+def merge_upload(file_bytes: bytes, target: str, user_id: int | None = None) -> int:
+    """
+    Merge uploaded CSV bytes into the target file.
+    Returns number of new rows added.
+    """
+    return ingest_upload(io.BytesIO(file_bytes), target, user_id)["rows_added"]
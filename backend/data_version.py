@@ -0,0 +1,88 @@
+"""
+Per-user data version – a counter that only goes up, for ETags on GET endpoints.
+
+Every write through data_manager (writer flush, check-in journal, compaction,
+deletes – and with them the Garmin/Strava syncs and uploads) ends in
+dm.invalidate_cache, which bumps the version here; profile changes that feed
+into the responses (FTP override/target) call bump directly. Files written by
+another process (Streamlit dashboard) do not pass the hook, so current() also
+compares the file signatures – os.stat only, no CSV is read – with the ones
+recorded at the last bump.
+
+The version is persisted to data_version.json in the user dir, so ETags the
+clients hold stay valid across restarts and never repeat after one.
+"""
+import hashlib
+import json
+
+import pandas as pd
+
+from . import data_manager as dm
+from .user_state import UserStates
+
+_STATE_FILE = "data_version.json"
+_KINDS = ("stats", "activities", "checkins")
+
+_states = UserStates(_STATE_FILE, lambda data: {"version": int(data["version"]), "signature": data["signature"]},
+                     bumps=0, external=0)
+_counters = _states.counters
+
+
+def _signature(user_id: int | None) -> list:
+    # JSON round trip so it compares equal to the persisted one
+    return json.loads(json.dumps([dm.data_signature(user_id, k) for k in _KINDS]))
+
+
+def _state(user_id: int | None) -> dict:
+    """Caller holds the user lock."""
+    return _states.get(user_id) or {"version": 0, "signature": None}
+
+
+def _bump(user_id: int | None, state: dict) -> None:
+    state["version"] += 1
+    state["signature"] = _signature(user_id)
+    # a failed write leaves the in-memory version monotonic; a restart only costs one extra 200
+    _states.put(user_id, state)
+
+
+def bump(user_id: int | None) -> int:
+    """Mark the user's data as changed; returns the new version."""
+    with _states.lock(user_id):
+        state = _state(user_id)
+        _bump(user_id, state)
+        _counters["bumps"] += 1
+        return state["version"]
+
+
+@dm.on_invalidate
+def _on_write(user_id: int | None, kind: str | None) -> None:
+    if user_id is None:
+        # invalidate_cache() without a user drops everything – every known version moves on
+        for uid in _states.users():
+            bump(uid)
+    else:
+        bump(user_id)
+
+
+def current(user_id: int | None) -> int:
+    """The user's data version, bumped first if a file changed outside this process."""
+    with _states.lock(user_id):
+        state = _state(user_id)
+        if state["signature"] != _signature(user_id):
+            _bump(user_id, state)
+            _counters["external"] += 1
+        return state["version"]
+
+
+def etag(user_id: int | None, path: str, query: str = "") -> str:
+    """
+    Weak ETag for a GET response: data version, today's date (windows and the
+    CTL/ATL decay move on at midnight) and the request path with its query.
+    """
+    today = pd.Timestamp.now().strftime("%Y-%m-%d")
+    request = hashlib.sha1(f"{path}?{query}".encode()).hexdigest()[:12]
+    return f'W/"{user_id}-{current(user_id)}-{today}-{request}"'
+
+
+def stats() -> dict:
+    return {"users": len(_states.users()), **_counters}
@@ -1,9 +1,13 @@
 """
-SQLite database setup – stores user accounts only.
-Training data stays in per-user CSV directories.
+SQLite database setup – user accounts plus an indexed copy of the per-user
+activity CSVs. The CSV directories stay authoritative; see timeseries.py for
+how the table is kept in sync.
 """
 import os
-from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime, Boolean
+from sqlalchemy import (
+    create_engine, Column, Integer, Float, String, Date, DateTime, Boolean,
+    Index, UniqueConstraint,
+)
 from sqlalchemy.orm import declarative_base, sessionmaker
 from datetime import datetime
 from dotenv import load_dotenv
@@ -48,6 +52,42 @@ class User(Base):
     is_active = Column(Boolean, default=True)
 
 
+class Activity(Base):
+    __tablename__ = "activities"
+    __table_args__ = (
+        Index("ix_activities_user_date", "user_id", "date"),
+        UniqueConstraint("user_id", "activity_id", name="uq_activities_activity_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    time = Column(String, default="")
+    activity_id = Column(String, nullable=True)         # Garmin / Strava ID, NULL bei CSV-Uploads ohne ID
+    name = Column(String, default="")
+    sport_type = Column(String, default="")
+    duration = Column(Float)                            # Sekunden
+    distance = Column(Float)                            # km (normalisiert)
+    tss = Column(Float)                                 # activityTrainingLoad
+    norm_power = Column(Float)
+    avg_power = Column(Float)
+    avg_hr = Column(Float)
+    avg_cadence = Column(Float)
+    ascent = Column(Float)
+    calories = Column(Float)
+
+
+class TimeseriesSync(Base):
+    """Signature of the CSV files a user's activity rows were imported from."""
+    __tablename__ = "timeseries_sync"
+
+    user_id = Column(Integer, primary_key=True)
+    kind = Column(String, primary_key=True)             # activities
+    source_signature = Column(String, default="")
+    source_mark = Column(String, default="")           # data_manager.data_mark as JSON
+    imported_at = Column(DateTime, default=datetime.utcnow)
+
+
 def create_tables():
     Base.metadata.create_all(bind=engine)
 
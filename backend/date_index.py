@@ -0,0 +1,256 @@
+"""
+Byte-offset index by date for the per-user CSV files – windowed reads seek to
+the rows they need instead of parsing and sorting the whole history.
+
+Every data line is indexed by its byte offset and leading YYYY-MM-DD date, so
+any row order works (Garmin writes newest-first, uploads append oldest-first).
+An index covers the file up to its high-water mark; when the file only grew
+it is extended from there, any other rewrite rebuilds it. Files that do not
+start with a Date column or contain lines without an ISO date (hand-made
+exports, quoted multi-line fields) are not indexed – callers read them in full.
+
+Derived state (pmc, rollups, the SQLite mirror) stores a mark of the file it
+was built from (size plus a digest of the bytes up to it); appended_since then
+names the days of the rows added after it, so only those days are recomputed.
+"""
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+_BLOCK = 1 << 20        # scan files in 1 MB blocks
+_TAIL_CHECK = 64        # bytes before the high-water mark that must be unchanged on append
+_DIGITS = [0, 1, 2, 3, 5, 6, 8, 9]
+
+
+class _DateIndex:
+    def __init__(self, header: bytes, offsets: np.ndarray, dates: np.ndarray, size: int, mtime_ns: int, tail: bytes):
+        self.header = header        # header line incl. newline
+        self.offsets = offsets      # int64 start of every data line
+        self.dates = dates          # datetime64[D] of every data line
+        self.size = size            # high-water mark: bytes covered by the index
+        self.mtime_ns = mtime_ns
+        self.tail = tail            # last bytes before the high-water mark
+
+
+_indexes: dict[str, _DateIndex] = {}
+_lock = threading.Lock()
+_counters = {"builds": 0, "extends": 0, "window_reads": 0, "append_checks": 0, "unindexable": 0}
+
+
+def _scan_block(buf: bytes, base: int, final: bool):
+    """
+    Offsets and dates of the complete lines in buf (plus a trailing partial line
+    when final). Returns (offsets, dates, consumed) or None if a line has no ISO date.
+    """
+    arr = np.frombuffer(buf, dtype=np.uint8)
+    newlines = np.flatnonzero(arr == 10)
+    starts = np.concatenate(([0], newlines[:-1] + 1)) if len(newlines) else np.empty(0, dtype=np.int64)
+    ends = newlines
+    consumed = int(newlines[-1]) + 1 if len(newlines) else 0
+    if final and consumed < len(arr):
+        starts = np.append(starts, consumed)
+        ends = np.append(ends, len(arr))
+        consumed = len(arr)
+    lengths = ends - starts
+    blank = (lengths == 0) | ((lengths == 1) & (arr[np.minimum(starts, max(len(arr) - 1, 0))] == 13))
+    starts, lengths = starts[~blank], lengths[~blank]
+    if not len(starts):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[D]"), consumed
+    if (lengths < 10).any():
+        return None
+    chars = arr[starts[:, None] + np.arange(10)]
+    digits = chars[:, _DIGITS]
+    if not (((digits >= 48) & (digits <= 57)).all() and (chars[:, 4] == 45).all() and (chars[:, 7] == 45).all()):
+        return None
+    try:
+        dates = np.ascontiguousarray(chars).view("S10").ravel().astype("datetime64[D]")
+    except ValueError:      # e.g. 2024-13-45
+        return None
+    return starts.astype(np.int64) + base, dates, consumed
+
+
+def _scan(f, pos: int, size: int):
+    """Index the lines of an open file between pos and size. None if unindexable."""
+    offsets, dates = [], []
+    f.seek(pos)
+    carry, carry_pos = b"", pos
+    while carry_pos + len(carry) < size:
+        block = f.read(min(_BLOCK, size - carry_pos - len(carry)))
+        if not block:
+            break
+        buf = carry + block
+        final = carry_pos + len(buf) >= size
+        res = _scan_block(buf, carry_pos, final)
+        if res is None:
+            return None
+        offs, ds, consumed = res
+        offsets.append(offs)
+        dates.append(ds)
+        carry, carry_pos = buf[consumed:], carry_pos + consumed
+    if not offsets:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[D]")
+    return np.concatenate(offsets), np.concatenate(dates)
+
+
+def _read_tail(f, size: int) -> bytes:
+    start = max(0, size - _TAIL_CHECK)
+    f.seek(start)
+    return f.read(size - start)
+
+
+def _build(path: str, f, st) -> _DateIndex | None:
+    f.seek(0)
+    header = f.readline()
+    name = header.split(b",", 1)[0].strip().lstrip(b"\xef\xbb\xbf").strip(b'"')
+    if name != b"Date" or not header.endswith(b"\n"):
+        return None
+    scanned = _scan(f, len(header), st.st_size)
+    if scanned is None:
+        return None
+    return _DateIndex(header, scanned[0], scanned[1], st.st_size, st.st_mtime_ns, _read_tail(f, st.st_size))
+
+
+def _extend(idx: _DateIndex, f, st) -> _DateIndex | None:
+    """Index only the bytes appended since the high-water mark; None if the file was rewritten."""
+    f.seek(0)
+    if f.readline() != idx.header or _read_tail(f, idx.size) != idx.tail:
+        return None
+    for i in ((0, -1) if len(idx.offsets) else ()):
+        f.seek(int(idx.offsets[i]))
+        if f.read(10) != str(idx.dates[i]).encode():
+            return None
+    scanned = _scan(f, idx.size, st.st_size)
+    if scanned is None:
+        return None
+    return _DateIndex(idx.header, np.concatenate((idx.offsets, scanned[0])),
+                      np.concatenate((idx.dates, scanned[1])), st.st_size, st.st_mtime_ns,
+                      _read_tail(f, st.st_size))
+
+
+def _index_for(path: str, f) -> _DateIndex | None:
+    st = os.fstat(f.fileno())
+    with _lock:
+        idx = _indexes.get(path)
+    if idx is not None and idx.size == st.st_size and idx.mtime_ns == st.st_mtime_ns:
+        return idx
+    new = _extend(idx, f, st) if idx is not None and st.st_size > idx.size else None
+    counter = "extends"
+    if new is None:
+        new, counter = _build(path, f, st), "builds"
+    with _lock:
+        if new is None:
+            _indexes.pop(path, None)
+            _counters["unindexable"] += 1
+        else:
+            _indexes[path] = new
+            _counters[counter] += 1
+    return new
+
+
+def _open_index(path: str):
+    """(open file, current index) – the caller closes the file; None if it cannot be read or indexed."""
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    try:
+        idx = _index_for(path, f)
+    except (OSError, ValueError):
+        idx = None
+    if idx is None:
+        f.close()
+        return None
+    return f, idx
+
+
+def read_window(path: str, since, until=None) -> bytes | None:
+    """
+    Header plus every line dated within [since, until] (whole days, inclusive),
+    in file order. None when the file cannot be indexed – read it in full then.
+    """
+    opened = _open_index(path)
+    if opened is None:
+        return None
+    f, idx = opened
+    with f:
+        mask = idx.dates >= np.datetime64(since, "D")
+        if until is not None:
+            mask &= idx.dates <= np.datetime64(until, "D")
+        sel = np.flatnonzero(mask)
+        ends = np.append(idx.offsets[1:], idx.size)
+        parts = [idx.header]
+        if len(sel):
+            # Contiguous runs of selected lines become one read each
+            breaks = np.flatnonzero(np.diff(sel) != 1)
+            run_starts = np.concatenate(([sel[0]], sel[breaks + 1]))
+            run_ends = np.concatenate((sel[breaks], [sel[-1]]))
+            for a, b in zip(run_starts, run_ends):
+                f.seek(int(idx.offsets[a]))
+                chunk = f.read(int(ends[b] - idx.offsets[a]))
+                parts.append(chunk if chunk.endswith(b"\n") else chunk + b"\n")
+    with _lock:
+        _counters["window_reads"] += 1
+    return b"".join(parts)
+
+
+def _digest(f, start: int, end: int, h) -> None:
+    f.seek(start)
+    while start < end:
+        block = f.read(min(_BLOCK, end - start))
+        if not block:
+            break
+        h.update(block)
+        start += len(block)
+
+
+def mark(path: str) -> dict | None:
+    """
+    The file's high-water mark as it is now – size and a digest of the bytes up
+    to it (JSON-serializable) – for appended_since. None when the file is
+    missing or cannot be indexed.
+    """
+    opened = _open_index(path)
+    if opened is None:
+        return None
+    f, idx = opened
+    with f:
+        h = hashlib.blake2b(digest_size=16)
+        _digest(f, 0, idx.size, h)
+    return {"size": idx.size, "digest": h.hexdigest()}
+
+
+def appended_since(path: str, old_mark: dict | None) -> tuple[np.ndarray, dict] | None:
+    """
+    Dates of the lines appended after old_mark (see mark) and the file's new mark.
+    None when any byte before the old high-water mark changed (rewrites, edits in
+    place, deletes) or the file cannot be indexed – the caller reads it in full then.
+    """
+    if not old_mark:
+        return None
+    opened = _open_index(path)
+    if opened is None:
+        return None
+    f, idx = opened
+    with f:
+        size = int(old_mark["size"])
+        if idx.size < size:
+            return None
+        h = hashlib.blake2b(digest_size=16)
+        _digest(f, 0, size, h)
+        if h.hexdigest() != old_mark["digest"]:
+            return None
+        _digest(f, size, idx.size, h)
+    with _lock:
+        _counters["append_checks"] += 1
+    return idx.dates[idx.offsets >= size], {"size": idx.size, "digest": h.hexdigest()}
+
+
+def stats() -> dict:
+    with _lock:
+        return {
+            "files": len(_indexes),
+            "rows": int(sum(len(i.offsets) for i in _indexes.values())),
+            **_counters,
+        }
@@ -0,0 +1,64 @@
+"""
+JSON encoding for the chart endpoints.
+
+Payloads are built column-wise (one tolist() per column, see records) and
+encoded once with orjson when it is installed – it writes numpy arrays and
+scalars directly and is several times faster than the stdlib encoder. Without
+orjson the stdlib json module produces equivalent output. FastJSONResponse
+sends bodies that are already encoded (response_cache) as they are.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:     # optional – stdlib json fallback
+    orjson = None
+
+ENCODER = "orjson" if orjson is not None else "json"
+
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj) -> bytes:
+    """Compact UTF-8 JSON – pydantic models, numpy arrays and scalars included."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_default, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def records(columns: dict) -> list[dict]:
+    """
+    Row dicts from equally long columns (Series, arrays or lists) – the shape
+    the frontend expects, without a pydantic model or iterrows() per row.
+    """
+    names = list(columns)
+    values = [c.tolist() if hasattr(c, "tolist") else list(c) for c in columns.values()]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def iso_dates(dates) -> list[str]:
+    """YYYY-MM-DD strings of a datetime column."""
+    return pd.DatetimeIndex(dates).strftime("%Y-%m-%d").tolist()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with dumps; bytes are taken as pre-encoded JSON."""
+
+    def render(self, content) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -8,6 +8,8 @@ import tempfile
 from datetime import date, timedelta
 from dotenv import load_dotenv
 
+from .schema import ACTIVITIES, STATS, SchemaError
+
 load_dotenv()
 _SAVE_PATH = os.getenv("SAVE_PATH", os.path.expanduser("~/Documents/AI_Fitness-main"))
 
@@ -27,6 +29,57 @@ def _user_csv(user_id: int, filename: str) -> str:
     return os.path.join(path, filename)
 
 
+def _valid_rows(user_id: int, file_schema, rows: list) -> list:
+    """Validate rows against the file schema; rows Garmin sent without a usable date are dropped."""
+    out, errors = [], []
+    for row in rows:
+        try:
+            out.append(file_schema.validate_row(row))
+        except SchemaError as e:
+            errors.append(e)
+    if errors:
+        print(f"[GARMIN] user {user_id}: skipped {len(errors)} of {len(rows)} {file_schema.kind} rows "
+              f"(first: {errors[0]})", flush=True)
+    return out
+
+
+_ACT_DATE, _ACT_NAME, _ACT_ID = (ACTIVITIES.names.index(c) for c in ("Date", "activityName", "activityId"))
+
+
+def _drop_tombstoned(user_id: int, rows: list) -> list:
+    """Remove activities the user deleted in the app so the sync doesn't restore them."""
+    from .data_manager import tombstone_mask
+
+    if not rows:
+        return rows
+    mask = tombstone_mask(user_id, [r[_ACT_DATE] for r in rows], [r[_ACT_NAME] for r in rows],
+                          [r[_ACT_ID] for r in rows])
+    return [r for r, deleted in zip(rows, mask) if not deleted]
+
+
+def _write_activities(user_id: int, csv_file: str, rows: list) -> None:
+    """Replace the activity file with the synced rows (newest first) via the per-user writer."""
+    import pandas as pd
+    from . import writer
+
+    rows.sort(key=lambda x: (x[0], x[1] or ""), reverse=True)
+    writer.replace(user_id, csv_file, "activities", pd.DataFrame(rows, columns=ACTIVITIES.names, dtype=object))
+
+
+def _upsert_stats(user_id: int, csv_file: str, rows: list, days: set) -> None:
+    """Replace the rows of the synced days with the fresh ones (newest first); other days stay as they are."""
+    import pandas as pd
+    from . import writer
+
+    def merge(df):
+        fresh = pd.DataFrame(rows, columns=STATS.names, dtype=object)
+        kept = df[~df["Date"].isin(days)] if "Date" in df.columns else df
+        merged = pd.concat([kept, fresh], ignore_index=True)
+        return merged.sort_values("Date", ascending=False, kind="stable"), None
+
+    writer.transform(user_id, csv_file, "stats", merge)
+
+
 def connect_garmin(user_id: int, email: str, password: str) -> dict:
     """
     Start Garmin login. Returns {"ok": True} on direct success,
@@ -168,14 +221,6 @@ def sync_activities_browser(user_id: int, client, days: int = 30):
     activities = client.get_activities_by_date(start, today.isoformat())
 
     csv_file = _user_csv(user_id, "garmin_activities.csv")
-    HEADERS = ["Date", "Time", "activityName", "sportType", "duration", "elapsedDuration",
-               "movingDuration", "distance", "averageSpeed", "maxSpeed", "averageHR", "maxHR",
-               "hrTimeInZone_1", "hrTimeInZone_2", "hrTimeInZone_3", "hrTimeInZone_4", "hrTimeInZone_5",
-               "avgPower", "maxPower", "normPower", "avgCadence", "maxCadence",
-               "totalAscent", "totalDescent", "steps", "avgStrideLength",
-               "avgStrokes", "totalStrokes", "poolLength", "numLaps",
-               "calories", "trainingEffectLabel", "activityTrainingLoad",
-               "aerobicEffect", "anaerobicEffect", "vo2Max", "lactateThreshold", "activityId"]
 
     rows = []
     for act in activities:
@@ -198,40 +243,23 @@ def sync_activities_browser(user_id: int, client, days: int = 30):
             None, None, None, None, act.get("activityId",""),
         ])
 
-    import csv as csv_mod
-    rows.sort(key=lambda x: (x[0], x[1]), reverse=True)
-    with open(csv_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv_mod.writer(f)
-        writer.writerow(HEADERS)
-        writer.writerows(rows)
+    rows = _drop_tombstoned(user_id, _valid_rows(user_id, ACTIVITIES, rows))
+    _write_activities(user_id, csv_file, rows)
     return len(rows), client.di_token, client.di_refresh_token
 
 
 def sync_health_browser(user_id: int, client, days: int = 7) -> int:
     """Sync health stats using an existing GarminClient (no extra Garmin requests for setup)."""
-    import csv as csv_mod
     from datetime import date, timedelta
 
     csv_file = _user_csv(user_id, "garmin_stats.csv")
-    HEADERS = ["Date", "Weight (lbs)", "Muscle Mass (lbs)", "Body Fat %", "Water %",
-               "Sleep Total (hr)", "Sleep Deep (hr)", "Sleep REM (hr)", "Sleep Score",
-               "RHR", "Min HR", "Max HR", "Avg Stress", "Respiration", "SpO2",
-               "VO2 Max", "Training Status", "HRV Status", "HRV Avg",
-               "BP Systolic", "BP Diastolic", "Steps", "Step Goal", "Cals Total", "Cals Active", "Activities"]
-
-    existing_rows = []
-    if os.path.isfile(csv_file):
-        with open(csv_file, "r", newline="", encoding="utf-8-sig") as f:
-            reader = csv_mod.reader(f)
-            all_data = list(reader)
-            if all_data:
-                existing_rows = [r for r in all_data[1:] if r]
 
     today = date.today()
     synced = 0
+    new_rows, refreshed = [], set()
     for i in range(days):
         day_str = (today - timedelta(days=i)).isoformat()
-        existing_rows = [r for r in existing_rows if r[0] != day_str]
+        refreshed.add(day_str)
         try:
             rhr = steps = sleep_total = sleep_score = hrv_avg = None
 
@@ -266,22 +294,18 @@ def sync_health_browser(user_id: int, client, days: int = 7) -> int:
             except Exception:
                 pass
 
-            existing_rows.append([
+            new_rows.append(STATS.validate_row([
                 day_str, None, None, None, None,
                 sleep_total, None, None, sleep_score,
                 rhr, None, None, None, None, None,
                 None, None, hrv_status, hrv_avg,
                 None, None, steps, None, None, None, ""
-            ])
+            ]))
             synced += 1
         except Exception:
             pass
 
-    existing_rows.sort(key=lambda x: x[0] if x else "", reverse=True)
-    with open(csv_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv_mod.writer(f)
-        writer.writerow(HEADERS)
-        writer.writerows(existing_rows)
+    _upsert_stats(user_id, csv_file, new_rows, refreshed)
     return synced
 
 
@@ -318,18 +342,6 @@ def sync_activities(user_id: int, days: int = 30) -> int:
     end = date.today().isoformat()
     activities = api.get_activities_by_date(start, end) or []
 
-    HEADERS = [
-        "Date", "Time", "activityName", "sportType",
-        "duration", "elapsedDuration", "movingDuration", "distance",
-        "averageSpeed", "maxSpeed", "averageHR", "maxHR",
-        "hrTimeInZone_1", "hrTimeInZone_2", "hrTimeInZone_3", "hrTimeInZone_4", "hrTimeInZone_5",
-        "avgPower", "maxPower", "normPower",
-        "avgCadence", "maxCadence",
-        "totalAscent", "totalDescent", "steps", "avgStrideLength",
-        "avgStrokes", "totalStrokes", "poolLength", "numLaps",
-        "calories", "trainingEffectLabel", "activityTrainingLoad",
-        "aerobicEffect", "anaerobicEffect", "vo2Max", "lactateThreshold", "activityId"
-    ]
 
     rows = []
     for act in activities:
@@ -364,16 +376,8 @@ def sync_activities(user_id: int, days: int = 30) -> int:
             act.get("vO2MaxValue"), act.get("lactateThresholdHeartRate"), act.get("activityId"),
         ])
 
-    from .data_manager import load_blacklist
-    blacklist = load_blacklist(user_id)
-    if blacklist:
-        rows = [r for r in rows if (r[0], r[2]) not in blacklist]  # r[0]=date, r[2]=activityName
-
-    rows.sort(key=lambda x: (x[0], x[1]), reverse=True)
-    with open(csv_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(HEADERS)
-        writer.writerows(rows)
+    rows = _drop_tombstoned(user_id, _valid_rows(user_id, ACTIVITIES, rows))
+    _write_activities(user_id, csv_file, rows)
 
     return len(rows)
 
@@ -393,24 +397,14 @@ def sync_health(user_id: int, days: int = 7) -> int:
         except Exception:
             return None
 
-    HEADERS = [
-        "Date", "Weight (lbs)", "Muscle Mass (lbs)", "Body Fat %", "Water %",
-        "Sleep Total (hr)", "Sleep Deep (hr)", "Sleep REM (hr)", "Sleep Score",
-        "RHR", "Min HR", "Max HR", "Avg Stress", "Respiration", "SpO2",
-        "VO2 Max", "Training Status", "HRV Status", "HRV Avg",
-        "BP Systolic", "BP Diastolic", "Steps", "Step Goal", "Cals Total", "Cals Active", "Activities"
-    ]
 
-    # Load existing data
+    # Load existing dates (the rows themselves are merged by the writer)
     existing_dates = set()
-    rows = []
     if os.path.isfile(csv_file):
         with open(csv_file, "r", newline="", encoding="utf-8-sig") as f:
             reader = csv.reader(f)
-            all_data = list(reader)
-            if all_data:
-                rows = [r for r in all_data[1:] if r]
-                existing_dates = {r[0] for r in rows if r}
+            next(reader, None)
+            existing_dates = {r[0] for r in reader if r}
 
     today = date.today()
     missing = [
@@ -422,14 +416,13 @@ def sync_health(user_id: int, days: int = 7) -> int:
     today_str = today.isoformat()
     yesterday_str = (today - timedelta(days=1)).isoformat()
     for refresh_str in [today_str, yesterday_str]:
-        rows = [r for r in rows if r[0] != refresh_str]
         if refresh_str not in missing:
             missing.append(refresh_str)
 
     synced = 0
+    rows = []
     for day_str in sorted(missing):
         try:
-            rows = [r for r in rows if r[0] != day_str]
 
             # Basic stats
             rhr = min_hr = max_hr = stress = steps = vo2 = spo2 = resp = None
@@ -500,21 +493,17 @@ def sync_health(user_id: int, days: int = 7) -> int:
             except Exception:
                 pass
 
-            rows.append([
+            rows.append(STATS.validate_row([
                 day_str, None, None, None, None,
                 sleep_total, sleep_deep, sleep_rem, sleep_score,
                 rhr, min_hr, max_hr, stress, resp, spo2,
                 vo2, None, hrv_status, hrv_avg,
                 None, None, steps, cals_goal, cals_total, cals_active, ""
-            ])
+            ]))
             synced += 1
         except Exception:
             pass
 
-    rows.sort(key=lambda x: x[0] if x else "", reverse=True)
-    with open(csv_file, "w", newline="", encoding="utf-8") as f:
-        writer = csv.writer(f)
-        writer.writerow(HEADERS)
-        writer.writerows(rows)
+    _upsert_stats(user_id, csv_file, rows, set(missing))
 
     return synced
@@ -2,26 +2,37 @@
 Skywalker FastAPI Backend – all REST endpoints for the mobile app.
 Run with: uvicorn backend.main:app --reload --host 0.0.0.0 --port 8000
 """
+import json
 import os
+import shutil
+import tempfile
 import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 
+import numpy as np
 import pandas as pd
 from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 
 from .models import (
     CheckinRequest, MatrixRequest, CoachRequest,
     DashboardResponse, HRVStatus, CombinedStatus, ActivityItem,
-    SleepPoint, StepsPoint, TrendsResponse, PMCPoint,
+    SleepPoint, StepsPoint, TrendsResponse, PMCPoint, FTPPoint, FTPHistoryResponse,
+    PlannedLoad, ProjectionRequest, ProjectionResponse, ProjectionResult, PlanRequest, PlanResponse,
+    RollupResponse, RollupRow, ReadinessPoint, HomeResponse,
     CheckinToday, CoachResponse, UserCreate, UserLogin, TokenResponse, UserProfile,
-    GoalsRequest, ProfileRequest, WorkoutDownloadRequest,
+    GoalsRequest, ProfileRequest, WorkoutDownloadRequest, ActivityDeleteRequest,
 )
 from . import calculations as calc
 from . import data_manager as dm
+from . import timeseries as ts
+from . import daily_metrics
+from . import baselines, batch, data_version, date_index, fast_json, pmc, response_cache, rollups, writer
+from .context import CachedResponse, UserData, check_etag, get_user_data
 from .ai_coach import ask_coach
 from .database import create_tables, get_db, User, user_data_path
 from .auth import (
@@ -49,18 +60,21 @@ def _sync_days_for_user(user_id: int) -> int:
     return 30
 
 
+def _seconds_until(hour: int) -> float:
+    now = datetime.now()
+    next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+
 def _daily_sync_loop():
     """Background thread: sync all Garmin users once per day at ~3am."""
     from .garmin_sync import sync_activities, sync_health
     from .database import SessionLocal
     while True:
         # Warte bis 3:00 Uhr nachts
-        now = datetime.now()
-        next_run = now.replace(hour=3, minute=0, second=0, microsecond=0)
-        if next_run <= now:
-            next_run = next_run.replace(day=next_run.day + 1)
-        sleep_secs = (next_run - now).total_seconds()
-        time.sleep(sleep_secs)
+        time.sleep(_seconds_until(3))
 
         # Alle Garmin-User syncen
         try:
@@ -78,16 +92,43 @@ def _daily_sync_loop():
             pass
 
 
+# Analytics-Batch eine Stunde nach dem (derzeit deaktivierten) Garmin-Sync – NIGHTLY_BATCH=0 schaltet ihn ab
+NIGHTLY_BATCH = os.getenv("NIGHTLY_BATCH", "1") != "0"
+NIGHTLY_BATCH_HOUR = int(os.getenv("NIGHTLY_BATCH_HOUR", "4"))
+
+
+def _nightly_batch_loop():
+    """Background thread: precompute the analytics snapshots of all users once per day (batch.run)."""
+    from .database import SessionLocal
+    while True:
+        time.sleep(_seconds_until(NIGHTLY_BATCH_HOUR))
+        try:
+            db = SessionLocal()
+            overrides = {u.id: u.ftp_override for u in db.query(User).all()}
+            db.close()
+            print(f"[BATCH] {batch.run(list(overrides), overrides)}", flush=True)
+        except Exception as e:
+            print(f"[BATCH] failed: {e}", flush=True)
+
+
 @app.on_event("startup")
 def startup():
     create_tables()
     _migrate_db()
     # Auto-Sync deaktiviert – manueller Sync über App (verhindert Garmin Rate Limit)
     # threading.Thread(target=_daily_sync_loop, daemon=True).start()
+    if NIGHTLY_BATCH:
+        threading.Thread(target=_nightly_batch_loop, daemon=True, name="nightly-batch").start()
+
+
+_SCHEMA_VERSION = 1
 
 
 def _migrate_db():
-    """Add new columns to existing tables if they don't exist yet."""
+    """
+    Add new columns to existing tables if they don't exist yet, then run the
+    one-time steps above the database's PRAGMA user_version.
+    """
     from .database import engine
     with engine.connect() as conn:
         existing = [row[1] for row in conn.execute(
@@ -112,6 +153,21 @@ def _migrate_db():
         for col, sql in migrations:
             if col not in existing:
                 conn.execute(__import__("sqlalchemy").text(sql))
+        sync_columns = [row[1] for row in conn.execute(
+            __import__("sqlalchemy").text("PRAGMA table_info(timeseries_sync)")
+        )]
+        if "source_mark" not in sync_columns:
+            conn.execute(__import__("sqlalchemy").text(
+                "ALTER TABLE timeseries_sync ADD COLUMN source_mark TEXT DEFAULT ''"))
+        # Einmalige Schritte, über PRAGMA user_version gezählt
+        version = conn.execute(__import__("sqlalchemy").text("PRAGMA user_version")).scalar() or 0
+        if version < 1:
+            # Kopien von Stats und Check-ins werden nicht mehr gelesen (daily_metrics) – nur Aktivitäten bleiben in SQLite
+            for sql in ("DROP TABLE IF EXISTS daily_stats", "DROP TABLE IF EXISTS checkins",
+                        "DELETE FROM timeseries_sync WHERE kind != 'activities'"):
+                conn.execute(__import__("sqlalchemy").text(sql))
+        if version < _SCHEMA_VERSION:
+            conn.execute(__import__("sqlalchemy").text(f"PRAGMA user_version = {_SCHEMA_VERSION}"))
         conn.commit()
 
 
@@ -144,16 +200,15 @@ def login(body: UserLogin, db: Session = Depends(get_db)):
 
 
 @app.get("/api/auth/me", response_model=UserProfile)
-def get_me(current_user: User = Depends(get_current_user)):
-    df_act = dm.load_activities(current_user.id)
-    ftp_current = current_user.ftp_override or calc.compute_ftp(df_act)
+def get_me(data: UserData = Depends(get_user_data)):
+    current_user = data.user
     return UserProfile(
         user_id=current_user.id,
         email=current_user.email,
         name=current_user.name,
         ftp_override=current_user.ftp_override,
         ftp_target=current_user.ftp_target or 0,
-        ftp_current=ftp_current,
+        ftp_current=data.ftp,
         training_goal=current_user.training_goal or "",
         event_name=current_user.event_name or "",
         event_date=current_user.event_date or "",
@@ -173,6 +228,7 @@ def get_me(current_user: User = Depends(get_current_user)):
 def update_goals(body: GoalsRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
     current_user.ftp_target = body.ftp_target
     db.commit()
+    data_version.bump(current_user.id)
     return {"status": "saved", "ftp_target": body.ftp_target}
 
 
@@ -190,6 +246,7 @@ def update_profile(body: ProfileRequest, current_user: User = Depends(get_curren
     if body.gender              is not None: current_user.gender              = body.gender
     if body.intervals_athlete_id is not None: current_user.intervals_athlete_id = body.intervals_athlete_id
     db.commit()
+    data_version.bump(current_user.id)
     return {"status": "saved"}
 
 
@@ -256,7 +313,7 @@ def strava_sync_manual(current_user: User = Depends(get_current_user), db: Sessi
     """Manually backfill last 30 days of Strava activities."""
     if not current_user.strava_access_token:
         raise HTTPException(status_code=400, detail="Strava nicht verbunden")
-    from .strava_sync import get_valid_token, fetch_activities, activity_to_row, save_activity_to_csv, delete_activity_from_csv
+    from .strava_sync import get_valid_token, fetch_activities, activity_to_row, save_activities_to_csv
     from .data_manager import _user_files, _read_csv_safe
     import time as _time
     import pandas as pd
@@ -265,23 +322,24 @@ def strava_sync_manual(current_user: User = Depends(get_current_user), db: Sessi
     activities = fetch_activities(token, after_ts=after_ts, per_page=50)
     ftp = current_user.ftp_override or 230
     strava_ids = set()
-    count = 0
+    rows = []
     for act in activities:
         row = activity_to_row(act, ftp=ftp)
         if row:
-            save_activity_to_csv(row, current_user.id)
+            rows.append(row)
             strava_ids.add(str(act.get("id", "")))
-            count += 1
+    save_activities_to_csv(rows, current_user.id)
+    count = len(rows)
     # Remove Strava activities from CSV that no longer exist on Strava
     _, act_path, _ = _user_files(current_user.id)
-    df = _read_csv_safe(act_path)
+    df = _read_csv_safe(act_path, "activities")
     if not df.empty and "activityId" in df.columns:
         strava_rows = df[df["activityId"].astype(str).str.match(r"^\d{10,}$")]
         to_delete = strava_rows[~strava_rows["activityId"].astype(str).isin(strava_ids)]
-        deleted = 0
-        for aid in to_delete["activityId"].astype(str):
-            if delete_activity_from_csv(aid, current_user.id):
-                deleted += 1
+        deleted = dm.delete_activities(
+            [{"activityId": aid} for aid in to_delete["activityId"].astype(str)],
+            current_user.id, tombstone=False,
+        )
     else:
         deleted = 0
     return {"status": "ok", "imported": count, "deleted": deleted}
@@ -496,55 +554,58 @@ def health():
     return {"status": "ok", "timestamp": datetime.now().isoformat()}
 
 
+@app.get("/api/metrics")
+def get_metrics(data: UserData = Depends(get_user_data)):
+    """Process-level cache counters (shared by all users) plus the frame memory held for the caller."""
+    return {
+        "frame_cache": dm.cache_stats(),
+        "user_memory": dm.user_memory(data.uid),
+        "date_index": date_index.stats(),
+        "writer": writer.stats(),
+        "pmc": pmc.stats(),
+        "daily_metrics": daily_metrics.stats(),
+        "rollups": rollups.stats(),
+        "baselines": baselines.stats(),
+        "data_version": data_version.stats(),
+        "response_cache": response_cache.stats(),
+        "batch": batch.stats(),
+    }
+
+
 # ── Dashboard ────────────────────────────────────────────────────────────────
 
-@app.get("/api/dashboard", response_model=DashboardResponse)
-def get_dashboard(current_user: User = Depends(get_current_user)):
-    uid = current_user.id
-    df_stats = dm.load_stats(uid)
-    df_act = dm.load_activities(uid)
-
-    ftp = current_user.ftp_override or calc.compute_ftp(df_act)
-    pmc = calc.compute_ctl_atl_tsb(df_act, days=90)
-    latest = pmc.iloc[-1] if not pmc.empty else None
-    ctl = round(float(latest["CTL"]), 1) if latest is not None else 0.0
-    atl = round(float(latest["ATL"]), 1) if latest is not None else 0.0
-    tsb = round(float(latest["TSB"]), 1) if latest is not None else 0.0
-    weekly_load = calc.compute_weekly_load(df_act)
-    hrv_data = calc.compute_hrv_status(df_stats)
-    checkin = dm.get_checkin_today(uid)
-    combined = calc.compute_combined_status(hrv_data, tsb, checkin)
+def _latest_value(df: pd.DataFrame, col: str) -> float | None:
+    """Letzter vorhandener Wert einer Spalte (nicht immer täglich vorhanden)."""
+    if df.empty or col not in df.columns:
+        return None
+    v = pd.to_numeric(df.sort_values("Date")[col], errors="coerce").dropna()
+    return float(v.iloc[-1]) if not v.empty else None
+
+
+def _dashboard(data: UserData) -> DashboardResponse:
+    load = data.load
+    ctl = round(load["ctl"], 1)
+    atl = round(load["atl"], 1)
+    tsb = round(load["tsb"], 1)
+    combined = calc.compute_combined_status(data.hrv_status, tsb, data.checkin_today)
 
     # Latest single values – letzten vorhandenen Wert nehmen (nicht immer täglich vorhanden)
-    latest_sleep = None
-    latest_rhr = None
-    latest_vo2 = None
-    if not df_stats.empty:
-        df_sorted = df_stats.sort_values("Date")
-        if "Sleep Score" in df_sorted.columns:
-            s = pd.to_numeric(df_sorted["Sleep Score"], errors="coerce").dropna()
-            latest_sleep = float(s.iloc[-1]) if not s.empty else None
-        if "RHR" in df_sorted.columns:
-            r = pd.to_numeric(df_sorted["RHR"], errors="coerce").dropna()
-            latest_rhr = float(r.iloc[-1]) if not r.empty else None
-        if "VO2 Max" in df_sorted.columns:
-            v = pd.to_numeric(df_sorted["VO2 Max"], errors="coerce").dropna()
-            latest_vo2 = float(v.iloc[-1]) if not v.empty else None
+    latest_sleep = data.latest("sleep_score")
+    latest_rhr = data.latest("rhr")
+    latest_vo2 = data.latest("vo2max")
 
     # Fallback: VO2 Max aus Aktivitäten (Garmin schreibt es oft dort rein)
-    if latest_vo2 is None and not df_act.empty and "vo2Max" in df_act.columns:
-        act_vo2 = pd.to_numeric(df_act.sort_values("Date")["vo2Max"], errors="coerce").dropna()
-        if not act_vo2.empty:
-            latest_vo2 = float(act_vo2.iloc[-1])
+    if latest_vo2 is None:
+        latest_vo2 = _latest_value(data.activities, "vo2Max")
 
     return DashboardResponse(
         ctl=ctl,
         atl=atl,
         tsb=tsb,
-        ftp=ftp,
-        ftp_target=current_user.ftp_target or 250,
-        weekly_load=round(weekly_load, 1),
-        hrv=HRVStatus(**hrv_data),
+        ftp=data.ftp,
+        ftp_target=data.ftp_target,
+        weekly_load=round(data.weekly_load, 1),
+        hrv=HRVStatus(**data.hrv_status),
         status=CombinedStatus(**combined),
         latest_sleep=latest_sleep,
         latest_rhr=latest_rhr,
@@ -552,113 +613,372 @@ def get_dashboard(current_user: User = Depends(get_current_user)):
     )
 
 
+@app.get("/api/dashboard", response_model=DashboardResponse, dependencies=[Depends(check_etag)])
+def get_dashboard(data: UserData = Depends(get_user_data), cache: CachedResponse = Depends()):
+    return cache.respond(lambda: _dashboard(data))
+
+
+# ── Readiness ────────────────────────────────────────────────────────────────
+
+@app.get("/api/readiness/history", response_model=list[ReadinessPoint])
+def get_readiness_history(days: int = 90, data: UserData = Depends(get_user_data)):
+    """Kombinierter Status (HRV + TSB + Check-in) für jeden Tag – wie der Dashboard-Status, aber als Verlauf."""
+    since = pd.Timestamp.now().normalize() - pd.Timedelta(days=days - 1)
+    df = data.daily(since=since, columns=["TSB", "readiness"])
+    base = baselines.table(data.uid).reindex(df["Date"])
+    hrv = calc.hrv_status_codes(base["hrv"], base["hrv_mean7"])
+    tsb = df["TSB"].round(1).to_numpy()
+    checkin = df["readiness"].to_numpy()
+    status = calc.combined_status_arrays(hrv, tsb, checkin)
+    checkin_labels = calc.readiness_labels(checkin)
+    return [
+        ReadinessPoint(
+            date=str(d.date()),
+            score=float(status["score"][i]),
+            label=status["label"][i],
+            color=status["color"][i],
+            hrv_status=hrv[i],
+            tsb=float(tsb[i]),
+            checkin=None if np.isnan(checkin[i]) else float(checkin[i]),
+            checkin_label=checkin_labels[i] or None,
+        )
+        for i, d in enumerate(df["Date"])
+    ]
+
+
 # ── Activities ───────────────────────────────────────────────────────────────
 
-@app.get("/api/activities", response_model=list[ActivityItem])
-def get_activities(limit: int = 20, current_user: User = Depends(get_current_user)):
-    df = dm.load_activities(current_user.id)
-    if df.empty:
-        return []
-    recent = df.sort_values("Date", ascending=False).head(limit)
-    result = []
-    for _, row in recent.iterrows():
-        result.append(ActivityItem(
-            date=str(row["Date"].date()),
-            name=str(row.get("activityName", "—")),
-            tss=_safe_float(row.get("activityTrainingLoad")),
-            norm_power=_safe_float(row.get("normPower")),
-            avg_hr=_safe_float(row.get("averageHR")),
-            distance=_safe_float(row.get("distance")),
-            cadence=_safe_float(row.get("avgCadence")),
-        ))
-    return result
+@app.get("/api/activities", response_model=list[ActivityItem], dependencies=[Depends(check_etag)])
+def get_activities(limit: int = 20, current_user: User = Depends(get_current_user), db: Session = Depends(get_db),
+                   cache: CachedResponse = Depends()):
+    return cache.respond(lambda: _activities(db, current_user.id, limit))
+
+
+def _activities(db: Session, user_id: int, limit: int) -> list[dict]:
+    rows = ts.recent_activities(db, user_id, limit)
+    # Float-Spalten kommen aus SQLite schon als float/None – Felder von ActivityItem, ohne Model pro Zeile
+    return [
+        {
+            "date": str(a.date),
+            "name": a.name if a.name is not None else "—",
+            "tss": a.tss,
+            "norm_power": a.norm_power,
+            "avg_hr": a.avg_hr,
+            "distance": a.distance,
+            "cadence": a.avg_cadence,
+            "activity_id": a.activity_id,
+        }
+        for a in rows
+    ]
 
 
 # ── Sleep ────────────────────────────────────────────────────────────────────
 
-@app.get("/api/sleep", response_model=list[SleepPoint])
-def get_sleep(days: int = 90, current_user: User = Depends(get_current_user)):
-    df = dm.load_stats(current_user.id)
-    if df.empty or "Sleep Score" not in df.columns:
-        return []
-    cutoff = pd.Timestamp.now() - pd.Timedelta(days=days)
-    df = df[df["Date"] >= cutoff].sort_values("Date")
-    result = []
-    for _, row in df.iterrows():
-        val = _safe_float(row.get("Sleep Score"))
-        if val is not None and val > 0:
-            result.append(SleepPoint(date=str(row["Date"].date()), score=val))
-    return result
+@app.get("/api/sleep", response_model=list[SleepPoint], dependencies=[Depends(check_etag)])
+def get_sleep(days: int = 90, data: UserData = Depends(get_user_data), cache: CachedResponse = Depends()):
+    return cache.respond(lambda: _sleep(data, days))
+
+
+def _sleep(data: UserData, days: int) -> list[dict]:
+    since = pd.Timestamp.now().normalize() - pd.Timedelta(days=days - 1)
+    df = data.daily(since=since, columns=["sleep_score"])
+    df = df[df["sleep_score"] > 0]
+    return fast_json.records({"date": fast_json.iso_dates(df["Date"]), "score": df["sleep_score"].astype(float)})
 
 
 # ── Steps ────────────────────────────────────────────────────────────────────
 
-@app.get("/api/steps", response_model=list[StepsPoint])
-def get_steps(days: int = 30, current_user: User = Depends(get_current_user)):
-    df = dm.load_stats(current_user.id)
-    if df.empty or "Steps" not in df.columns:
-        return []
-    cutoff = pd.Timestamp.now() - pd.Timedelta(days=days)
-    df = df[df["Date"] >= cutoff].sort_values("Date")
-    result = []
-    for _, row in df.iterrows():
-        val = pd.to_numeric(row.get("Steps"), errors="coerce")
-        if pd.notna(val) and val > 0:
-            result.append(StepsPoint(date=str(row["Date"].date()), steps=int(val)))
-    return result
+@app.get("/api/steps", response_model=list[StepsPoint], dependencies=[Depends(check_etag)])
+def get_steps(days: int = 30, data: UserData = Depends(get_user_data), cache: CachedResponse = Depends()):
+    return cache.respond(lambda: _steps(data, days))
+
+
+def _steps(data: UserData, days: int) -> list[dict]:
+    since = pd.Timestamp.now().normalize() - pd.Timedelta(days=days - 1)
+    df = data.daily(since=since, columns=["steps"])
+    df = df[df["steps"] > 0]
+    return fast_json.records({"date": fast_json.iso_dates(df["Date"]), "steps": df["steps"].astype(int)})
 
 
 # ── Trends ───────────────────────────────────────────────────────────────────
 
-@app.get("/api/trends", response_model=TrendsResponse)
-def get_trends(days: int = 90, current_user: User = Depends(get_current_user)):
-    df_stats = dm.load_stats(current_user.id)
-    df_act = dm.load_activities(current_user.id)
+def _pmc_points(data: UserData, days: int) -> list[dict]:
+    """PMCPoint-Felder pro Tag, spaltenweise gebaut."""
+    since = pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
+    pmc_df = data.daily(since=since, columns=["CTL", "ATL", "TSB"])
+    return fast_json.records({
+        "date": fast_json.iso_dates(pmc_df["Date"]),
+        **{k.lower(): pmc_df[k].astype(float).round(1) for k in ("CTL", "ATL", "TSB")},
+    })
 
-    ftp = current_user.ftp_override or calc.compute_ftp(df_act)
-    pmc = calc.compute_ctl_atl_tsb(df_act, days=days)
 
-    pmc_points = [
-        PMCPoint(
-            date=str(row["Date"].date()),
-            ctl=round(float(row["CTL"]), 1),
-            atl=round(float(row["ATL"]), 1),
-            tsb=round(float(row["TSB"]), 1),
+def _vo2_points(data: UserData) -> list[dict]:
+    # VO2 Max history (all time)
+    vo2_df = data.daily(columns=["vo2max"])
+    vo2_df = vo2_df[vo2_df["vo2max"] > 0]
+    return fast_json.records({"date": fast_json.iso_dates(vo2_df["Date"]), "vo2max": vo2_df["vo2max"].astype(float)})
+
+
+@app.get("/api/trends", response_model=TrendsResponse, dependencies=[Depends(check_etag)])
+def get_trends(days: int = 90, sport: str | None = None, data: UserData = Depends(get_user_data),
+               cache: CachedResponse = Depends()):
+    return cache.respond(lambda: _trends(data, days, sport))
+
+
+def _trends(data: UserData, days: int, sport: str | None) -> dict:
+    df_act = data.activities
+    since = pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
+
+    # Zeit in HF-Zonen pro Woche – Leistungszonen bräuchten Streams, die nicht gespeichert werden
+    weekly = calc.weekly_zone_seconds(df_act[df_act["Date"] >= since] if "Date" in df_act.columns else df_act)
+    if sport:
+        weekly = weekly[weekly["sportType"] == sport]
+    pol = calc.weekly_polarization(weekly)
+    index = pol["polarization_index"]
+    polarization = fast_json.records({
+        "week": fast_json.iso_dates(pol["Week"]),
+        **{k: pol[k] for k in ("hours", "low", "moderate", "high")},
+        "polarization_index": index.astype(object).where(index.notna(), None),
+    })
+
+    # Felder von TrendsResponse – die Punktlisten sind schon fertige dicts
+    return {
+        "pmc": _pmc_points(data, days),
+        "vo2max": _vo2_points(data),
+        "ftp": float(data.ftp),
+        "ftp_target": data.ftp_target,
+        "training_distribution": data.training_distribution,
+        "polarization": polarization,
+    }
+
+
+# ── Home ─────────────────────────────────────────────────────────────────────
+
+HOME_PMC_DAYS = 90
+
+
+@app.get("/api/home", response_model=HomeResponse, dependencies=[Depends(check_etag)])
+def get_home(data: UserData = Depends(get_user_data), cache: CachedResponse = Depends()):
+    """Dashboard + PMC + VO2max + Trainingsverteilung in einem Aufruf – Daten werden nur einmal geladen."""
+    return cache.respond(lambda: {
+        "dashboard": _dashboard(data),
+        "pmc": _pmc_points(data, HOME_PMC_DAYS),
+        "vo2max": _vo2_points(data),
+        "training_distribution": data.training_distribution,
+    })
+
+
+# ── FTP ──────────────────────────────────────────────────────────────────────
+
+@app.get("/api/ftp/history", response_model=FTPHistoryResponse)
+def get_ftp_history(days: int | None = None, data: UserData = Depends(get_user_data)):
+    """Tägliche FTP (bestes NP der letzten 90 Tage × 0.95) für den Verlauf gegen ftp_target."""
+    df = pmc.ftp_history(data.uid)
+    if days is not None:
+        df = df[df["Date"] >= pd.Timestamp.now().normalize() - pd.Timedelta(days=days)]
+    return FTPHistoryResponse(
+        points=[FTPPoint(date=str(d.date()), ftp=float(v)) for d, v in zip(df["Date"], df["FTP"])],
+        ftp_current=data.ftp,
+        ftp_override=data.user.ftp_override or 0,
+        ftp_target=data.ftp_target,
+    )
+
+
+# ── Rollups ──────────────────────────────────────────────────────────────────
+
+_ROLLUP_LABELS = {"week": lambda d: f"{d.isocalendar().year}-W{d.isocalendar().week:02d}",
+                  "month": lambda d: d.strftime("%Y-%m"),
+                  "year": lambda d: d.strftime("%Y")}
+
+
+@app.get("/api/rollups", response_model=RollupResponse)
+def get_rollups(period: str = "month", years: int = 5, sport: str | None = None, by_sport: bool = False,
+                data: UserData = Depends(get_user_data)):
+    """Summen pro Woche/Monat/Jahr (TSS, Stunden, km, Höhenmeter, kcal, Einheiten), optional pro Sportart."""
+    if period not in rollups.PERIODS:
+        raise HTTPException(status_code=422, detail="period muss week, month oder year sein.")
+    since = pd.Timestamp.now().normalize() - pd.DateOffset(years=years)
+    df = rollups.table(data.uid, period, since=since, sport=sport, by_sport=by_sport)
+    label = _ROLLUP_LABELS[period]
+    rows = [
+        RollupRow(
+            start=str(r.start.date()),
+            label=label(r.start),
+            sport=r.sportType if by_sport else None,
+            tss=round(float(r.tss), 1),
+            hours=round(float(r.duration_s) / 3600, 1),
+            distance_km=round(float(r.distance_km), 1),
+            ascent_m=round(float(r.ascent_m)),
+            calories=round(float(r.calories)),
+            sessions=int(r.sessions),
         )
-        for _, row in pmc.iterrows()
+        for r in df.itertuples(index=False)
     ]
+    return RollupResponse(period=period, sports=rollups.sports(data.uid), rows=rows)
 
-    # VO2 Max history (all time)
-    vo2_points = []
-    if not df_stats.empty and "VO2 Max" in df_stats.columns:
-        vo2_df = df_stats[["Date", "VO2 Max"]].dropna()
-        vo2_df = vo2_df[pd.to_numeric(vo2_df["VO2 Max"], errors="coerce") > 0]
-        for _, row in vo2_df.iterrows():
-            vo2_points.append({
-                "date": str(row["Date"].date()),
-                "vo2max": float(row["VO2 Max"]),
-            })
-
-    dist = calc.compute_training_distribution(df_act, ftp)
-
-    return TrendsResponse(
-        pmc=pmc_points,
-        vo2max=vo2_points,
-        ftp=ftp,
-        ftp_target=current_user.ftp_target or 250,
-        training_distribution=dist,
+
+# ── PMC Projection ───────────────────────────────────────────────────────────
+
+from xml.etree.ElementTree import ParseError
+from .workout_converter import zwo_tss
+
+PROJECTION_MAX_DAYS = 365
+
+
+def _parse_day(value: str, field: str) -> pd.Timestamp:
+    try:
+        return pd.Timestamp(datetime.strptime(value[:10], "%Y-%m-%d"))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail=f"{field}: Datum im Format YYYY-MM-DD erwartet.")
+
+
+def _planned_tss(item: PlannedLoad) -> float:
+    if item.load is not None:
+        return float(item.load)
+    if item.zwo:
+        try:
+            return zwo_tss(item.zwo)
+        except (ParseError, ValueError):
+            raise HTTPException(status_code=422, detail=f"{item.date}: ZWO konnte nicht gelesen werden.")
+    return 0.0
+
+
+def _pmc_point(d: pd.Timestamp, c: float, a: float, t: float) -> PMCPoint:
+    return PMCPoint(date=str(d.date()), ctl=round(float(c), 1), atl=round(float(a), 1), tsb=round(float(t), 1))
+
+
+def _add_loads(loads: np.ndarray, first_day: pd.Timestamp, items: list[PlannedLoad]) -> None:
+    """Add each item's TSS to its day; days outside the projection window are ignored."""
+    for item in items:
+        i = (_parse_day(item.date, "date") - first_day).days
+        if 0 <= i < len(loads):
+            loads[i] += _planned_tss(item)
+
+
+@app.post("/api/pmc/projection", response_model=ProjectionResponse)
+def post_pmc_projection(body: ProjectionRequest, data: UserData = Depends(get_user_data)):
+    """
+    CTL/ATL/TSB ab morgen bis end_date (Default: event_date) aus geplanten Einheiten –
+    aus dem Request oder dem intervals.icu Plan. Jedes Szenario verändert den Plan
+    (Tage auslassen, Einheiten hinzufügen); alle werden in einem Durchlauf gerechnet.
+    """
+    current_user = data.user
+    today = pd.Timestamp.now().normalize()
+    end_value = body.end_date or current_user.event_date
+    if not end_value:
+        raise HTTPException(status_code=400, detail="Kein end_date und kein Event-Datum gesetzt.")
+    end = _parse_day(end_value, "end_date")
+    horizon = (end - today).days
+    if horizon < 1 or horizon > PROJECTION_MAX_DAYS:
+        raise HTTPException(status_code=400,
+                            detail=f"end_date muss 1–{PROJECTION_MAX_DAYS} Tage in der Zukunft liegen.")
+    first_day = today + pd.Timedelta(days=1)
+    days = pd.date_range(first_day, end, freq="D")
+
+    base = np.zeros(horizon)
+    source = "none"
+    if body.planned is not None:
+        _add_loads(base, first_day, body.planned)
+        source = "request"
+    elif current_user.intervals_athlete_id and os.getenv("INTERVALS_API_KEY"):
+        from .intervals_sync import get_planned_workouts
+        try:
+            workouts = get_planned_workouts(current_user.intervals_athlete_id,
+                                            os.getenv("INTERVALS_API_KEY"), days=horizon)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"intervals.icu nicht erreichbar: {e}")
+        _add_loads(base, first_day, [PlannedLoad(date=w["date"], load=w["load"] or 0.0)
+                                     for w in workouts if w.get("date")])
+        source = "intervals"
+
+    names = ["Plan"]
+    rows = [base]
+    for scenario in body.scenarios:
+        loads = base.copy()
+        for day in scenario.skip:
+            i = (_parse_day(day, "skip") - first_day).days
+            if 0 <= i < horizon:
+                loads[i] = 0.0
+        _add_loads(loads, first_day, scenario.add)
+        names.append(scenario.name)
+        rows.append(loads)
+
+    now = data.load
+    ctl, atl, tsb = calc.project_pmc(np.vstack(rows), now["ctl"], now["atl"])
+
+    results = []
+    for i, name in enumerate(names):
+        points = [_pmc_point(d, c, a, t) for d, c, a, t in zip(days, ctl[i], atl[i], tsb[i])]
+        results.append(ProjectionResult(name=name, points=points, end=points[-1]))
+    return ProjectionResponse(
+        start=_pmc_point(today, now["ctl"], now["atl"], now["tsb"]),
+        end_date=str(end.date()),
+        source=source,
+        planned=[{"date": str(d.date()), "load": float(v)} for d, v in zip(days, base) if v],
+        scenarios=results,
+    )
+
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+# Ohne Trainingstage im Profil: typische Tage je Trainingshäufigkeit (siehe FREQUENCY_DESCRIPTIONS)
+PLAN_DEFAULT_DAYS = {"low": "wed,sat", "mid": "tue,thu,sat,sun", "high": ",".join(WEEKDAYS)}
+# Weniger Einheiten pro Woche → jede darf mehr TSS tragen
+PLAN_MAX_DAILY_TSS = {"low": 250.0, "mid": 200.0, "high": 150.0}
+
+
+@app.post("/api/pmc/plan", response_model=PlanResponse)
+def post_pmc_plan(body: PlanRequest, data: UserData = Depends(get_user_data)):
+    """
+    Tägliche TSS bis zum Event, sodass CTL und TSB am Event-Morgen target_ctl /
+    target_tsb erreichen – nur an Trainingstagen, höchstens max_daily_tss pro Tag.
+    """
+    current_user = data.user
+    today = pd.Timestamp.now().normalize()
+    event_value = body.event_date or current_user.event_date
+    if not event_value:
+        raise HTTPException(status_code=400, detail="Kein event_date und kein Event-Datum gesetzt.")
+    event = _parse_day(event_value, "event_date")
+    # Geplant wird bis zum Vortag – der Stand am Event-Morgen ist der nach dem letzten Plantag
+    horizon = (event - today).days - 1
+    if horizon < 1 or horizon > PROJECTION_MAX_DAYS:
+        raise HTTPException(status_code=400,
+                            detail=f"event_date muss 2–{PROJECTION_MAX_DAYS + 1} Tage in der Zukunft liegen.")
+    frequency = current_user.training_frequency or "mid"
+    day_names = body.training_days or current_user.training_days or PLAN_DEFAULT_DAYS.get(frequency, "")
+    training_days = [d for d in WEEKDAYS if d in day_names.split(",")]
+    if not training_days:
+        raise HTTPException(status_code=422, detail="training_days: keine gültigen Wochentage (mon–sun).")
+    max_daily = body.max_daily_tss or PLAN_MAX_DAILY_TSS.get(frequency, 200.0)
+
+    days = pd.date_range(today + pd.Timedelta(days=1), periods=horizon, freq="D")
+    mask = np.isin(days.dayofweek, [WEEKDAYS.index(d) for d in training_days])
+    now = data.load
+    started = time.perf_counter()
+    loads = calc.plan_load(now["ctl"], now["atl"], mask, body.target_ctl, body.target_tsb, max_daily)
+    solve_ms = (time.perf_counter() - started) * 1000
+    ctl, atl, tsb = calc.project_pmc(loads, now["ctl"], now["atl"])
+    points = [_pmc_point(d, c, a, t) for d, c, a, t in zip(days, ctl[0], atl[0], tsb[0])]
+    return PlanResponse(
+        start=_pmc_point(today, now["ctl"], now["atl"], now["tsb"]),
+        event_date=str(event.date()),
+        training_days=training_days,
+        max_daily_tss=max_daily,
+        plan=[{"date": str(d.date()), "load": round(float(v))} for d, v in zip(days, loads)],
+        points=points,
+        end=points[-1],
+        solve_ms=round(solve_ms, 1),
     )
 
 
 # ── Check-in ─────────────────────────────────────────────────────────────────
 
 @app.get("/api/checkin/today", response_model=CheckinToday)
-def get_checkin_today(current_user: User = Depends(get_current_user)):
-    data = dm.get_checkin_today(current_user.id)
-    if data is None:
+def get_checkin_today(data: UserData = Depends(get_user_data)):
+    checkin = data.checkin_today
+    if checkin is None:
         return CheckinToday(exists=False)
-    score, label = calc.compute_readiness(data)
-    return CheckinToday(exists=True, readiness_score=score, readiness_label=label, **data)
+    score, label = calc.compute_readiness(checkin)
+    return CheckinToday(exists=True, readiness_score=score, readiness_label=label, **checkin)
 
 
 @app.post("/api/checkin")
@@ -671,46 +991,49 @@ def post_checkin(body: CheckinRequest, current_user: User = Depends(get_current_
 
 
 @app.get("/api/checkin/debug")
-def debug_checkin(current_user: User = Depends(get_current_user)):
+def debug_checkin(data: UserData = Depends(get_user_data)):
     """Debug: returns user ID, checkin file path, and raw recent checkin data."""
     from .database import user_data_path
     import os
+    current_user = data.user
     checkin_path = os.path.join(user_data_path(current_user.id), "daily_checkin.csv")
     raw = ""
     if os.path.exists(checkin_path):
         with open(checkin_path) as f:
             raw = f.read()
-    recent = dm.get_checkin_recent(current_user.id)
-    today = dm.get_checkin_today(current_user.id)
+    raw_journal = "".join(
+        open(p).read() for p in dm._journal_paths(current_user.id) if os.path.exists(p)
+    )
+    recent = data.checkin_recent
+    today = data.checkin_today
     return {
         "user_id": current_user.id,
         "email": current_user.email,
         "checkin_path": checkin_path,
         "file_exists": os.path.exists(checkin_path),
         "raw_csv": raw,
+        "raw_journal": raw_journal,
         "get_checkin_recent": recent,
         "get_checkin_today": today,
     }
 
 
-@app.get("/api/checkin/matrix")
-def get_matrix(current_user: User = Depends(get_current_user)):
-    df = dm.load_checkins(current_user.id)
+@app.get("/api/checkin/matrix", dependencies=[Depends(check_etag)])
+def get_matrix(data: UserData = Depends(get_user_data), cache: CachedResponse = Depends()):
+    return cache.respond(lambda: _matrix(data))
+
+
+def _matrix(data: UserData) -> list[dict]:
+    df = data.checkins
     if df.empty or "RPE" not in df.columns:
         return []
     df = df.dropna(subset=["RPE"])
-    result = []
-    for _, r in df.iterrows():
-        rpe  = r.get("RPE")
-        feel = r.get("Feel")
-        if pd.isna(rpe):
-            continue
-        result.append({
-            "date": r["Date"].strftime("%Y-%m-%d") if hasattr(r["Date"], "strftime") else str(r["Date"]),
-            "rpe":  float(rpe),
-            "feel": float(feel) if not pd.isna(feel) else None,
-        })
-    return result
+    feel = pd.to_numeric(df["Feel"], errors="coerce") if "Feel" in df.columns else pd.Series(np.nan, index=df.index)
+    return fast_json.records({
+        "date": fast_json.iso_dates(df["Date"]),
+        "rpe": pd.to_numeric(df["RPE"], errors="coerce").astype(float),
+        "feel": feel.astype(object).where(feel.notna(), None),
+    })
 
 
 @app.post("/api/checkin/matrix")
@@ -725,18 +1048,9 @@ def post_matrix(body: MatrixRequest, current_user: User = Depends(get_current_us
 # ── AI Coach ─────────────────────────────────────────────────────────────────
 
 @app.post("/api/coach", response_model=CoachResponse)
-def post_coach(body: CoachRequest, current_user: User = Depends(get_current_user)):
-    df_stats = dm.load_stats(current_user.id)
-    df_act = dm.load_activities(current_user.id)
-
-    ftp = current_user.ftp_override or calc.compute_ftp(df_act)
-    pmc = calc.compute_ctl_atl_tsb(df_act, days=90)
-    latest = pmc.iloc[-1] if not pmc.empty else None
-    ctl = float(latest["CTL"]) if latest is not None else 0.0
-    atl = float(latest["ATL"]) if latest is not None else 0.0
-    tsb = float(latest["TSB"]) if latest is not None else 0.0
-    weekly_load = calc.compute_weekly_load(df_act)
-    checkin = dm.get_checkin_recent(current_user.id)
+def post_coach(body: CoachRequest, data: UserData = Depends(get_user_data)):
+    current_user = data.user
+    checkin = data.checkin_recent
     print(f"[COACH] user_id={current_user.id} email={current_user.email} checkin={'FOUND: '+checkin.get('date','?') if checkin else 'NONE'}", flush=True)
 
     # intervals.icu Wochenplan als Coach-Kontext
@@ -754,19 +1068,7 @@ def post_coach(body: CoachRequest, current_user: User = Depends(get_current_user
     combined_context = intervals_context or body.tp_context
 
     try:
-        result = ask_coach(
-            message=body.message,
-            ctl=ctl, atl=atl, tsb=tsb,
-            ftp=ftp, weekly_load=weekly_load,
-            df_stats=df_stats, df_act=df_act,
-            checkin=checkin,
-            tp_context=combined_context,
-            training_goal=current_user.training_goal or "",
-            event_name=current_user.event_name or "",
-            event_date=current_user.event_date or "",
-            training_frequency=current_user.training_frequency or "",
-            training_days=current_user.training_days or "",
-        )
+        result = ask_coach(message=body.message, data=data, tp_context=combined_context)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI Coach error: {e}")
 
@@ -779,25 +1081,23 @@ from fastapi.responses import Response as FastAPIResponse
 from .workout_converter import zwo_to_erg, zwo_to_tcx, zwo_to_workout_card
 
 @app.post("/api/workout/download/erg")
-def download_erg(body: WorkoutDownloadRequest, current_user: User = Depends(get_current_user)):
-    df_act = dm.load_activities(current_user.id)
-    ftp = body.ftp or current_user.ftp_override or calc.compute_ftp(df_act)
+def download_erg(body: WorkoutDownloadRequest, data: UserData = Depends(get_user_data)):
+    # body.ftp first – the rolling FTP is only computed when the app sends none
+    ftp = body.ftp or data.ftp
     content = zwo_to_erg(body.xml, ftp=int(ftp))
     return FastAPIResponse(content=content, media_type="text/plain",
         headers={"Content-Disposition": "attachment; filename=skywalker_workout.erg"})
 
 @app.post("/api/workout/download/tcx")
-def download_tcx(body: WorkoutDownloadRequest, current_user: User = Depends(get_current_user)):
-    df_act = dm.load_activities(current_user.id)
-    ftp = body.ftp or current_user.ftp_override or calc.compute_ftp(df_act)
+def download_tcx(body: WorkoutDownloadRequest, data: UserData = Depends(get_user_data)):
+    ftp = body.ftp or data.ftp
     content = zwo_to_tcx(body.xml, ftp=int(ftp))
     return FastAPIResponse(content=content, media_type="application/xml",
         headers={"Content-Disposition": "attachment; filename=skywalker_workout.tcx"})
 
 @app.post("/api/workout/download/card")
-def download_card(body: WorkoutDownloadRequest, current_user: User = Depends(get_current_user)):
-    df_act = dm.load_activities(current_user.id)
-    ftp = body.ftp or current_user.ftp_override or calc.compute_ftp(df_act)
+def download_card(body: WorkoutDownloadRequest, data: UserData = Depends(get_user_data)):
+    ftp = body.ftp or data.ftp
     content = zwo_to_workout_card(body.xml, ftp=int(ftp))
     return FastAPIResponse(content=content, media_type="text/plain",
         headers={"Content-Disposition": "attachment; filename=skywalker_workout_card.txt"})
@@ -813,26 +1113,68 @@ def delete_activity(date: str, name: str, current_user: User = Depends(get_curre
     return {"status": "deleted"}
 
 
+@app.post("/api/activities/delete")
+def delete_activities_bulk(body: ActivityDeleteRequest, current_user: User = Depends(get_current_user)):
+    """Delete many activities at once – one file rewrite instead of one per activity."""
+    items = []
+    for ref in body.activities:
+        if ref.activity_id:
+            items.append({"activityId": ref.activity_id, "date": ref.date, "name": ref.name})
+        elif ref.date and ref.name:
+            items.append({"date": ref.date, "name": ref.name})
+        else:
+            raise HTTPException(status_code=422, detail="activity_id oder date + name erforderlich.")
+    deleted = dm.delete_activities(items, current_user.id)
+    return {"status": "deleted", "deleted": deleted}
+
+
 # ── Upload ───────────────────────────────────────────────────────────────────
 
-@app.post("/api/upload/stats")
-async def upload_stats(file: UploadFile = File(...), current_user: User = Depends(get_current_user)):
-    content = await file.read()
+def _spool_upload(file: UploadFile, user_id: int) -> str:
+    """Copy the upload to a temp file on the data volume in 1 MB blocks – never fully in RAM."""
+    fd, path = tempfile.mkstemp(suffix=".upload", dir=user_data_path(user_id))
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(file.file, out, 1 << 20)
+    return path
+
+
+def _ingest_upload(file: UploadFile, target: str, user_id: int, progress: bool):
+    path = _spool_upload(file, user_id)
+    if progress:
+        # NDJSON: one line per parsed chunk, then a summary line
+        def stream():
+            added = 0
+            try:
+                with open(path, "rb") as f:
+                    for step in dm.iter_upload(f, target, user_id):
+                        added += step["rows_added"]
+                        yield json.dumps(step) + "\n"
+                yield json.dumps({"status": "ok", "rows_added": added}) + "\n"
+            except ValueError as e:
+                yield json.dumps({"status": "error", "detail": str(e), "rows_added": added}) + "\n"
+            finally:
+                os.remove(path)
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
     try:
-        added = dm.merge_upload(content, "stats", current_user.id)
+        with open(path, "rb") as f:
+            result = dm.ingest_upload(f, target, user_id)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    return {"status": "ok", "rows_added": added}
+    finally:
+        os.remove(path)
+    return {"status": "ok", **result}
+
+
+@app.post("/api/upload/stats")
+def upload_stats(file: UploadFile = File(...), progress: bool = False,
+                 current_user: User = Depends(get_current_user)):
+    return _ingest_upload(file, "stats", current_user.id, progress)
 
 
 @app.post("/api/upload/activities")
-async def upload_activities(file: UploadFile = File(...), current_user: User = Depends(get_current_user)):
-    content = await file.read()
-    try:
-        added = dm.merge_upload(content, "activities", current_user.id)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    return {"status": "ok", "rows_added": added}
+def upload_activities(file: UploadFile = File(...), progress: bool = False,
+                      current_user: User = Depends(get_current_user)):
+    return _ingest_upload(file, "activities", current_user.id, progress)
 
 
 # ── Services ─────────────────────────────────────────────────────────────────
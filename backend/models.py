@@ -88,6 +88,32 @@ class MatrixRequest(BaseModel):
     feel: float                # Suffering 1-10
 
 
+class PlannedLoad(BaseModel):
+    date: str                  # YYYY-MM-DD
+    load: Optional[float] = None   # TSS / intervals.icu load
+    zwo: Optional[str] = None      # ZWO XML – TSS wird aus dem Workout berechnet
+
+
+class ProjectionScenario(BaseModel):
+    name: str
+    add: list[PlannedLoad] = []    # zusätzliche Einheiten (z.B. Extra-Ausfahrt)
+    skip: list[str] = []           # Tage, an denen der Plan ausfällt
+
+
+class ProjectionRequest(BaseModel):
+    planned: Optional[list[PlannedLoad]] = None   # None → intervals.icu Plan
+    end_date: Optional[str] = None                # Default: event_date
+    scenarios: list[ProjectionScenario] = []
+
+
+class PlanRequest(BaseModel):
+    target_ctl: float
+    target_tsb: float = 10.0                  # Form am Event-Morgen (Taper)
+    event_date: Optional[str] = None          # Default: event_date des Users
+    training_days: Optional[str] = None       # "mon,wed,sat" – Default: Profil
+    max_daily_tss: Optional[float] = None     # Default: nach training_frequency
+
+
 class CoachRequest(BaseModel):
     message: str               # User's question or button action
     tp_context: Optional[str] = None   # Optional TrainingPeaks text context
@@ -101,6 +127,8 @@ class HRVStatus(BaseModel):
     current: float
     baseline: float
     ratio: Optional[float] = None
+    z: Optional[float] = None      # z-Score ggü. 60-Tage-Baseline
+    cv: Optional[float] = None     # Variationskoeffizient der letzten 7 Tage
 
 
 class CombinedStatus(BaseModel):
@@ -132,6 +160,17 @@ class ActivityItem(BaseModel):
     avg_hr: Optional[float] = None
     distance: Optional[float] = None
     cadence: Optional[float] = None
+    activity_id: Optional[str] = None
+
+
+class ActivityRef(BaseModel):
+    activity_id: Optional[str] = None
+    date: Optional[str] = None
+    name: Optional[str] = None
+
+
+class ActivityDeleteRequest(BaseModel):
+    activities: list[ActivityRef]
 
 
 class SleepPoint(BaseModel):
@@ -157,6 +196,80 @@ class TrendsResponse(BaseModel):
     ftp: float
     ftp_target: int
     training_distribution: dict    # zone -> percentage
+    polarization: list[dict] = []  # pro ISO-Woche: week, hours, low/moderate/high %, polarization_index
+
+
+class HomeResponse(BaseModel):
+    dashboard: DashboardResponse
+    pmc: list[PMCPoint]            # letzte 90 Tage
+    vo2max: list[dict]
+    training_distribution: dict    # zone -> percentage
+
+
+class ProjectionResult(BaseModel):
+    name: str
+    points: list[PMCPoint]     # ab morgen bis end_date
+    end: PMCPoint
+
+
+class ProjectionResponse(BaseModel):
+    start: PMCPoint            # heute
+    end_date: str
+    source: str                # request / intervals / none
+    planned: list[dict]        # [{date, load}] des Basisplans
+    scenarios: list[ProjectionResult]   # erster Eintrag: Plan ohne Änderungen
+
+
+class PlanResponse(BaseModel):
+    start: PMCPoint            # heute
+    event_date: str
+    training_days: list[str]
+    max_daily_tss: float
+    plan: list[dict]           # [{date, load}] für jeden Tag bis zum Vortag des Events
+    points: list[PMCPoint]     # projizierte CTL/ATL/TSB mit diesem Plan
+    end: PMCPoint              # Stand am Event-Morgen
+    solve_ms: float
+
+
+class RollupRow(BaseModel):
+    start: str                 # erster Tag der Woche (Mo) / des Monats / des Jahres
+    label: str                 # 2026-W42 / 2026-10 / 2026
+    sport: Optional[str] = None    # nur mit by_sport
+    tss: float
+    hours: float
+    distance_km: float
+    ascent_m: float
+    calories: float
+    sessions: int
+
+
+class RollupResponse(BaseModel):
+    period: str                # week / month / year
+    sports: list[str]          # alle sportTypes mit Aktivitäten
+    rows: list[RollupRow]
+
+
+class FTPPoint(BaseModel):
+    date: str
+    ftp: float
+
+
+class FTPHistoryResponse(BaseModel):
+    points: list[FTPPoint]
+    ftp_current: float
+    ftp_override: int = 0
+    ftp_target: int
+
+
+class ReadinessPoint(BaseModel):
+    date: str
+    score: float               # kombinierter Status 0-10 wie /api/dashboard
+    label: str
+    color: str
+    hrv_status: str            # green / yellow / red / unknown
+    tsb: float
+    checkin: Optional[float] = None        # Check-in Score, falls vorhanden
+    checkin_label: Optional[str] = None
 
 
 class CheckinToday(BaseModel):
@@ -0,0 +1,224 @@
+"""
+Performance Management Chart state per user – CTL/ATL/TSB and FTP over the full history.
+
+The daily TSS and best-NP series since the first activity, their CTL/ATL EWMAs
+and the rolling FTP are kept in memory and persisted to pmc_state.json in the
+user dir. When activities were only appended (syncs, uploads), the days from
+the earliest appended one on are loaded and re-summed (data_manager.appended_since)
+and the EWMAs continue from the stored CTL/ATL of the day before, the FTP from
+the trailing FTP window; days that passed since the last request are appended
+the same way. Any other change (deletes, rewrites) loads all activities, and
+only the days from the first one that differs from the stored series are
+recomputed. Endpoints slice the stored series, so CTL is correct however far back
+the training goes and a request costs the same for one or ten years of history.
+CTL/ATL start at 0 the day before the first activity.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from . import calculations as calc
+from . import data_manager as dm
+from .user_state import UserStates
+
+_STATE_FILE = "pmc_state.json"
+
+
+class _State:
+    def __init__(self, signature: list, start: pd.Timestamp, tss: np.ndarray, ctl: np.ndarray, atl: np.ndarray,
+                 best_np: np.ndarray, ftp: np.ndarray, mark: dict | None = None):
+        self.signature = signature      # data_manager.data_signature(user, "activities") it was built from
+        self.mark = mark                # data_manager.data_mark of those activities
+        self.start = start              # date of tss[0]
+        self.tss = tss
+        self.ctl = ctl
+        self.atl = atl
+        self.best_np = best_np          # best normalized power per day, NaN without power data
+        self.ftp = ftp
+
+    @property
+    def end(self) -> pd.Timestamp | None:
+        return self.start + pd.Timedelta(days=len(self.tss) - 1) if len(self.tss) else None
+
+    def to_json(self) -> dict:
+        return {
+            "signature": self.signature,
+            "mark": self.mark,
+            "start": self.start.strftime("%Y-%m-%d"),
+            "tss": self.tss.tolist(),
+            "ctl": self.ctl.tolist(),
+            "atl": self.atl.tolist(),
+            "best_np": self.best_np.tolist(),
+            "ftp": self.ftp.tolist(),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "_State":
+        return cls(data["signature"], pd.Timestamp(data["start"]),
+                   np.asarray(data["tss"], dtype=float),
+                   np.asarray(data["ctl"], dtype=float),
+                   np.asarray(data["atl"], dtype=float),
+                   np.asarray(data["best_np"], dtype=float),
+                   np.asarray(data["ftp"], dtype=float),
+                   data.get("mark"))
+
+
+_states = UserStates(_STATE_FILE, _State.from_json, _State.to_json,
+                     hits=0, updates=0, rebuilds=0, days_recomputed=0)
+_counters = _states.counters
+
+
+def _signature(user_id: int | None, signature: tuple | None = None) -> list:
+    # JSON round trip turns tuples into lists – compare in that form
+    if signature is None:
+        signature = dm.data_signature(user_id, "activities")
+    return json.loads(json.dumps(signature))
+
+
+def _empty_state(signature: list, mark: dict | None, today: pd.Timestamp) -> _State:
+    return _State(signature, today, *(np.zeros(0) for _ in range(5)), mark)
+
+
+def _first_change(old: _State | None, start: pd.Timestamp, tss: np.ndarray, best_np: np.ndarray) -> int:
+    """Index of the first day whose TSS or best NP differs from the stored series (len(tss) if none)."""
+    if old is None or not len(old.tss) or old.start != start:
+        return 0
+    n = min(len(old.tss), len(tss))
+    same_np = (old.best_np[:n] == best_np[:n]) | (np.isnan(old.best_np[:n]) & np.isnan(best_np[:n]))
+    diff = np.flatnonzero((old.tss[:n] != tss[:n]) | ~same_np)
+    return int(diff[0]) if len(diff) else n
+
+
+def _recompute(old: _State | None, signature: list, mark: dict | None, start: pd.Timestamp, k: int,
+               tss: np.ndarray, best_np: np.ndarray) -> _State:
+    """
+    State with the stored values of the first k days and everything from day k
+    on computed from tss/best_np (the full series) – the EWMAs seeded with day
+    k-1's CTL/ATL, the FTP from the trailing window.
+    """
+    ctl, atl, ftp = np.empty(len(tss)), np.empty(len(tss)), np.empty(len(tss))
+    if k:
+        ctl[:k], atl[:k], ftp[:k] = old.ctl[:k], old.atl[:k], old.ftp[:k]
+    seed_ctl = ctl[k - 1] if k else 0.0
+    seed_atl = atl[k - 1] if k else 0.0
+    ctl[k:] = calc.ewma_forward(tss[k:], calc.CTL_SPAN, seed_ctl)
+    atl[k:] = calc.ewma_forward(tss[k:], calc.ATL_SPAN, seed_atl)
+    # FTP of day i looks back FTP_WINDOW_DAYS – recompute from the start of k's window
+    j = max(0, k - calc.FTP_WINDOW_DAYS + 1)
+    ftp[k:] = calc.rolling_ftp(best_np[j:])[k - j:]
+    _counters["rebuilds" if k == 0 else "updates"] += 1
+    _counters["days_recomputed"] += len(tss) - k
+    return _State(signature, start, tss, ctl, atl, best_np, ftp, mark)
+
+
+def _append(user_id: int | None, old: _State, signature: list, today: pd.Timestamp) -> _State | None:
+    """
+    Update from the activities appended since old.mark: only the days from the
+    earliest appended one (or the day after old.end) are loaded and re-summed.
+    None when the activities changed otherwise or reach before old.start.
+    """
+    appended = dm.appended_since(user_id, "activities", old.mark)
+    if appended is None:
+        return None
+    days, mark = appended
+    since = old.end + pd.Timedelta(days=1)
+    if len(days):
+        since = min(since, days.min())
+    if since < old.start:
+        return None
+    df_act = dm.load_activities(user_id, columns=["activityTrainingLoad", "normPower"], since=since)
+    last = pd.to_datetime(df_act["Date"]).max().normalize() if not df_act.empty and "Date" in df_act.columns else since
+    window = pd.date_range(since, max(today, last), freq="D")
+    k = (since - old.start).days
+    tss_new = np.zeros(len(window))
+    if not df_act.empty and "activityTrainingLoad" in df_act.columns:
+        tss_new = calc.daily_tss_history(df_act, window[-1]).reindex(window, fill_value=0.0).to_numpy()
+    tss = np.concatenate((old.tss[:k], tss_new))
+    best_np = np.concatenate((old.best_np[:k], calc.daily_best_np(df_act, window)))
+    return _recompute(old, signature, mark, old.start, k, tss, best_np)
+
+
+def _update(user_id: int | None, old: _State | None, signature: list, today: pd.Timestamp) -> _State:
+    if old is not None and len(old.tss):
+        state = _append(user_id, old, signature, today)
+        if state is not None:
+            return state
+    mark = dm.data_mark(user_id, "activities")
+    df_act = dm.load_activities(user_id, columns=["activityTrainingLoad", "normPower"])
+    daily = calc.daily_tss_history(df_act, today)
+    if daily.empty:
+        return _empty_state(signature, mark, today)
+    start, tss = daily.index[0], daily.to_numpy()
+    best_np = calc.daily_best_np(df_act, daily.index)
+    return _recompute(old, signature, mark, start, _first_change(old, start, tss, best_np), tss, best_np)
+
+
+def _current(user_id: int | None) -> _State:
+    """The user's state, brought up to date with the activities and today's date."""
+    today = pd.Timestamp.now().normalize()
+    with _states.lock(user_id):
+        state = _states.get(user_id)
+        signature = _signature(user_id)
+        end = state.end if state is not None else None
+        if state is not None and state.signature == signature and (end is None or end >= today):
+            _counters["hits"] += 1
+        else:
+            state = _update(user_id, state, signature, today)
+            _states.put(user_id, state)
+        return state
+
+
+def history(user_id: int | None) -> pd.DataFrame:
+    """TSS, CTL, ATL per day from the first activity through today (Date index; empty without activities)."""
+    state = _current(user_id)
+    return pd.DataFrame({"TSS": state.tss, "CTL": state.ctl, "ATL": state.atl},
+                        index=pd.date_range(state.start, periods=len(state.tss), freq="D", name="Date"))
+
+
+def latest(user_id: int | None) -> dict:
+    """Today's CTL/ATL/TSB."""
+    state = _current(user_id)
+    today = pd.Timestamp.now().normalize()
+    if not len(state.tss) or state.start > today:
+        return {"ctl": 0.0, "atl": 0.0, "tsb": 0.0}
+    i = int((today - state.start).days)
+    ctl, atl = float(state.ctl[i]), float(state.atl[i])
+    return {"ctl": ctl, "atl": atl, "tsb": ctl - atl}
+
+
+def latest_ftp(user_id: int | None) -> float:
+    """Today's FTP from the stored history (FTP_OVERRIDE env var takes priority)."""
+    override = calc.env_ftp_override()
+    if override is not None:
+        return override
+    state = _current(user_id)
+    today = pd.Timestamp.now().normalize()
+    if not len(state.ftp) or state.start > today:
+        return float(calc.BASE_FTP)
+    return float(state.ftp[int((today - state.start).days)])
+
+
+def ftp_history(user_id: int | None) -> pd.DataFrame:
+    """Date, FTP for every day from the first activity through today."""
+    state = _current(user_id)
+    dates = pd.date_range(state.start, periods=len(state.ftp), freq="D")
+    return pd.DataFrame({"Date": dates, "FTP": state.ftp})
+
+
+def seed(user_id: int | None, signature: tuple, mark: dict | None, start: pd.Timestamp, tss: np.ndarray,
+         ctl: np.ndarray, atl: np.ndarray, best_np: np.ndarray, ftp: np.ndarray) -> None:
+    """
+    Install a series computed elsewhere (the nightly batch) as the user's state.
+    signature and mark are data_signature/data_mark(user, "activities") taken
+    before the activities were read.
+    """
+    state = _State(_signature(user_id, signature), pd.Timestamp(start),
+                   *(np.asarray(a, dtype=float) for a in (tss, ctl, atl, best_np, ftp)), mark)
+    with _states.lock(user_id):
+        _states.put(user_id, state)
+
+
+def stats() -> dict:
+    states = _states.values()
+    return {"users": len(states), "days": int(sum(len(s.tss) for s in states)), **_counters}
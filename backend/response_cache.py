@@ -0,0 +1,122 @@
+"""
+Per-user cache of serialized read responses.
+
+Keyed by (user_id, path, query); each entry remembers the data version
+(data_version.current) and the day it was built for, so a write or midnight –
+every "last N days" window and the CTL/ATL decay move on with
+pd.Timestamp.now() – turns it into a miss. Entries hold the JSON bytes that
+went out, so a hit skips loading, computing and serializing altogether.
+Writes drop the user's entries right away (dm.on_invalidate); a TTL bounds
+what the version cannot see (FTP from the environment, the clock within a
+day), and the total size is bounded with LRU eviction like the frame cache.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from . import data_manager as dm
+
+RESPONSE_CACHE_MB = float(os.getenv("RESPONSE_CACHE_MB", "16"))
+RESPONSE_CACHE_TTL_S = float(os.getenv("RESPONSE_CACHE_TTL_S", "600"))
+
+
+class _ResponseCache:
+    def __init__(self, budget_bytes: int, ttl_s: float):
+        self.budget_bytes = budget_bytes
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict = OrderedDict()   # key -> (version, day, expires, body)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key: tuple, version: int, day: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version or entry[1] != day:
+                self.misses += 1
+                return None
+            if entry[2] < time.monotonic():
+                self._drop(key)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def put(self, key: tuple, version: int, day: str, body: bytes) -> None:
+        with self._lock:
+            self._drop(key)
+            if len(body) > self.budget_bytes:
+                return
+            self._entries[key] = (version, day, time.monotonic() + self.ttl_s, body)
+            self._bytes += len(body)
+            while self._bytes > self.budget_bytes and self._entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, user_id: int | None) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if user_id is None or k[0] == user_id]:
+                self._drop(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "users": len({k[0] for k in self._entries}),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget_bytes,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[3])
+
+
+_cache = _ResponseCache(int(RESPONSE_CACHE_MB * 1024 * 1024), RESPONSE_CACHE_TTL_S)
+
+
+@dm.on_invalidate
+def _on_write(user_id: int | None, kind: str | None) -> None:
+    # The version bump already makes them misses – drop them so they do not hold memory until evicted
+    _cache.invalidate(user_id)
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+
+def today() -> str:
+    """The day stamp entries are built for – take it once per request, before loading anything."""
+    return pd.Timestamp.now().strftime("%Y-%m-%d")
+
+
+def get(user_id: int | None, path: str, query: str, version: int, day: str) -> bytes | None:
+    """Cached body for this user, path and query if it was built for this data version and day."""
+    return _cache.get((user_id, path, query), version, day)
+
+
+def put(user_id: int | None, path: str, query: str, version: int, day: str, body: bytes) -> None:
+    _cache.put((user_id, path, query), version, day, body)
+
+
+def invalidate(user_id: int | None = None) -> None:
+    """Drop the user's entries (all users for None)."""
+    _cache.invalidate(user_id)
+
+
+def stats() -> dict:
+    return _cache.stats()
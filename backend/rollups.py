@@ -0,0 +1,212 @@
+"""
+Rollup tables per user – TSS, duration, distance, ascent, calories and session
+count per ISO week, month and year and per sportType.
+
+The base is one row per (day, sportType), persisted with the rollups in
+rollups_state.json in the user dir. When activities were only appended (syncs,
+uploads – data_manager.appended_since), just the appended days are loaded and
+their daily rows re-summed; after any other change all activities are loaded
+and the fresh daily rows are compared with the stored ones. Either way only
+the periods containing a changed day are re-summed; all other rollup rows are
+kept as they are. A
+"last 5 years by month" chart then reads ~60 rows per sport instead of
+scanning every activity.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+from . import data_manager as dm
+from .user_state import UserStates
+
+_STATE_FILE = "rollups_state.json"
+
+# Activity column -> rollup column
+_SOURCE_COLUMNS = {
+    "activityTrainingLoad": "tss",
+    "duration": "duration_s",
+    "distance": "distance_km",      # data_manager normalizes to km
+    "totalAscent": "ascent_m",
+    "calories": "calories",
+}
+METRICS = [*_SOURCE_COLUMNS.values(), "sessions"]
+PERIODS = ("week", "month", "year")
+_KEY = ["start", "sportType"]
+
+
+def _period_start(dates: pd.Series | pd.DatetimeIndex, period: str) -> pd.DatetimeIndex:
+    dates = pd.DatetimeIndex(dates)
+    if period == "week":
+        return dates - pd.to_timedelta(dates.dayofweek, unit="D")
+    return dates.to_period("M" if period == "month" else "Y").to_timestamp()
+
+
+def _daily(df_act: pd.DataFrame) -> pd.DataFrame:
+    """Sums per (Date, sportType), indexed by both."""
+    index = pd.MultiIndex.from_arrays([pd.DatetimeIndex([], name="Date"), pd.Index([], name="sportType", dtype=object)])
+    if df_act.empty or "Date" not in df_act.columns:
+        return pd.DataFrame(columns=METRICS, index=index, dtype=float)
+    df = pd.DataFrame({
+        name: pd.to_numeric(df_act[col], errors="coerce").fillna(0.0) if col in df_act.columns else 0.0
+        for col, name in _SOURCE_COLUMNS.items()
+    }, index=df_act.index)
+    df["sessions"] = 1.0
+    df["Date"] = pd.to_datetime(df_act["Date"]).dt.normalize()
+    df["sportType"] = (df_act["sportType"].astype(object).fillna("unknown").astype(str)
+                       if "sportType" in df_act.columns else "unknown")
+    return df.groupby(["Date", "sportType"])[METRICS].sum().sort_index()
+
+
+def _rollup(daily: pd.DataFrame, period: str) -> pd.DataFrame:
+    if daily.empty:
+        return pd.DataFrame(columns=METRICS, index=pd.MultiIndex.from_arrays([[], []], names=_KEY), dtype=float)
+    dates = daily.index.get_level_values("Date")
+    keys = [_period_start(dates, period).rename("start"), daily.index.get_level_values("sportType")]
+    return daily.groupby(keys)[METRICS].sum()
+
+
+class _State:
+    def __init__(self, signature: list, daily: pd.DataFrame, tables: dict, mark: dict | None = None):
+        self.signature = signature      # data_manager.data_signature(user, "activities") it was built from
+        self.mark = mark                # data_manager.data_mark of those activities
+        self.daily = daily              # (Date, sportType) -> METRICS
+        self.tables = tables            # period -> (start, sportType) -> METRICS
+
+    @staticmethod
+    def _frame_json(df: pd.DataFrame) -> dict:
+        return {
+            "dates": [d.strftime("%Y-%m-%d") for d in df.index.get_level_values(0)],
+            "sports": df.index.get_level_values(1).tolist(),
+            "values": df[METRICS].to_numpy().tolist(),
+        }
+
+    @staticmethod
+    def _frame_from_json(data: dict, names: list[str]) -> pd.DataFrame:
+        index = pd.MultiIndex.from_arrays([pd.DatetimeIndex(data["dates"]), pd.Index(data["sports"], dtype=object)],
+                                          names=names)
+        values = np.asarray(data["values"], dtype=float).reshape(len(index), len(METRICS))
+        return pd.DataFrame(values, index=index, columns=METRICS)
+
+    def to_json(self) -> dict:
+        return {
+            "signature": self.signature,
+            "mark": self.mark,
+            "daily": self._frame_json(self.daily),
+            "tables": {p: self._frame_json(t) for p, t in self.tables.items()},
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "_State":
+        return cls(data["signature"],
+                   cls._frame_from_json(data["daily"], ["Date", "sportType"]),
+                   {p: cls._frame_from_json(data["tables"][p], _KEY) for p in PERIODS},
+                   data.get("mark"))
+
+
+_states = UserStates(_STATE_FILE, _State.from_json, _State.to_json,
+                     hits=0, updates=0, rebuilds=0, periods_recomputed=0)
+_counters = _states.counters
+
+
+def _changed_days(old: pd.DataFrame, new: pd.DataFrame) -> pd.DatetimeIndex:
+    """Days whose (sportType -> METRICS) rows were added, removed or changed."""
+    both = old.index.union(new.index)
+    diff = old.reindex(both, fill_value=0.0).to_numpy() != new.reindex(both, fill_value=0.0).to_numpy()
+    return both[diff.any(axis=1)].get_level_values("Date").unique()
+
+
+def _appended(user_id: int | None, old: _State) -> tuple[pd.DataFrame, pd.DatetimeIndex, dict] | None:
+    """
+    Daily rows with the days of the activities appended since old.mark re-summed
+    from just those days' activities, the changed days and the new mark. None
+    when the activities changed otherwise.
+    """
+    appended = dm.appended_since(user_id, "activities", old.mark)
+    if appended is None:
+        return None
+    days, mark = appended
+    if not len(days):
+        return old.daily, days, mark
+    df_act = dm.load_activities(user_id, columns=[*_SOURCE_COLUMNS, "sportType"], since=days.min(), until=days.max())
+    if not df_act.empty and "Date" in df_act.columns:
+        df_act = df_act[pd.to_datetime(df_act["Date"]).dt.normalize().isin(days)]
+    kept = old.daily[~old.daily.index.get_level_values("Date").isin(days)]
+    fresh = _daily(df_act)
+    daily = pd.concat([kept, fresh]).sort_index() if len(fresh) else kept
+    return daily, days, mark
+
+
+def _update(user_id: int | None, old: _State | None, signature: list) -> _State:
+    appended = _appended(user_id, old) if old is not None else None
+    if appended is not None:
+        daily, changed, mark = appended
+    else:
+        mark = dm.data_mark(user_id, "activities")
+        daily = _daily(dm.load_activities(user_id, columns=[*_SOURCE_COLUMNS, "sportType"]))
+        if old is None:
+            _counters["rebuilds"] += 1
+            tables = {p: _rollup(daily, p) for p in PERIODS}
+            _counters["periods_recomputed"] += sum(len(t) for t in tables.values())
+            return _State(signature, daily, tables, mark)
+        changed = _changed_days(old.daily, daily)
+
+    tables = {}
+    for period in PERIODS:
+        table = old.tables[period]
+        starts = _period_start(changed, period).unique()
+        # Re-sum the touched periods from the daily rows, keep all others
+        touched = _period_start(daily.index.get_level_values("Date"), period).isin(starts)
+        fresh = _rollup(daily[touched], period)
+        kept = table[~table.index.get_level_values("start").isin(starts)]
+        tables[period] = pd.concat([kept, fresh]).sort_index() if len(fresh) else kept
+        _counters["periods_recomputed"] += len(fresh)
+    _counters["updates"] += 1
+    return _State(signature, daily, tables, mark)
+
+
+def _current(user_id: int | None) -> _State:
+    with _states.lock(user_id):
+        state = _states.get(user_id)
+        signature = json.loads(json.dumps(dm.data_signature(user_id, "activities")))
+        if state is not None and state.signature == signature:
+            _counters["hits"] += 1
+        else:
+            state = _update(user_id, state, signature)
+            _states.put(user_id, state)
+        return state
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+
+def table(user_id: int | None, period: str, since=None, sport: str | None = None,
+          by_sport: bool = False) -> pd.DataFrame:
+    """
+    Rollup rows of the period ("week", "month", "year") starting at or after
+    since, with columns start, sportType (if by_sport), *METRICS. Without
+    by_sport the sports are summed per period; sport filters to one sportType.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {PERIODS}")
+    df = _current(user_id).tables[period]
+    if since is not None:
+        df = df[df.index.get_level_values("start") >= _period_start([pd.Timestamp(since)], period)[0]]
+    if sport is not None:
+        df = df[df.index.get_level_values("sportType") == sport]
+    if not by_sport:
+        df = df.groupby(level="start")[METRICS].sum()
+    return df.reset_index()
+
+
+def sports(user_id: int | None) -> list[str]:
+    """sportTypes with at least one activity."""
+    return sorted(_current(user_id).tables["year"].index.get_level_values("sportType").unique())
+
+
+def stats() -> dict:
+    states = _states.values()
+    return {
+        "users": len(states),
+        "rows": int(sum(len(t) for s in states for t in s.tables.values())),
+        **_counters,
+    }
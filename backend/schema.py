@@ -0,0 +1,220 @@
+"""
+Column schemas for every Skywalker data file – single source of truth for
+headers, dtypes, units, Garmin/German column aliases and date formats.
+
+Readers use it to hand pandas explicit dtype=/usecols=/parse_dates= instead of
+inferring types, writers use it for header order and row validation.
+Pure Python on purpose: the legacy Garmin scripts import it without pandas.
+"""
+
+DATE_FORMAT = "%Y-%m-%d"          # how we write dates
+READ_DATE_FORMAT = "ISO8601"      # what pandas parses fast (dates, optionally with time)
+
+FLOAT = "float64"
+STRING = "string"
+DATE = "date"
+
+
+class SchemaError(ValueError):
+    """A row does not fit the file schema."""
+
+
+class Column:
+    def __init__(self, name: str, dtype: str = FLOAT, unit: str = "", aliases: tuple = ()):
+        self.name = name
+        self.dtype = dtype
+        self.unit = unit
+        self.aliases = aliases
+
+    def __repr__(self) -> str:
+        return f"Column({self.name!r}, {self.dtype!r})"
+
+
+class FileSchema:
+    def __init__(self, kind: str, filename: str, columns: list[Column], date_column: str = "Date"):
+        self.kind = kind
+        self.filename = filename
+        self.columns = columns
+        self.date_column = date_column
+        self.by_name = {c.name: c for c in columns}
+        self.aliases = {a: c.name for c in columns for a in c.aliases}
+
+    @property
+    def names(self) -> list[str]:
+        """Header row in canonical order."""
+        return [c.name for c in self.columns]
+
+    def canonical(self, name: str) -> str:
+        return self.aliases.get(name, name)
+
+    def read_options(self, header: list[str], columns: list[str] | None = None) -> dict:
+        """
+        pandas.read_csv keyword arguments for a file with the given header.
+        `columns` (canonical names) restricts parsing to those plus the date column.
+        Unknown columns are kept (and inferred) unless a projection is requested.
+        """
+        wanted = None if columns is None else {self.date_column, *columns}
+        usecols, dtype, dates = [], {}, []
+        for raw in header:
+            name = self.canonical(raw)
+            if wanted is not None and name not in wanted:
+                continue
+            usecols.append(raw)
+            col = self.by_name.get(name)
+            if col is None:
+                continue
+            if col.dtype == DATE:
+                dates.append(raw)
+            else:
+                dtype[raw] = col.dtype
+        opts = {"dtype": dtype, "parse_dates": dates, "date_format": READ_DATE_FORMAT}
+        if wanted is not None:
+            opts["usecols"] = usecols
+        return opts
+
+    def validate_row(self, row: list | dict) -> list:
+        """
+        Return the row as a list in header order with numeric fields as numbers/None.
+        Raises SchemaError for rows of the wrong shape, unknown fields or a bad date;
+        numeric fields that do not parse are stored empty.
+        """
+        if isinstance(row, dict):
+            unknown = set(row) - set(self.by_name)
+            if unknown:
+                raise SchemaError(f"{self.kind}: unknown columns {sorted(unknown)}")
+            values = [row.get(name) for name in self.names]
+        else:
+            if len(row) != len(self.columns):
+                raise SchemaError(f"{self.kind}: expected {len(self.columns)} fields, got {len(row)}")
+            values = list(row)
+
+        out = []
+        for col, value in zip(self.columns, values):
+            if value == "" or value is None:
+                out.append(None)
+            elif col.dtype == FLOAT:
+                # Garmin occasionally sends placeholders like "--" – store them as empty
+                try:
+                    out.append(value if isinstance(value, (int, float)) and not isinstance(value, bool)
+                               else float(value))
+                except (TypeError, ValueError):
+                    out.append(None)
+            elif col.dtype == DATE:
+                text = str(value)[:10]
+                if len(text) != 10 or text[4] != "-" or text[7] != "-" or not text.replace("-", "").isdigit():
+                    raise SchemaError(f"{self.kind}: {col.name}={value!r} is not YYYY-MM-DD")
+                out.append(text)
+            else:
+                out.append(str(value))
+        if out[self.names.index(self.date_column)] is None:
+            raise SchemaError(f"{self.kind}: missing {self.date_column}")
+        return out
+
+
+def _zones(prefix: str, n: int) -> list[Column]:
+    return [Column(f"{prefix}{i}", FLOAT, "s") for i in range(1, n + 1)]
+
+
+ACTIVITIES = FileSchema("activities", "garmin_activities.csv", [
+    Column("Date", DATE),
+    Column("Time", STRING),
+    Column("activityName", STRING, aliases=("Activity Name",)),
+    Column("sportType", STRING),
+    Column("duration", FLOAT, "s"),
+    Column("elapsedDuration", FLOAT, "s"),
+    Column("movingDuration", FLOAT, "s"),
+    Column("distance", FLOAT, "m (Garmin) / km (Strava)", aliases=("Distance",)),
+    Column("averageSpeed", FLOAT, "m/s"),
+    Column("maxSpeed", FLOAT, "m/s"),
+    Column("averageHR", FLOAT, "bpm", aliases=("Avg HR",)),
+    Column("maxHR", FLOAT, "bpm"),
+    *_zones("hrTimeInZone_", 5),
+    Column("avgPower", FLOAT, "W"),
+    Column("maxPower", FLOAT, "W"),
+    Column("normPower", FLOAT, "W", aliases=("Norm. Power",)),
+    Column("avgCadence", FLOAT, "rpm", aliases=("Avg Cadence",)),
+    Column("maxCadence", FLOAT, "rpm"),
+    Column("totalAscent", FLOAT, "m"),
+    Column("totalDescent", FLOAT, "m"),
+    Column("steps", FLOAT),
+    Column("avgStrideLength", FLOAT, "cm"),
+    Column("avgStrokes", FLOAT),
+    Column("totalStrokes", FLOAT),
+    Column("poolLength", FLOAT, "m"),
+    Column("numLaps", FLOAT),
+    Column("calories", FLOAT, "kcal"),
+    Column("trainingEffectLabel", STRING),
+    Column("activityTrainingLoad", FLOAT, "TSS", aliases=("Training Load",)),
+    Column("aerobicEffect", FLOAT),
+    Column("anaerobicEffect", FLOAT),
+    Column("vo2Max", FLOAT, "ml/kg/min"),
+    Column("lactateThreshold", FLOAT, "bpm"),
+    Column("activityId", STRING),
+])
+
+STATS = FileSchema("stats", "garmin_stats.csv", [
+    Column("Date", DATE),
+    Column("Weight (lbs)", FLOAT, "lbs"),
+    Column("Muscle Mass (lbs)", FLOAT, "lbs"),
+    Column("Body Fat %", FLOAT, "%"),
+    Column("Water %", FLOAT, "%"),
+    Column("Sleep Total (hr)", FLOAT, "h"),
+    Column("Sleep Deep (hr)", FLOAT, "h"),
+    Column("Sleep REM (hr)", FLOAT, "h"),
+    Column("Sleep Score", FLOAT),
+    Column("RHR", FLOAT, "bpm", aliases=("Resting HR",)),
+    Column("Min HR", FLOAT, "bpm"),
+    Column("Max HR", FLOAT, "bpm"),
+    Column("Avg Stress", FLOAT),
+    Column("Respiration", FLOAT, "brpm"),
+    Column("SpO2", FLOAT, "%"),
+    Column("VO2 Max", FLOAT, "ml/kg/min"),
+    Column("Training Status", STRING),
+    Column("HRV Status", STRING),
+    Column("HRV Avg", FLOAT, "ms", aliases=("HRV",)),
+    Column("BP Systolic", FLOAT, "mmHg"),
+    Column("BP Diastolic", FLOAT, "mmHg"),
+    Column("Steps", FLOAT),
+    Column("Step Goal", FLOAT),
+    Column("Cals Total", FLOAT, "kcal"),
+    Column("Cals Active", FLOAT, "kcal"),
+    Column("Activities", STRING),
+])
+
+CHECKINS = FileSchema("checkins", "daily_checkin.csv", [
+    Column("Date", DATE),
+    Column("Schlaf", FLOAT, "1-10"),
+    Column("Stress", FLOAT, "1-10"),
+    Column("Energie", FLOAT, "1-10"),
+    Column("Load_Gestern", FLOAT, "1-10"),
+    Column("Muskeln", FLOAT, "1-10"),
+    Column("Ernahrung", FLOAT, "1-10"),
+    Column("Mental", FLOAT, "1-10"),
+    Column("Gesundheit", FLOAT, "1-10"),
+    Column("RPE", FLOAT, "1-10"),
+    Column("Feel", FLOAT, "1-10"),
+])
+
+RUNS = FileSchema("runs", "garmin_runs.csv", [
+    Column("Date", DATE),
+    Column("Time", STRING),
+    Column("activityName", STRING),
+    Column("activityType_typeKey", STRING),
+    Column("duration", FLOAT, "s"),
+    Column("elapsedDuration", FLOAT, "s"),
+    Column("movingDuration", FLOAT, "s"),
+    Column("averageSpeed", FLOAT, "m/s"),
+    Column("averageHR", FLOAT, "bpm"),
+    Column("maxHR", FLOAT, "bpm"),
+    Column("steps", FLOAT),
+    Column("summarizedExerciseSets", STRING),
+    Column("totalSets", FLOAT),
+    Column("activeSets", FLOAT),
+    Column("totalReps", FLOAT),
+    Column("trainingEffectLabel", STRING),
+    Column("activityTrainingLoad", FLOAT, "TSS"),
+    Column("minActivityLapDuration", FLOAT, "s"),
+    *_zones("hrTimeInZone_", 4),
+])
+
+SCHEMAS = {s.kind: s for s in (ACTIVITIES, STATS, CHECKINS, RUNS)}
@@ -130,40 +130,51 @@ def activity_to_row(act: dict, ftp: float = 230) -> dict | None:
 
 def save_activity_to_csv(row: dict, user_id: int) -> bool:
     """Append or update one activity row in the user's garmin_activities.csv."""
-    import pandas as pd
-    from .data_manager import _user_files, _read_csv_safe
+    return save_activities_to_csv([row], user_id) > 0
 
-    _, act_path, _ = _user_files(user_id)
-    df = _read_csv_safe(act_path)
 
-    # Deduplicate by activityId if column exists
-    if not df.empty and "activityId" in df.columns:
-        df = df[df["activityId"].astype(str) != str(row.get("activityId", ""))]
+def save_activities_to_csv(rows: list[dict], user_id: int) -> int:
+    """Upsert activity rows by activityId with a single queued write. Returns rows saved."""
+    import pandas as pd
+    from . import writer
+    from .data_manager import _user_files, filter_tombstoned, tombstone_mask
+    from .schema import ACTIVITIES, SchemaError
+
+    valid, errors = [], []
+    for row in rows:
+        try:
+            valid.append(dict(zip(ACTIVITIES.names, ACTIVITIES.validate_row(row))))
+        except SchemaError as e:
+            errors.append(e)
+    if errors:
+        print(f"[STRAVA] user {user_id}: rejected {len(errors)} of {len(rows)} activity rows "
+              f"(first: {errors[0]})", flush=True)
+    if not valid:
+        return 0
+    new_df = pd.DataFrame(valid, dtype=object)
+    # Deleted in the app – don't bring them back
+    new_df = new_df[~tombstone_mask(user_id, new_df["Date"], new_df["activityName"], new_df["activityId"])]
+    if new_df.empty:
+        return 0
+    new_df = new_df.drop_duplicates(subset=["activityId"], keep="last")
+
+    def upsert(df):
+        # Deduplicate by activityId if column exists
+        if not df.empty and "activityId" in df.columns:
+            df = df[~df["activityId"].astype(str).isin(new_df["activityId"].astype(str))]
+        merged = pd.concat([df, new_df], ignore_index=True)
+        merged = merged.sort_values("Date", kind="stable")
+        return filter_tombstoned(merged, user_id), len(new_df)
 
-    new_df = pd.DataFrame([row])
-    merged = pd.concat([df, new_df], ignore_index=True)
-    if "Date" in merged.columns:
-        merged["Date"] = pd.to_datetime(merged["Date"], errors="coerce")
-        merged.sort_values("Date", inplace=True)
-    merged.to_csv(act_path, index=False)
-    return True
+    _, act_path, _ = _user_files(user_id)
+    return writer.transform(user_id, act_path, "activities", upsert)
 
 
 def delete_activity_from_csv(activity_id: str, user_id: int) -> bool:
     """Remove a Strava activity from the CSV by activityId."""
-    import pandas as pd
-    from .data_manager import _user_files, _read_csv_safe
+    from .data_manager import delete_activities
 
-    _, act_path, _ = _user_files(user_id)
-    df = _read_csv_safe(act_path)
-    if df.empty or "activityId" not in df.columns:
-        return False
-    before = len(df)
-    df = df[df["activityId"].astype(str) != str(activity_id)]
-    if len(df) < before:
-        df.to_csv(act_path, index=False)
-        return True
-    return False
+    return delete_activities([{"activityId": activity_id}], user_id, tombstone=False) > 0
 
 
 def register_webhook() -> dict:
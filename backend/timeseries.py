@@ -0,0 +1,173 @@
+"""
+Indexed SQLite copy of the per-user activity CSVs – the newest-first list behind
+/api/activities. Stats and check-ins have no copy here: sleep, steps and the
+other chart windows are date slices of the materialized daily_metrics table,
+which is kept up to date from the same writes.
+
+The CSV files stay the source of truth (Garmin/Strava sync, uploads and the
+Streamlit dashboard all write them). Each query first compares the current file
+signature with the one recorded at import time. When the file changed and rows
+were only appended after the recorded mark (data_manager.appended_since – the
+bytes before it are checked against a digest), just the days of the appended
+rows are re-imported, so a sync or upload costs a few rows, not the whole
+table. Any change before the mark (edits in place, deletes, rewrites) or new
+tombstones import the user's table again in full.
+
+One-shot import of all existing CSV trees:
+    python -m backend.timeseries
+"""
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from . import data_manager as dm
+from .database import Activity, TimeseriesSync, SessionLocal, SAVE_PATH, create_tables
+
+_KIND = "activities"
+
+# CSV column -> table column
+_COLUMNS = {
+    "Time": "time",
+    "activityId": "activity_id",
+    "activityName": "name",
+    "sportType": "sport_type",
+    "duration": "duration",
+    "distance": "distance",
+    "activityTrainingLoad": "tss",
+    "normPower": "norm_power",
+    "avgPower": "avg_power",
+    "averageHR": "avg_hr",
+    "avgCadence": "avg_cadence",
+    "totalAscent": "ascent",
+    "calories": "calories",
+}
+_STRING_COLUMNS = {"time", "activity_id", "name", "sport_type"}
+
+
+def _records(df: pd.DataFrame, user_id: int) -> pd.DataFrame:
+    """Map loaded activities to table rows (NaN → NULL, one row per activityId)."""
+    if df.empty or "Date" not in df.columns:
+        return pd.DataFrame(columns=["date", "user_id"])
+    out = pd.DataFrame({"date": df["Date"].dt.date})
+    for src, dst in _COLUMNS.items():
+        if src not in df.columns:
+            continue
+        if dst in _STRING_COLUMNS:
+            col = df[src].astype("string")
+            if dst == "activity_id":
+                # IDs come back as floats when the column has gaps
+                col = col.str.replace(r"\.0$", "", regex=True).replace("", pd.NA)
+            out[dst] = col
+        else:
+            out[dst] = pd.to_numeric(df[src], errors="coerce")
+    if "activity_id" in out.columns:
+        has_id = out["activity_id"].notna()
+        out = pd.concat([out[~has_id], out[has_id].drop_duplicates(subset=["activity_id"], keep="last")])
+    out["user_id"] = user_id
+    return out.astype(object).where(out.notna(), None)
+
+
+def _record_state(db: Session, user_id: int, signature: tuple, mark: dict | None) -> None:
+    state = db.get(TimeseriesSync, (user_id, _KIND))
+    if state is None:
+        state = TimeseriesSync(user_id=user_id, kind=_KIND)
+        db.add(state)
+    state.source_signature = json.dumps(signature)
+    state.source_mark = json.dumps(mark) if mark else ""
+    state.imported_at = datetime.utcnow()
+
+
+def import_user(db: Session, user_id: int) -> int:
+    """Replace all of a user's rows with the current CSV content. Returns row count."""
+    signature = dm.data_signature(user_id, _KIND)
+    mark = dm.data_mark(user_id, _KIND)
+    rows = _records(dm.load_activities(user_id), user_id).to_dict("records")
+    db.query(Activity).filter(Activity.user_id == user_id).delete(synchronize_session=False)
+    if rows:
+        db.execute(Activity.__table__.insert(), rows)
+    _record_state(db, user_id, signature, mark)
+    db.commit()
+    return len(rows)
+
+
+def _import_tail(db: Session, user_id: int, state: TimeseriesSync) -> int | None:
+    """
+    Replace the rows of the days between the first and last activity appended
+    since the stored mark. Returns the number of rows written, or None if the
+    CSV changed before the mark (edits, deletes, rewrites), tombstones were
+    added or an appended activityId already exists on another day – a full
+    import is due then.
+    """
+    signature = dm.data_signature(user_id, _KIND)
+    appended = dm.appended_since(user_id, _KIND, json.loads(state.source_mark) if state.source_mark else None)
+    if appended is None:
+        return None
+    days, mark = appended
+    rows = []
+    if len(days):
+        first, last = days.min(), days.max()
+        records = _records(dm.load_activities(user_id, since=first, until=last), user_id)
+        in_range = (Activity.user_id == user_id) & Activity.date.between(first.date(), last.date())
+        ids = [i for i in records.get("activity_id", []) if i is not None]
+        if ids and db.query(Activity.id).filter(Activity.user_id == user_id, ~in_range,
+                                                Activity.activity_id.in_(ids)).first() is not None:
+            return None
+        rows = records.to_dict("records")
+        db.query(Activity).filter(in_range).delete(synchronize_session=False)
+        if rows:
+            db.execute(Activity.__table__.insert(), rows)
+    _record_state(db, user_id, signature, mark)
+    db.commit()
+    return len(rows)
+
+
+def ensure_fresh(db: Session, user_id: int) -> None:
+    """Bring a user's rows up to date if the activity file changed since the last import."""
+    state = db.get(TimeseriesSync, (user_id, _KIND))
+    if state is not None and state.source_signature == json.dumps(dm.data_signature(user_id, _KIND)):
+        return
+    if state is None or _import_tail(db, user_id, state) is None:
+        import_user(db, user_id)
+
+
+# ── Queries ──────────────────────────────────────────────────────────────────
+
+def recent_activities(db: Session, user_id: int, limit: int = 20) -> list[Activity]:
+    """Newest activities first."""
+    ensure_fresh(db, user_id)
+    return (
+        db.query(Activity)
+        .filter(Activity.user_id == user_id)
+        .order_by(Activity.date.desc(), Activity.time.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+# ── One-shot importer ────────────────────────────────────────────────────────
+
+def import_all() -> dict:
+    """Import every users/<id>/ activity file below SAVE_PATH. Returns {user_id: rows}."""
+    create_tables()
+    users_dir = os.path.join(SAVE_PATH, "users")
+    result = {}
+    if not os.path.isdir(users_dir):
+        return result
+    db = SessionLocal()
+    try:
+        for entry in sorted(os.listdir(users_dir)):
+            if not entry.isdigit():
+                continue
+            user_id = int(entry)
+            result[user_id] = import_user(db, user_id)
+    finally:
+        db.close()
+    return result
+
+
+if __name__ == "__main__":
+    for uid, rows in import_all().items():
+        print(f"user {uid}: activities={rows}")
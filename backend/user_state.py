@@ -0,0 +1,79 @@
+"""
+Per-user state shared by the derived-data modules (baselines, daily_metrics,
+pmc, rollups, data_version).
+
+UserLocks hands out one lock per user (taken for the whole check-and-update of
+that user's state, so two requests never rebuild it twice) plus the module's
+counters for /api/metrics. UserStates adds the states themselves: kept in
+memory and persisted as JSON in the user dir (written to a temp file and
+swapped in with os.replace, so a crash never leaves half a file). The files
+are caches of data derived from the CSVs – unreadable or missing ones count as
+"no state" and are rebuilt.
+"""
+import json
+import os
+import threading
+from typing import Any, Callable
+
+from . import data_manager as dm
+
+
+class UserLocks:
+    def __init__(self, **counters: int):
+        self.guard = threading.Lock()       # protects the lock map and the caller's user maps
+        self.counters = dict(counters)
+        self._locks: dict = {}
+
+    def lock(self, user_id: int | None) -> threading.Lock:
+        with self.guard:
+            return self._locks.setdefault(user_id, threading.Lock())
+
+
+class UserStates(UserLocks):
+    def __init__(self, filename: str, from_json: Callable[[dict], Any],
+                 to_json: Callable[[Any], dict] = lambda state: state, **counters: int):
+        super().__init__(**counters)
+        self.filename = filename
+        self._from_json = from_json
+        self._to_json = to_json
+        self._states: dict = {}
+
+    def get(self, user_id: int | None):
+        """The user's state from memory, else from the state file (None if neither). Caller holds the user lock."""
+        state = self._states.get(user_id)
+        if state is None:
+            state = self.load(user_id)
+            if state is not None:
+                self._states[user_id] = state
+        return state
+
+    def put(self, user_id: int | None, state, save: bool = True) -> None:
+        """Keep (and persist) the user's state. Caller holds the user lock."""
+        self._states[user_id] = state
+        if save:
+            self.save(user_id, state)
+
+    def load(self, user_id: int | None):
+        try:
+            with open(dm.user_path(user_id, self.filename)) as f:
+                return self._from_json(json.load(f))
+        except (OSError, ValueError, KeyError, TypeError, StopIteration):
+            return None
+
+    def save(self, user_id: int | None, state) -> None:
+        path = dm.user_path(user_id, self.filename)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self._to_json(state), f)
+            os.replace(tmp, path)
+        except OSError:
+            pass    # the in-memory state stays valid; the next start rebuilds or reloads it
+
+    def users(self) -> list:
+        with self.guard:
+            return list(self._states)
+
+    def values(self) -> list:
+        with self.guard:
+            return list(self._states.values())
@@ -225,3 +225,27 @@ def zwo_to_workout_card(zwo_xml: str, ftp: int = 230) -> str:
         f"{'='*50}",
     ]
     return "\n".join(lines)
+
+
+def zwo_tss(zwo_xml: str) -> float:
+    """
+    Planned TSS of a ZWO workout: hours × IF² × 100, with IF the normalized
+    power of the steps (4th-power mean, ramps integrated) relative to FTP.
+    """
+    parsed = _parse_zwo(zwo_xml)
+    total_sec = 0.0
+    p4_sec = 0.0
+    for step in parsed["steps"]:
+        dur = step["duration"]
+        if step["type"] in ("warmup", "cooldown"):
+            lo, hi = step["power_low"], step["power_high"]
+            # Mean of p⁴ over a linear ramp from lo to hi
+            mean_p4 = lo ** 4 if hi == lo else (hi ** 5 - lo ** 5) / (5 * (hi - lo))
+        else:
+            mean_p4 = step["power"] ** 4
+        total_sec += dur
+        p4_sec += mean_p4 * dur
+    if total_sec == 0:
+        return 0.0
+    intensity = (p4_sec / total_sec) ** 0.25
+    return round(total_sec / 3600 * intensity ** 2 * 100, 1)
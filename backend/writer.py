@@ -0,0 +1,243 @@
+"""
+Per-user write serialization for the CSV data files.
+
+Every mutation of a user's CSV files goes through here. Mutations are queued
+per user and a worker thread drains the queue after a short coalescing window,
+so a burst of Strava webhooks or a Garmin sync racing an upload costs one read
+and one atomic temp-file-and-rename write per file – and writers can no longer
+overwrite each other's changes. Batches that only append rows skip the read
+and append in place.
+
+Mutations see the file as strings (dtype=str, canonical column names), so the
+values they do not touch are written back unchanged.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import pandas as pd
+
+from .schema import SCHEMAS
+
+WRITE_COALESCE_MS = float(os.getenv("WRITE_COALESCE_MS", "50"))
+
+
+class _Mutation:
+    __slots__ = ("path", "kind", "fn", "rows", "future", "queued_at")
+
+    def __init__(self, path: str, kind: str, fn=None, rows: pd.DataFrame | None = None):
+        self.path = path
+        self.kind = kind
+        self.fn = fn            # df -> (df, result)
+        self.rows = rows        # rows to append (canonical columns, values already formatted)
+        self.future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class _UserQueue:
+    def __init__(self, user_id: int | None):
+        self.user_id = user_id
+        self.items: deque[_Mutation] = deque()
+        self.lock = threading.Lock()
+        self.running = False
+
+
+_queues: dict = {}
+_queues_guard = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "mutations": 0,
+    "flushes": 0,
+    "append_flushes": 0,
+    "failed_flushes": 0,
+    "flush_ms_total": 0.0,
+    "flush_ms_max": 0.0,
+    "flush_ms_last": 0.0,
+    "wait_ms_total": 0.0,
+}
+
+
+def _queue(user_id: int | None) -> _UserQueue:
+    with _queues_guard:
+        q = _queues.get(user_id)
+        if q is None:
+            q = _queues[user_id] = _UserQueue(user_id)
+        return q
+
+
+def _submit(user_id: int | None, mutation: _Mutation) -> Future:
+    q = _queue(user_id)
+    with q.lock:
+        q.items.append(mutation)
+        start = not q.running
+        q.running = True
+    if start:
+        threading.Thread(target=_drain, args=(q,), daemon=True, name=f"csv-writer-{user_id}").start()
+    return mutation.future
+
+
+def _drain(q: _UserQueue) -> None:
+    """Worker: wait out the coalescing window, then flush everything queued – per file, in order."""
+    while True:
+        time.sleep(WRITE_COALESCE_MS / 1000)
+        with q.lock:
+            batch = list(q.items)
+            q.items.clear()
+            if not batch:
+                q.running = False
+                return
+        by_path: dict[str, list[_Mutation]] = {}
+        for m in batch:
+            by_path.setdefault(m.path, []).append(m)
+        for path, mutations in by_path.items():
+            _flush(q.user_id, path, mutations)
+
+
+def _header(path: str) -> list[str] | None:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    return pd.read_csv(path, nrows=0, encoding="utf-8-sig").columns.tolist()
+
+
+def _read(path: str, file_schema) -> pd.DataFrame:
+    if _header(path) is None:
+        return pd.DataFrame(columns=file_schema.names, dtype=object)
+    df = pd.read_csv(path, dtype=str, keep_default_na=False, on_bad_lines="warn", encoding="utf-8-sig")
+    return df.rename(columns=file_schema.aliases)
+
+
+def _write(df: pd.DataFrame, path: str) -> None:
+    """Write via temp file + rename so readers never see a half-written CSV."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _concat(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    pd.concat without the empty frames – pandas 2.x warns about (and will change)
+    dtype inference from empty entries. Columns of the empty frames are kept.
+    """
+    columns = list(dict.fromkeys(c for f in frames for c in f.columns))
+    filled = [f for f in frames if len(f)]
+    if not filled:
+        return pd.DataFrame(columns=columns, dtype=object)
+    out = filled[0] if len(filled) == 1 else pd.concat(filled, ignore_index=True)
+    return out.reindex(columns=columns).reset_index(drop=True)
+
+
+def _append(path: str, header: list[str], rows: pd.DataFrame, file_schema) -> None:
+    out = rows.reindex(columns=[file_schema.canonical(c) for c in header])
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        needs_newline = f.read(1) != b"\n"
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        if needs_newline:
+            f.write("\n")
+        out.to_csv(f, header=False, index=False)
+
+
+def _flush(user_id: int | None, path: str, mutations: list[_Mutation]) -> None:
+    started = time.perf_counter()
+    kind = mutations[0].kind
+    file_schema = SCHEMAS[kind]
+    results: list = []
+    append_only = False
+    try:
+        header = _header(path)
+        if header is not None and all(m.rows is not None for m in mutations):
+            canonical = {file_schema.canonical(c) for c in header}
+            append_only = all(set(m.rows.columns) <= canonical for m in mutations)
+        if append_only:
+            rows = [m.rows for m in mutations if len(m.rows)]
+            if rows:
+                _append(path, header, _concat(rows), file_schema)
+            results = [(m, len(m.rows), None) for m in mutations]
+        else:
+            df = _read(path, file_schema)
+            for m in mutations:
+                try:
+                    if m.rows is not None:
+                        df, result = _concat([df, m.rows]), len(m.rows)
+                    else:
+                        df, result = m.fn(df)
+                    results.append((m, result, None))
+                except Exception as e:      # a broken mutation only fails its own caller
+                    results.append((m, None, e))
+            _write(df, path)
+    except Exception as e:
+        with _stats_lock:
+            _stats["failed_flushes"] += 1
+        for m in mutations:
+            m.future.set_exception(e)
+        return
+    finally:
+        from .data_manager import invalidate_cache
+        invalidate_cache(user_id, kind)
+
+    elapsed = (time.perf_counter() - started) * 1000
+    done = time.perf_counter()
+    with _stats_lock:
+        _stats["mutations"] += len(mutations)
+        _stats["flushes"] += 1
+        _stats["append_flushes"] += int(append_only)
+        _stats["flush_ms_total"] += elapsed
+        _stats["flush_ms_max"] = max(_stats["flush_ms_max"], elapsed)
+        _stats["flush_ms_last"] = elapsed
+        _stats["wait_ms_total"] += sum((done - m.queued_at) * 1000 for m in mutations)
+    for m, result, error in results:
+        if error is not None:
+            m.future.set_exception(error)
+        else:
+            m.future.set_result(result)
+
+
+# ── Public API ───────────────────────────────────────────────────────────────
+
+def transform(user_id: int | None, path: str, kind: str, fn):
+    """
+    Apply fn(df) -> (df, result) to the file and return result once it is on disk.
+    df holds the current rows as strings; mutations queued alongside see each
+    other's changes in submission order.
+    """
+    return _submit(user_id, _Mutation(path, kind, fn=fn)).result()
+
+
+def replace(user_id: int | None, path: str, kind: str, df: pd.DataFrame) -> None:
+    """Replace the whole file content (e.g. a sync that rebuilds the file)."""
+    transform(user_id, path, kind, lambda _: (df, None))
+
+
+def append(user_id: int | None, path: str, kind: str, rows: pd.DataFrame) -> int:
+    """
+    Append rows (canonical column names, values formatted for CSV). Creates the
+    file with the schema header if needed and widens the header once when the
+    rows bring new columns. Returns the number of rows appended.
+    """
+    if rows.empty:
+        return 0
+    return _submit(user_id, _Mutation(path, kind, rows=rows)).result()
+
+
+def stats() -> dict:
+    with _queues_guard:
+        queues = list(_queues.values())
+    depth = sum(len(q.items) for q in queues)
+    with _stats_lock:
+        s = dict(_stats)
+    flushes, mutations = s["flushes"], s["mutations"]
+    return {
+        "queue_depth": depth,
+        "active_writers": sum(1 for q in queues if q.running),
+        "mutations": mutations,
+        "flushes": flushes,
+        "append_flushes": s["append_flushes"],
+        "failed_flushes": s["failed_flushes"],
+        "mutations_per_flush": round(mutations / flushes, 2) if flushes else 0.0,
+        "flush_ms_avg": round(s["flush_ms_total"] / flushes, 2) if flushes else 0.0,
+        "flush_ms_max": round(s["flush_ms_max"], 2),
+        "flush_ms_last": round(s["flush_ms_last"], 2),
+        "wait_ms_avg": round(s["wait_ms_total"] / mutations, 2) if mutations else 0.0,
+    }
@@ -0,0 +1,152 @@
+"""
+Memory of loaded frames: normal load vs. compact load (data_manager.compact_frame).
+
+Generates a synthetic multi-year history (or uses an existing data tree) and
+prints the bytes held per kind, before and after compaction, plus the dtypes
+each column ends up with.
+
+    python -m benchmarks.frame_memory                 # 5 Jahre synthetische Daten
+    python -m benchmarks.frame_memory --years 10
+    python -m benchmarks.frame_memory --save-path /data --user 1
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.schema import ACTIVITIES, CHECKINS, STATS  # noqa: E402
+
+_SPORTS = ["cycling", "cycling", "running", "virtual_ride", "swimming", "strength_training"]
+_NAMES = ["Morning Ride", "Zwift Race", "Easy Run", "Intervals", "Long Ride", "Pool Swim"]
+_LABELS = ["RECOVERY", "BASE", "TEMPO", "THRESHOLD", "VO2MAX", "ANAEROBIC"]
+
+
+def _write(path: str, header: list[str], rows: list[list]) -> None:
+    rows.sort(key=lambda r: r[0], reverse=True)       # Garmin schreibt neueste zuerst
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        w.writerows(rows)
+
+
+def generate(base: str, years: int, seed: int = 1) -> None:
+    rnd = random.Random(seed)
+    os.makedirs(base, exist_ok=True)
+    today = date.today()
+    days = [today - timedelta(days=i) for i in range(365 * years)]
+
+    stats = []
+    for d in days:
+        row = dict.fromkeys(STATS.names)
+        row.update({
+            "Date": d.isoformat(),
+            "Weight (lbs)": round(rnd.uniform(150, 170), 1),
+            "Sleep Total (hr)": round(rnd.uniform(5, 9), 2),
+            "Sleep Deep (hr)": round(rnd.uniform(0.5, 2), 2),
+            "Sleep REM (hr)": round(rnd.uniform(1, 2.5), 2),
+            "Sleep Score": rnd.randint(50, 95),
+            "RHR": rnd.randint(42, 60),
+            "Min HR": rnd.randint(40, 55),
+            "Max HR": rnd.randint(120, 185),
+            "Avg Stress": rnd.randint(10, 60),
+            "Respiration": rnd.randint(12, 18),
+            "SpO2": rnd.randint(92, 99),
+            "VO2 Max": rnd.randint(48, 58),
+            "Training Status": rnd.choice(["PRODUCTIVE", "MAINTAINING", "RECOVERY", "UNPRODUCTIVE"]),
+            "HRV Status": rnd.choice(["BALANCED", "UNBALANCED", "LOW"]),
+            "HRV Avg": rnd.randint(40, 80),
+            "Steps": rnd.randint(2000, 20000),
+            "Step Goal": 10000,
+            "Cals Total": rnd.randint(1800, 4000),
+            "Cals Active": rnd.randint(200, 2000),
+        })
+        stats.append([row[c] for c in STATS.names])
+    _write(os.path.join(base, STATS.filename), STATS.names, stats)
+
+    acts, activity_id = [], 10_000_000_000
+    for d in days:
+        for _ in range(rnd.choice([0, 1, 1, 2])):
+            activity_id += 1
+            dur = rnd.randint(1800, 14400)
+            row = dict.fromkeys(ACTIVITIES.names)
+            row.update({
+                "Date": d.isoformat(), "Time": f"{rnd.randint(5, 19):02d}:{rnd.randint(0, 59):02d}:00",
+                "activityName": rnd.choice(_NAMES), "sportType": rnd.choice(_SPORTS),
+                "duration": dur, "elapsedDuration": dur + rnd.randint(0, 900), "movingDuration": dur,
+                "distance": rnd.randint(5000, 150000), "averageSpeed": round(rnd.uniform(2.5, 11), 3),
+                "maxSpeed": round(rnd.uniform(8, 20), 3), "averageHR": rnd.randint(110, 160),
+                "maxHR": rnd.randint(160, 190),
+                **{f"hrTimeInZone_{z}": rnd.randint(0, dur // 3) for z in range(1, 6)},
+                "avgPower": rnd.randint(120, 260), "maxPower": rnd.randint(500, 1100),
+                "normPower": rnd.randint(150, 290), "avgCadence": rnd.randint(75, 95),
+                "maxCadence": rnd.randint(100, 130), "totalAscent": rnd.randint(0, 2500),
+                "totalDescent": rnd.randint(0, 2500), "calories": rnd.randint(200, 3500),
+                "trainingEffectLabel": rnd.choice(_LABELS), "activityTrainingLoad": rnd.randint(10, 300),
+                "aerobicEffect": round(rnd.uniform(1, 5), 1), "anaerobicEffect": round(rnd.uniform(0, 4), 1),
+                "vo2Max": rnd.randint(48, 58), "activityId": activity_id,
+            })
+            acts.append([row[c] for c in ACTIVITIES.names])
+    _write(os.path.join(base, ACTIVITIES.filename), ACTIVITIES.names, acts)
+
+    checkins = [[d.isoformat(), *(rnd.randint(1, 10) for _ in CHECKINS.names[1:])] for d in days[:365]]
+    _write(os.path.join(base, CHECKINS.filename), CHECKINS.names, checkins)
+
+
+def _mb(n: int) -> str:
+    return f"{n / 1024 / 1024:8.2f} MB"
+
+
+def run(user_id: int, verbose: bool) -> None:
+    from backend import data_manager as dm
+
+    loaders = {"stats": dm.load_stats, "activities": dm.load_activities, "checkins": dm.load_checkins}
+    total_wide = total_compact = 0
+    print(f"{'kind':<12}{'rows':>8}{'normal':>14}{'compact':>14}{'saved':>8}{'compact load':>14}")
+    for kind, load in loaders.items():
+        wide = load(user_id)
+        started = time.perf_counter()
+        compact = load(user_id, compact=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        assert dm.expand_frame(compact).equals(wide), f"{kind}: compact frame is not lossless"
+        wide_b, compact_b = dm.frame_bytes(wide), dm.frame_bytes(compact)
+        total_wide += wide_b
+        total_compact += compact_b
+        saved = 1 - compact_b / wide_b if wide_b else 0.0
+        print(f"{kind:<12}{len(wide):>8}{_mb(wide_b):>14}{_mb(compact_b):>14}{saved:>7.0%}{elapsed:>11.1f} ms")
+        if verbose:
+            for col, dtype in compact.dtypes.items():
+                if dtype != wide[col].dtype:
+                    print(f"    {col:<28}{str(wide[col].dtype):>10} -> {dtype}")
+    saved = 1 - total_compact / total_wide if total_wide else 0.0
+    print(f"{'total':<12}{'':>8}{_mb(total_wide):>14}{_mb(total_compact):>14}{saved:>7.0%}")
+    print(f"frame cache: {dm.cache_stats()}")
+    print(f"user {user_id}: {dm.user_memory(user_id)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=5, help="Jahre synthetischer Historie")
+    parser.add_argument("--save-path", help="bestehender Datenordner (SAVE_PATH) statt synthetischer Daten")
+    parser.add_argument("--user", type=int, default=1)
+    parser.add_argument("-v", "--verbose", action="store_true", help="geänderte dtypes pro Spalte zeigen")
+    args = parser.parse_args()
+
+    if args.save_path:
+        os.environ["SAVE_PATH"] = args.save_path
+        run(args.user, args.verbose)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        generate(os.path.join(tmp, "users", str(args.user)), args.years)
+        os.environ["SAVE_PATH"] = tmp
+        os.environ.setdefault("PARQUET_STORE", "0")     # CSV-Pfad messen, keine Parquet-Kopien anlegen
+        run(args.user, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Latency of the chart payloads: one pydantic model per row (the old
+iterrows/zip path, validated and encoded like a FastAPI response_model) vs.
+columnar building (fast_json.records) and one fast_json.dumps.
+
+Generates a synthetic history with frame_memory.generate (or uses an existing
+data tree) and times sleep, steps and trends for 90/365/1825-day windows plus
+the check-in matrix. Frames come from the warm frame cache in both paths, so
+the numbers are building + encoding only. Both payloads are checked for equality.
+
+    python -m benchmarks.response_encoding                  # 5 Jahre synthetische Daten
+    python -m benchmarks.response_encoding --days 30 90 365 --repeat 50
+    python -m benchmarks.response_encoding --save-path /data --user 1
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.frame_memory import generate  # noqa: E402
+
+
+def _legacy(main, models):
+    """The builders as they were before the columnar rewrite – one model per row."""
+    import pandas as pd
+
+    def sleep(data, days):
+        since = pd.Timestamp.now().normalize() - pd.Timedelta(days=days - 1)
+        df = data.daily(since=since, columns=["sleep_score"])
+        df = df[df["sleep_score"] > 0]
+        return [models.SleepPoint(date=str(d.date()), score=s) for d, s in zip(df["Date"], df["sleep_score"])]
+
+    def steps(data, days):
+        since = pd.Timestamp.now().normalize() - pd.Timedelta(days=days - 1)
+        df = data.daily(since=since, columns=["steps"])
+        df = df[df["steps"] > 0]
+        return [models.StepsPoint(date=str(d.date()), steps=int(s)) for d, s in zip(df["Date"], df["steps"])]
+
+    def trends(data, days):
+        calc = main.calc
+        df_act = data.activities
+        since = pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
+        pmc_df = data.daily(since=since, columns=["CTL", "ATL", "TSB"])
+        vo2_df = data.daily(columns=["vo2max"])
+        vo2_df = vo2_df[vo2_df["vo2max"] > 0]
+        weekly = calc.weekly_zone_seconds(df_act[df_act["Date"] >= since])
+        return models.TrendsResponse(
+            pmc=[models.PMCPoint(date=str(d.date()), ctl=round(float(c), 1), atl=round(float(a), 1),
+                                 tsb=round(float(t), 1))
+                 for d, c, a, t in zip(pmc_df["Date"], pmc_df["CTL"], pmc_df["ATL"], pmc_df["TSB"])],
+            vo2max=[{"date": str(d.date()), "vo2max": float(v)} for d, v in zip(vo2_df["Date"], vo2_df["vo2max"])],
+            ftp=data.ftp,
+            ftp_target=data.ftp_target,
+            training_distribution=calc.compute_training_distribution(df_act, data.ftp),
+            polarization=[
+                {"week": str(r.Week.date()), "hours": r.hours, "low": r.low, "moderate": r.moderate, "high": r.high,
+                 "polarization_index": None if pd.isna(r.polarization_index) else r.polarization_index}
+                for r in calc.weekly_polarization(weekly).itertuples(index=False)
+            ],
+        )
+
+    def matrix(data, days):
+        df = data.checkins
+        if df.empty or "RPE" not in df.columns:
+            return []
+        result = []
+        for _, r in df.dropna(subset=["RPE"]).iterrows():
+            feel = r.get("Feel")
+            result.append({"date": r["Date"].strftime("%Y-%m-%d"), "rpe": float(r["RPE"]),
+                           "feel": float(feel) if not pd.isna(feel) else None})
+        return result
+
+    return {"sleep": sleep, "steps": steps, "trends": trends, "matrix": matrix}
+
+
+def _time(fn, repeat: int) -> tuple[float, bytes]:
+    times, body = [], b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times), body
+
+
+def run(user_id: int, windows: list[int], repeat: int) -> None:
+    # ai_coach legt den Anthropic-Client beim Import an – für den Benchmark reicht ein Platzhalter-Key
+    os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+    from pydantic import TypeAdapter
+
+    from backend import fast_json, main, models
+    from backend.context import UserData
+    from backend.database import User
+
+    legacy = _legacy(main, models)
+    columnar = {
+        "sleep": main._sleep,
+        "steps": main._steps,
+        "trends": lambda data, days: main._trends(data, days, None),
+        "matrix": lambda data, days: main._matrix(data),
+    }
+    adapters = {
+        "sleep": TypeAdapter(list[models.SleepPoint]),
+        "steps": TypeAdapter(list[models.StepsPoint]),
+        "trends": TypeAdapter(models.TrendsResponse),
+        "matrix": TypeAdapter(list[dict]),
+    }
+    user = User(id=user_id, ftp_override=None, ftp_target=None)
+    cases = [(name, days) for days in windows for name in ("sleep", "steps", "trends")] + [("matrix", None)]
+
+    print(f"encoder: {fast_json.ENCODER}")
+    print(f"{'endpoint':<10}{'days':>6}{'bytes':>10}{'pydantic':>12}{'columnar':>12}{'speedup':>9}")
+    for name, days in cases:
+        adapter = adapters[name]
+
+        def old():
+            # FastAPI mit response_model: Rückgabe validieren, dann dump_json
+            return adapter.dump_json(adapter.validate_python(legacy[name](UserData(user), days)))
+
+        def new():
+            return fast_json.dumps(columnar[name](UserData(user), days))
+
+        old(), new()    # Frames und Tagesmetriken in den Cache laden
+        old_ms, old_body = _time(old, repeat)
+        new_ms, new_body = _time(new, repeat)
+        assert json.loads(old_body) == json.loads(new_body), f"{name} {days}: payloads differ"
+        print(f"{name:<10}{days or '-':>6}{len(new_body):>10}{old_ms:>9.2f} ms{new_ms:>9.2f} ms{old_ms / new_ms:>8.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=5, help="Jahre synthetischer Historie")
+    parser.add_argument("--days", type=int, nargs="+", default=[90, 365, 1825], help="Zeitfenster in Tagen")
+    parser.add_argument("--repeat", type=int, default=20, help="Wiederholungen pro Messung (Median)")
+    parser.add_argument("--save-path", help="bestehender Datenordner (SAVE_PATH) statt synthetischer Daten")
+    parser.add_argument("--user", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.save_path:
+        os.environ["SAVE_PATH"] = args.save_path
+        run(args.user, args.days, args.repeat)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        generate(os.path.join(tmp, "users", str(args.user)), args.years)
+        os.environ["SAVE_PATH"] = tmp
+        run(args.user, args.days, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
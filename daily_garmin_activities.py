@@ -6,24 +6,15 @@ import csv
 import os
 from dotenv import load_dotenv
 
+from backend.schema import ACTIVITIES
+
 # --- CONFIG ---
 load_dotenv()
 SAVE_PATH = os.getenv("SAVE_PATH") or os.getcwd() 
 CSV_FILE = os.path.join(SAVE_PATH, "garmin_activities.csv")
 TOKEN_DIR = ".garth"
 
-HEADERS = [
-    "Date", "Time", "activityName", "sportType",
-    "duration", "elapsedDuration", "movingDuration", "distance",
-    "averageSpeed", "maxSpeed", "averageHR", "maxHR",
-    "hrTimeInZone_1", "hrTimeInZone_2", "hrTimeInZone_3", "hrTimeInZone_4", "hrTimeInZone_5",
-    "avgPower", "maxPower", "normPower",
-    "avgCadence", "maxCadence",
-    "totalAscent", "totalDescent", "steps", "avgStrideLength",
-    "avgStrokes", "totalStrokes", "poolLength", "numLaps",
-    "calories", "trainingEffectLabel", "activityTrainingLoad",
-    "aerobicEffect", "anaerobicEffect", "vo2Max", "lactateThreshold", "activityId"
-]
+HEADERS = ACTIVITIES.names
 
 def get_sport_category(act):
     atype = str(act.get('activityType', {}).get('typeKey', '')).lower()
@@ -7,6 +7,8 @@ import sys
 import platform
 from dotenv import load_dotenv
 
+from backend.schema import STATS
+
 # --- CONFIG ---
 load_dotenv()
 
@@ -28,16 +30,7 @@ else:
 TOKEN_DIR = ".garth"
 BACKFILL_DAYS = 30
 
-HEADERS = [
-    "Date",
-    "Weight (lbs)", "Muscle Mass (lbs)", "Body Fat %", "Water %",
-    "Sleep Total (hr)", "Sleep Deep (hr)", "Sleep REM (hr)", "Sleep Score",
-    "RHR", "Min HR", "Max HR", "Avg Stress", "Respiration", "SpO2",
-    "VO2 Max", "Training Status", "HRV Status", "HRV Avg",
-    "BP Systolic", "BP Diastolic",
-    "Steps", "Step Goal", "Cals Total", "Cals Active",
-    "Activities"
-]
+HEADERS = STATS.names
 
 
 def get_safe(data, *keys):
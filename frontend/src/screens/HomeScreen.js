@@ -48,9 +48,9 @@ export default function HomeScreen({ user, onLogout }) {
 
   const load = async () => {
     try {
-      const [d, t] = await Promise.all([api.dashboard(), api.trends(90)]);
-      setData(d);
-      setDist(t.training_distribution || null);
+      const h = await api.home();
+      setData(h.dashboard);
+      setDist(h.training_distribution || null);
       setError(null);
     } catch (e) {
       setError(e.message);
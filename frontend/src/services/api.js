@@ -65,6 +65,7 @@ async function request(path, options = {}) {
 
 export const api = {
   health: () => request("/api/health"),
+  home: () => request("/api/home"),
   dashboard: () => request("/api/dashboard"),
   activities: (limit = 20) => request(`/api/activities?limit=${limit}`),
   sleep: (days = 90) => request(`/api/sleep?days=${days}`),
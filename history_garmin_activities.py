@@ -22,6 +22,8 @@ import platform
 import time
 from dotenv import load_dotenv
 
+from backend.schema import ACTIVITIES
+
 # 1. Load configuration
 load_dotenv()
 
@@ -60,35 +62,8 @@ for arg in sys.argv[1:]:
         START_DATE = arg
         print(f"Using command-line start date: {START_DATE}")
 
-# CSV Headers - expanded schema for multi-sport
-HEADERS = [
-    # Identifiers
-    "Date", "Time", "activityName", "sportType",
-    # Duration & Distance
-    "duration", "elapsedDuration", "movingDuration", "distance",
-    # Speed/Pace
-    "averageSpeed", "maxSpeed",
-    # Heart Rate
-    "averageHR", "maxHR",
-    "hrTimeInZone_1", "hrTimeInZone_2", "hrTimeInZone_3", "hrTimeInZone_4", "hrTimeInZone_5",
-    # Power (Cycling/Running)
-    "avgPower", "maxPower", "normPower",
-    # Cadence
-    "avgCadence", "maxCadence",
-    # Elevation (Cycling/Running/Hiking)
-    "totalAscent", "totalDescent",
-    # Running Specific
-    "steps", "avgStrideLength",
-    # Swimming Specific
-    "avgStrokes", "totalStrokes", "poolLength", "numLaps",
-    # Training Metrics
-    "calories", "trainingEffectLabel", "activityTrainingLoad",
-    "aerobicEffect", "anaerobicEffect",
-    # VO2 & Performance
-    "vo2Max", "lactateThreshold",
-    # Activity ID (for reference)
-    "activityId"
-]
+# CSV Headers - expanded schema for multi-sport (see backend/schema.py)
+HEADERS = ACTIVITIES.names
 # ---------------------
 
 
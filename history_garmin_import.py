@@ -11,6 +11,8 @@ import sys
 import platform
 from dotenv import load_dotenv
 
+from backend.schema import STATS
+
 # 1. Load configuration immediately
 load_dotenv()
 
@@ -105,16 +107,7 @@ def main():
     print("Press Ctrl+C to stop at any time.")
     
     # 3. Create CSV Header
-    headers = [
-        "Date",
-        "Weight (lbs)", "Muscle Mass (lbs)", "Body Fat %", "Water %",
-        "Sleep Total (hr)", "Sleep Deep (hr)", "Sleep REM (hr)", "Sleep Score",
-        "RHR", "Min HR", "Max HR", "Avg Stress", "Respiration", "SpO2",
-        "VO2 Max", "Training Status", "HRV Status", "HRV Avg",
-        "BP Systolic", "BP Diastolic",
-        "Steps", "Step Goal", "Cals Total", "Cals Active",
-        "Activities"
-    ]
+    headers = STATS.names
     
     # Load existing data
     existing_dates = set()
@@ -9,6 +9,8 @@ import json
 import time
 from dotenv import load_dotenv
 
+from backend.schema import RUNS
+
 # 1. Load configuration
 load_dotenv()
 
@@ -172,14 +174,7 @@ def main():
         all_rows.sort(key=lambda x: (x[0], x[1]), reverse=True)  # Sort by date, then time descending
         with open(CSV_FILE, mode='w', newline='', encoding='utf-8') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                "Date", "Time", "activityName", "activityType_typeKey",
-                "duration", "elapsedDuration", "movingDuration",
-                "averageSpeed", "averageHR", "maxHR", "steps",
-                "summarizedExerciseSets", "totalSets", "activeSets", "totalReps",
-                "trainingEffectLabel", "activityTrainingLoad", "minActivityLapDuration",
-                "hrTimeInZone_1", "hrTimeInZone_2", "hrTimeInZone_3", "hrTimeInZone_4"
-            ])
+            writer.writerow(RUNS.names)
             writer.writerows(all_rows)
         print(f"   Written {len(all_rows)} total records (sorted newest to oldest).")
 